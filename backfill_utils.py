@@ -0,0 +1,188 @@
+import copy
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from binance.helpers import interval_to_milliseconds
+from binance.exceptions import BinanceAPIException
+
+# max klines by request and its request weight
+KLINES_LIMIT = 1000
+KLINES_WEIGHT = 2
+
+class RequestWeightLimiter:
+    """
+    Keep the request weight used in the current minute under the Binance limit.
+
+    The weight is reserved before each request and updated with the value returned by Binance
+    in the 'x-mbx-used-weight-1m' header, so requests sent by other processes with the same IP are considered too.
+    """
+
+    def __init__(self, weight_limit=6000, safety_ratio=0.8):
+        self.weight_limit = int(weight_limit * safety_ratio)
+        self.used_weight = 0
+        self.minute = int(time.time() // 60)
+        self.condition = threading.Condition()
+
+    def _reset_if_new_minute(self):
+        minute = int(time.time() // 60)
+        if minute != self.minute:
+            self.minute = minute
+            self.used_weight = 0
+
+    def acquire(self, weight):
+        with self.condition:
+            while True:
+                self._reset_if_new_minute()
+                if self.used_weight + weight <= self.weight_limit:
+                    self.used_weight += weight
+                    return
+
+                # wait until the next minute
+                self.condition.wait(60 - (time.time() % 60))
+
+    def update(self, response):
+        if response is None:
+            return
+
+        used_weight = response.headers.get('x-mbx-used-weight-1m')
+        if used_weight is None:
+            return
+
+        with self.condition:
+            self._reset_if_new_minute()
+            self.used_weight = max(self.used_weight, int(used_weight))
+
+    def wait_retry_after(self, response):
+        """
+        Binance returns 429 (or 418 if the IP is banned) with the number of seconds to wait in the 'Retry-After' header.
+        """
+        retry_after = 60
+        if response is not None:
+            retry_after = int(response.headers.get('Retry-After', retry_after))
+
+        with self.condition:
+            self.used_weight = self.weight_limit
+
+        time.sleep(retry_after)
+
+class ConcurrentKlinesClient:
+    """
+    Wrapper of binance.client.Client that fetches the kline pages of get_historical_klines in parallel
+    and respects the request weight limit. Any other method is delegated to the wrapped client.
+
+    Parameters
+    - client: binance.client.Client
+    - limiter: RequestWeightLimiter shared by all the requests
+    - max_workers: number of pages fetched at the same time
+    - on_progress: function(symbol, pages_done, pages_total) called after each page
+    """
+
+    def __init__(self, client, limiter=None, max_workers=8, on_progress=None):
+        self.client = client
+        self.limiter = limiter if limiter is not None else RequestWeightLimiter()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.on_progress = on_progress
+        self.local = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _get_thread_client(self):
+        # the client keeps only the last response (with the weight header), so each thread has its own copy
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = copy.copy(self.client)
+            self.local.client = client
+
+        return client
+
+    def _request(self, name, weight, **params):
+        client = self._get_thread_client()
+        while True:
+            self.limiter.acquire(weight)
+            try:
+                result = getattr(client, name)(**params)
+            except BinanceAPIException as e:
+                if e.status_code in (418, 429):
+                    print('Request weight limit reached, waiting...')
+                    self.limiter.wait_retry_after(e.response)
+                    continue
+                raise
+
+            self.limiter.update(getattr(client, 'response', None))
+            return result
+
+    def get_klines(self, **params):
+        return self._request('get_klines', KLINES_WEIGHT, **params)
+
+    def _get_earliest_valid_timestamp(self, symbol, interval):
+        kline = self.get_klines(symbol=symbol, interval=interval, limit=1, startTime=0, endTime=int(time.time() * 1000))
+
+        return kline[0][0]
+
+    def get_historical_klines(self, symbol, interval, start_str=None, end_str=None, limit=None):
+        """
+        Same return of Client.get_historical_klines, start_str and end_str must be timestamps in milliseconds.
+        """
+        timeframe = interval_to_milliseconds(interval)
+        page_size = timeframe * KLINES_LIMIT
+
+        start_ts = max(int(start_str or 0), self._get_earliest_valid_timestamp(symbol, interval))
+        end_ts = int(end_str) if end_str is not None else int(time.time() * 1000)
+        if end_ts <= start_ts:
+            return []
+
+        page_starts = range(start_ts, end_ts, page_size)
+        futures = [self.executor.submit(self.get_klines,
+                                        symbol=symbol,
+                                        interval=interval,
+                                        startTime=page_start,
+                                        endTime=min(page_start + page_size - 1, end_ts),
+                                        limit=KLINES_LIMIT) for page_start in page_starts]
+
+        pages_done = 0
+        for future in as_completed(futures):
+            future.result()
+            pages_done += 1
+            if self.on_progress is not None:
+                self.on_progress(symbol, pages_done, len(futures))
+
+        output_data = []
+        for future in futures:
+            output_data += future.result()
+
+        return output_data
+
+def print_progress(symbol, pages_done, pages_total):
+    # print only each 10% to avoid flooding the output
+    step = max(1, pages_total // 10)
+    if pages_done % step == 0 or pages_done == pages_total:
+        print('{} backfill: {}/{} pages'.format(symbol, pages_done, pages_total))
+
+def backfill_symbols(client, symbol_list, load_data, on_ready, max_symbols=4, max_pages=8, weight_limit=6000, on_progress=print_progress):
+    """
+    Backfill several symbols in parallel, on_ready is called (in the caller thread) as soon as a symbol is
+    caught up, so its socket can start while the other symbols are still loading.
+
+    Parameters
+    - client: binance.client.Client
+    - symbol_list: list of symbols
+    - load_data: function(client, symbol) that returns the symbol data, example: get_data
+    - on_ready: function(symbol, data)
+    - max_symbols: number of symbols loaded at the same time
+    - max_pages: number of kline pages requested at the same time (by all symbols)
+    - weight_limit: request weight limit by minute of the exchange
+    - on_progress: function(symbol, pages_done, pages_total)
+    """
+    limiter = RequestWeightLimiter(weight_limit=weight_limit)
+    concurrent_client = ConcurrentKlinesClient(client, limiter=limiter, max_workers=max_pages, on_progress=on_progress)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_symbols) as executor:
+            futures = {executor.submit(load_data, concurrent_client, symbol): symbol for symbol in symbol_list}
+
+            for future in as_completed(futures):
+                symbol = futures[future]
+                on_ready(symbol, future.result())
+    finally:
+        concurrent_client.executor.shutdown(wait=False, cancel_futures=True)
@@ -24,7 +24,7 @@ def signal_above_strategy(price_data, price_signal, name, _initial_capital=10000
     # Return the backtest
     return bt.Backtest(s, price_data, integer_positions=False, initial_capital=_initial_capital)
 
-def signal_strategy(price_data, signal, name, _initial_capital=1000000.0):
+def signal_strategy(price_data, signal, name, _initial_capital=1000000.0, fee=0.0):
     weight = convert_signal_to_weight(signal.copy())
 
     # the column names must be the same
@@ -35,7 +35,120 @@ def signal_strategy(price_data, signal, name, _initial_capital=1000000.0):
                     [bt.algos.WeighTarget(weight), 
                      bt.algos.Rebalance()])
 
-    return bt.Backtest(strategy=s, data=price_data, integer_positions=False, initial_capital=_initial_capital)
+    # fee by traded value, as the exchange_fee of get_trade_info
+    return bt.Backtest(strategy=s, data=price_data, integer_positions=False, initial_capital=_initial_capital,
+                       commissions=lambda quantity, price: abs(quantity) * price * fee)
 
 def convert_signal_to_weight(signal):
-    return signal.replace(0, np.nan).replace(-1, 0).ffill().replace(np.nan, 0)
\ No newline at end of file
+    return signal.replace(0, np.nan).replace(-1, 0).ffill().replace(np.nan, 0)
+
+def get_series(data):
+    """
+    Returns the first column of a DataFrame, or the Series itself.
+    """
+    if isinstance(data, pd.DataFrame):
+        return data.iloc[:, 0]
+
+    return data
+
+def get_backtest(price_data, weight, fee=0.0, _initial_capital=1000000.0, periods_per_year=252):
+    """
+    Vectorized backtest of a long/flat strategy, the same of bt.run(signal_strategy(...)) with NumPy:
+    - price_data: prices (Series or DataFrame with one column and a DatetimeIndex)
+    - weight: output of convert_signal_to_weight, 1 - invested, 0 - out, the bars without a weight keep the last one
+    - fee: fee by traded value (exchange_fee of get_trade_info), paid when entering and exiting
+
+    As bt, the position is changed at the price of the bar of the weight and the equity curve starts with the
+    initial capital one day before the first bar.
+    Returns a dict with the equity curve, the trades and the statistics of get_backtest_stats.
+    """
+    price = get_series(price_data)
+    weight = get_series(weight).reindex(price.index).ffill().fillna(0.0).to_numpy(dtype='float64')
+    if not np.isin(weight, [0.0, 1.0]).all():
+        raise ValueError('The weights must be 0 or 1 (see convert_signal_to_weight)')
+
+    prices = price.to_numpy(dtype='float64')
+    growth, entries, exits = get_equity_growth(prices, weight, fee)
+
+    index = pd.DatetimeIndex([price.index[0] - pd.DateOffset(days=1)]).append(price.index)
+    equity = pd.Series(_initial_capital * np.cumprod(np.concatenate([[1.0], growth])), index=index, name=price.name)
+
+    # the last trade is still open if there are more entries than exits, it is valued at the last price
+    is_open = np.arange(len(entries)) >= len(exits)
+    exits = np.concatenate([exits, np.full(len(entries) - len(exits), len(prices) - 1)])
+    trade_returns = prices[exits] / prices[entries] / (1.0 + fee) * np.where(is_open, 1.0, 1.0 - fee) - 1.0
+    trades = pd.DataFrame({'EntryTime': price.index[entries],
+                           'EntryPrice': prices[entries],
+                           'ExitTime': price.index[exits],
+                           'ExitPrice': prices[exits],
+                           'Return': trade_returns,
+                           'IsOpen': is_open})
+
+    result = {'equity': equity, 'trades': trades}
+    result.update(get_backtest_stats(equity, periods_per_year))
+
+    return result
+
+def get_weight_array(signal):
+    """
+    convert_signal_to_weight of a signal array (1 - buy, -1 - sell, 0 - nothing), returns a float64 array.
+    """
+    signal = np.asarray(signal).ravel()
+    changes = np.flatnonzero(signal != 0)
+    if len(changes) == 0:
+        return np.zeros(len(signal))
+
+    # each bar keeps the last non-zero signal
+    last = np.zeros(len(signal), dtype='int64')
+    last[changes] = changes
+    last = np.maximum.accumulate(last)
+    weight = np.where(signal[last] == 1, 1.0, 0.0)
+    weight[:changes[0]] = 0.0
+
+    return weight
+
+def get_equity_growth(prices, weight, fee=0.0):
+    """
+    Growth of the equity of each bar for the weights (0 or 1) of the bars: the price change when invested in the
+    previous bar and the fees of the trades (as bt, quantity = capital / (price * (1 + fee)) when entering).
+    Returns the growth and the bars of the entries and exits.
+    """
+    previous = np.concatenate([[0.0], weight[:-1]])
+    entries = np.flatnonzero((weight == 1.0) & (previous == 0.0))
+    exits = np.flatnonzero((weight == 0.0) & (previous == 1.0))
+
+    growth = np.ones(len(prices))
+    growth[1:] = np.where(previous[1:] == 1.0, prices[1:] / prices[:-1], 1.0)
+    growth[entries] /= 1.0 + fee
+    growth[exits] *= 1.0 - fee
+
+    return growth, entries, exits
+
+def get_backtest_stats(equity, periods_per_year=252):
+    """
+    Total return, CAGR, max drawdown and Sharpe (risk-free rate 0) of an equity curve, computed as the stats of
+    bt (ffn) with the daily values (last value of each day).
+    """
+    daily = equity.resample('D').last().dropna()
+    years = (daily.index[-1] - daily.index[0]).total_seconds() / 31557600
+
+    return get_daily_stats(equity.iloc[-1] / equity.iloc[0] - 1, daily.to_numpy(), years, periods_per_year)
+
+def get_daily_stats(total_return, daily, years, periods_per_year=252):
+    """
+    Stats of get_backtest_stats with the daily values (array) and the years between the first and the last day.
+    """
+    returns = daily[1:] / daily[:-1] - 1
+    # no Sharpe without dispersion of the returns (no trades), as ffn
+    volatility = returns.std(ddof=1) if len(returns) > 1 else 0.0
+
+    return {'total_return': total_return,
+            'cagr': (daily[-1] / daily[0]) ** (1 / years) - 1 if years > 0 else np.nan,
+            'max_drawdown': (daily / np.maximum.accumulate(daily)).min() - 1,
+            'sharpe': returns.mean() / volatility * np.sqrt(periods_per_year) if volatility > 0 else np.nan}
+
+def signal_backtest(price_data, signal, fee=0.0, _initial_capital=1000000.0):
+    """
+    Vectorized version of bt.run(signal_strategy(price_data, signal, name)), see get_backtest.
+    """
+    return get_backtest(price_data, convert_signal_to_weight(signal.copy()), fee, _initial_capital)
@@ -0,0 +1,635 @@
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import datetime
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+import bt
+from pathlib import Path
+
+from technical_indicator_utils import *
+from streaming_indicator_utils import TechnicalIndicatorsState, SMA_PERIODS, EMA_PERIODS
+from trade_utils import generate_technical_indicators, add_technical_indicators, update_signal_by_strategy, resample_data, get_intervals
+from strategy_registry_utils import STRATEGIES, get_strategy
+from live_signal_utils import LiveSignal
+from backtest_utils import signal_strategy, signal_backtest
+from strategy_utils import *
+from candle_utils import CandleAggregator
+from candle_store_utils import write_candles
+from fake_exchange_utils import FakeExchange, FakeClient
+from backfill_utils import backfill_symbols
+
+"""
+Benchmarks and golden outputs of the indicators (technical_indicator_utils) and signals (strategy_utils).
+
+python benchmark_utils.py [--sizes 10k 1m 10m] [--output results.json]   wall time and peak memory by function (JSON)
+python benchmark_utils.py --save-golden                                  rewrite the golden outputs (after a change
+                                                                         that is expected to change the values)
+python benchmark_utils.py --compare                                      optimized versions vs reference versions
+
+The suite checks the golden outputs (benchmark_golden.npz) before the benchmarks, a function with different values
+is reported as drift and the run exits with status 1, as --compare when a check fails.
+"""
+
+SIZES = {'10k': 10000, '1m': 1000000, '10m': 10000000}
+GOLDEN_FILENAME = Path(__file__).with_name('benchmark_golden.npz')
+GOLDEN_ROWS = 1000
+# relative tolerance of the indicators, the signals must be equal
+GOLDEN_RTOL = 1e-9
+
+# name: function of the OHLCV DataFrame
+INDICATOR_CASES = {
+    'get_sma': lambda df: get_sma(df['ClosePrice'], 20),
+    'get_ema': lambda df: get_ema(df['ClosePrice'], 20),
+    'get_sma_bank': lambda df: get_sma_bank(df['ClosePrice'], SMA_PERIODS),
+    'get_ema_bank': lambda df: get_ema_bank(df['ClosePrice'], EMA_PERIODS),
+    'get_macd': lambda df: get_macd(df['ClosePrice']),
+    'get_rsi': lambda df: get_rsi(df['ClosePrice']),
+    'get_wilder_smoothing': lambda df: get_wilder_smoothing(df['ClosePrice'] - df['OpenPrice'], 14),
+    'get_adx': lambda df: get_adx(df['HighPrice'], df['LowPrice'], df['ClosePrice']),
+    'get_tr': lambda df: get_tr(df['HighPrice'], df['LowPrice'], df['ClosePrice']),
+    'get_atr': lambda df: get_atr(df['HighPrice'], df['LowPrice'], df['ClosePrice']),
+    'get_bbands': lambda df: get_bbands(df['ClosePrice']),
+    'get_momentum': lambda df: get_momentum(df['ClosePrice'], 10),
+    'get_sma_ratio': lambda df: get_sma_ratio(df['ClosePrice'], 20),
+    'get_bbands_ratio': lambda df: get_bbands_ratio(df['ClosePrice']),
+    'bband_b': lambda df: bband_b(df['ClosePrice']),
+    'get_hurst': lambda df: get_hurst(df['ClosePrice']),
+    'get_rvi': lambda df: get_rvi(df['OpenPrice'], df['ClosePrice'], df['LowPrice'], df['HighPrice']),
+    'get_stochastic_oscillator': lambda df: get_stochastic_oscillator(df['ClosePrice'], df['LowPrice'], df['HighPrice']),
+    'generate_technical_indicators': lambda df: generate_technical_indicators(df[['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'Volume']].copy()),
+}
+
+# name: (function of the DataFrame with the indicators, indicator columns used, max rows or None)
+SIGNAL_CASES = {
+    'get_cross_signal': (lambda df: get_cross_signal(df[['SMA5']].copy(), df[['SMA30']].copy()), ['SMA5', 'SMA30'], None),
+    'get_macd_signal': (lambda df: get_macd_signal(df[['MACDSignal']].copy(), df[['MACD']].copy()), ['MACD'], None),
+    'get_macd_rvi_signal': (lambda df: get_macd_rvi_signal(df[['MACDSignal']].copy(), df[['MACD']].copy(),
+                                                           df[['RVISignal']].copy(), df[['RVI']].copy()), ['MACD', 'RVI'], None),
+    'get_rsi_signal': (lambda df: get_rsi_signal(df[['RSI']].copy()), ['RSI'], None),
+    'get_rsi_enter_signal': (lambda df: get_rsi_enter_signal(df[['RSI']].copy()), ['RSI'], None),
+    'get_rsi_return_signal': (lambda df: get_rsi_return_signal(df[['RSI']].copy()), ['RSI'], None),
+    'get_inverted_rsi_signal': (lambda df: get_inverted_rsi_signal(df[['RSI']].copy()), ['RSI'], None),
+    'get_rsi_adx_signal': (lambda df: get_rsi_adx_signal(df[['RSI']].copy(), df[['ADX']].copy(), df[['DI+']].copy(),
+                                                         df[['DI-']].copy()), ['RSI', 'ADX'], None),
+    'get_5_minute_signal': (lambda df: get_5_minute_signal(df[['ClosePrice']].copy(), df[['MACDHist']].copy(),
+                                                           df[['EMA20']].copy()), ['MACD', 'EMA20'], None),
+    'get_sma_macd_signal': (lambda df: get_sma_macd_signal(df[['ClosePrice']].copy(), df[['SMA30']].copy(),
+                                                           df[['SMA100']].copy(), df[['MACD']].copy()),
+                            ['SMA30', 'SMA100', 'MACD'], None),
+    'get_adx_macd_signal': (lambda df: get_adx_macd_signal(df[['MACD']].copy(), df[['DI+']].copy(), df[['DI-']].copy(),
+                                                           df[['ADX']].copy()), ['MACD', 'ADX'], None),
+    'get_bbands_signal': (lambda df: get_bbands_signal(df[['ClosePrice']].copy(), df[['UpperBBand']].copy(),
+                                                       df[['LowerBBand']].copy()), ['UpperBBand'], None),
+    'get_rsi_bbands_signal': (lambda df: get_rsi_bbands_signal(df[['ClosePrice']].copy(), df[['UpperBBand']].copy(),
+                                                               df[['LowerBBand']].copy(), df[['RSI']].copy()), ['UpperBBand', 'RSI'], None),
+    'get_dmi_signal': (lambda df: get_dmi_signal(df[['DI+']].copy(), df[['DI-']].copy(), df[['ADX']].copy()), ['ADX'], None),
+    'get_ema_atr_signal': (lambda df: get_ema_atr_signal(df[['ClosePrice']].copy(), df[['RSI']].copy(), df[['EMA200']].copy(),
+                                                         df[['ATR']].copy(), oversold_value=40), ['RSI', 'EMA200', 'ATR'], None),
+    'get_rsi_atr_signal': (lambda df: get_rsi_atr_signal(df[['ClosePrice']].copy(), df[['RSI']].copy(), df[['ATR']].copy()),
+                           ['RSI', 'ATR'], None),
+    'get_planBTC_strategy': (lambda df: get_planBTC_strategy(df['RSI'].copy()), ['RSI'], None),
+    'get_hurst_signal': (lambda df: get_hurst_signal(df[['Hurst']].to_numpy()), ['Hurst'], None),
+    'get_rsi_hurst_signal': (lambda df: get_rsi_hurst_signal(df[['RSI']].copy(), df[['HurstSignal']].copy()), ['RSI', 'Hurst'], None),
+    # array signals (no copies, int8 outputs) of the registered strategies
+    'get_cross_signal_array': (lambda df: get_cross_signal_array(df['SMA5'], df['SMA30']), ['SMA5', 'SMA30'], None),
+    'get_macd_signal_array': (lambda df: get_macd_signal_array(df['MACDSignal'], df['MACD']), ['MACD'], None),
+    'get_macd_rvi_signal_array': (lambda df: get_macd_rvi_signal_array(df['MACDSignal'], df['MACD'], df['RVISignal'], df['RVI']),
+                                  ['MACD', 'RVI'], None),
+    'get_rsi_signal_array': (lambda df: get_rsi_signal_array(df['RSI']), ['RSI'], None),
+    'get_inverted_rsi_signal_array': (lambda df: get_inverted_rsi_signal_array(df['RSI']), ['RSI'], None),
+    'get_rsi_adx_signal_array': (lambda df: get_rsi_adx_signal_array(df['RSI'], df['ADX'], df['DI+'], df['DI-']), ['RSI', 'ADX'], None),
+    'get_sma_macd_signal_array': (lambda df: get_sma_macd_signal_array(df['ClosePrice'], df['SMA30'], df['SMA100'], df['MACD']),
+                                  ['SMA30', 'SMA100', 'MACD'], None),
+    'get_adx_macd_signal_array': (lambda df: get_adx_macd_signal_array(df['MACD'], df['DI+'], df['DI-'], df['ADX']), ['MACD', 'ADX'], None),
+    'get_bbands_signal_array': (lambda df: get_bbands_signal_array(df['ClosePrice'], df['UpperBBand'], df['LowerBBand']),
+                                ['UpperBBand'], None),
+    'get_dmi_signal_array': (lambda df: get_dmi_signal_array(df['DI+'], df['DI-'], df['ADX']), ['ADX'], None),
+}
+
+def get_synthetic_ohlcv(rows, seed=0):
+    """
+    Random walk 1m candles (OHLCV DataFrame).
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2020-01-01', periods=rows, freq='1min', name='OpenTime')
+    close_price = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, rows)))
+    open_price = np.concatenate([[close_price[0]], close_price[:-1]])
+    high_price = np.maximum(open_price, close_price) * (1 + rng.random(rows) * 0.001)
+    low_price = np.minimum(open_price, close_price) * (1 - rng.random(rows) * 0.001)
+    volume = rng.random(rows) * 10
+
+    return pd.DataFrame({'OpenPrice': open_price,
+                         'HighPrice': high_price,
+                         'LowPrice': low_price,
+                         'ClosePrice': close_price,
+                         'Volume': volume}, index=index)
+
+def get_benchmark_data(rows, seed=0):
+    """
+    Deterministic OHLCV DataFrame for the benchmarks and golden outputs: the synthetic candles rounded to cents
+    (ties in the comparisons) with a flat part (constant windows).
+    """
+    df = get_synthetic_ohlcv(rows, seed)
+    df.iloc[rows // 2:rows // 2 + 30, :4] = df.iloc[rows // 2, 3]
+
+    return df.round(2)
+
+def add_signal_inputs(df, columns):
+    """
+    Add the indicator columns used by the signals (Hurst also adds HurstSignal).
+    """
+    if 'Hurst' in columns and 'Hurst' not in df.columns:
+        df['Hurst'] = get_hurst(df['ClosePrice'])
+        df['HurstSignal'] = get_hurst_signal(df[['Hurst']].to_numpy())
+
+    return add_technical_indicators(df, [column for column in columns if column != 'Hurst'])
+
+def get_output_arrays(result):
+    """
+    Returns a list of float64 arrays with the values of the output of an indicator or signal
+    (Series, DataFrame, ndarray or tuple of them).
+    """
+    if isinstance(result, tuple):
+        return [array for item in result for array in get_output_arrays(item)]
+    if isinstance(result, pd.DataFrame):
+        return [result[column].to_numpy(dtype='float64') for column in result.columns]
+    if isinstance(result, pd.Series):
+        return [result.to_numpy(dtype='float64')]
+
+    return [np.asarray(result, dtype='float64').ravel()]
+
+def get_cases(kind=None):
+    """
+    Returns a dict {name: (kind, function, input columns, max rows)} of the indicators and signals.
+    """
+    cases = {}
+    if kind in [None, 'indicator']:
+        cases.update({name: ('indicator', function, [], None) for name, function in INDICATOR_CASES.items()})
+    if kind in [None, 'signal']:
+        cases.update({name: ('signal', function, columns, max_rows) for name, (function, columns, max_rows) in SIGNAL_CASES.items()})
+
+    return cases
+
+def get_golden_outputs(rows=GOLDEN_ROWS):
+    outputs = {}
+    df = get_benchmark_data(rows)
+    for name, (kind, function, columns, max_rows) in get_cases().items():
+        df = add_signal_inputs(df, columns)
+        for i, array in enumerate(get_output_arrays(function(df))):
+            outputs['{}/{}/{}'.format(kind, name, i)] = array
+
+    return outputs
+
+def save_golden(filename=GOLDEN_FILENAME, rows=GOLDEN_ROWS):
+    """
+    Save the outputs of all indicators and signals of get_benchmark_data(rows) as the golden outputs.
+    """
+    np.savez_compressed(filename, **get_golden_outputs(rows))
+
+def check_golden(filename=GOLDEN_FILENAME, rtol=GOLDEN_RTOL):
+    """
+    Compare the outputs with the golden outputs: same shape and NaNs, indicators with a relative tolerance and
+    signals equal. Returns a dict {output: description of the drift} (empty if there is no drift).
+    """
+    golden = np.load(filename)
+    rows = len(golden['indicator/get_sma/0'])
+    outputs = get_golden_outputs(rows)
+
+    drift = {}
+    for key in sorted(set(golden.files) | set(outputs)):
+        if key not in golden.files or key not in outputs:
+            drift[key] = 'missing in the ' + ('outputs' if key in golden.files else 'golden outputs')
+            continue
+
+        expected, result = golden[key], outputs[key]
+        if expected.shape != result.shape:
+            drift[key] = 'shape {} != {}'.format(result.shape, expected.shape)
+        elif not np.array_equal(np.isnan(expected), np.isnan(result)):
+            drift[key] = 'different NaNs'
+        elif key.startswith('signal/') and not np.array_equal(expected, result, equal_nan=True):
+            drift[key] = '{} different values'.format(int((expected != result).sum()))
+        elif not np.allclose(result, expected, rtol=rtol, atol=0, equal_nan=True):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                error = np.nanmax(np.abs(result / expected - 1))
+            drift[key] = 'max relative error {:.1e}'.format(error)
+
+    return drift
+
+def get_peak_memory(function, *args):
+    """
+    Returns the peak memory (bytes) allocated by the function (tracemalloc, numpy allocations included).
+    """
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmarks(sizes=['10k', '1m'], names=None, repeat=1, memory=True):
+    """
+    Wall time (best of repeat runs) and peak memory of the indicators and signals for each size of SIZES.
+    Returns a dict (JSON) with the environment and a list of results {name, kind, size, rows, seconds, peak_memory},
+    the functions with max rows are skipped (seconds None) above it.
+    """
+    results = []
+    for size in sizes:
+        rows = SIZES[size]
+        df = get_benchmark_data(rows)
+
+        for name, (kind, function, columns, max_rows) in get_cases().items():
+            if names is not None and name not in names:
+                continue
+
+            result = {'name': name, 'kind': kind, 'size': size, 'rows': rows, 'seconds': None, 'peak_memory': None}
+            if max_rows is None or rows <= max_rows:
+                # the inputs are not measured
+                df = add_signal_inputs(df, columns)
+
+                seconds = np.inf
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    function(df)
+                    seconds = min(seconds, time.perf_counter() - start)
+                result['seconds'] = seconds
+
+                if memory:
+                    result['peak_memory'] = get_peak_memory(function, df)
+
+            print('{:<30} {:>4} {}'.format(name, size, 'skipped' if result['seconds'] is None else '{:.4f}s'.format(result['seconds'])),
+                  file=sys.stderr)
+            results.append(result)
+
+        del df
+
+    return {'commit': get_commit(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'results': results}
+
+def get_time(function, *args, repeat=1):
+    """
+    Returns the best time (seconds) of repeat runs and the result of the function.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def benchmark_wilder_smoothing(rows=1000000, period=14, rtol=1e-12):
+    """
+    Returns the list of the functions with a relative error greater than rtol (empty if there is none).
+    """
+    df = get_synthetic_ohlcv(rows)
+    different = []
+
+    loop_time, expected = get_time(get_wilder_smoothing_loop, df['ClosePrice'], period)
+    vector_time, result = get_time(get_wilder_smoothing, df['ClosePrice'], period, repeat=3)
+    error = np.nanmax(np.abs(result / expected - 1))
+    if not error <= rtol:
+        different.append('get_wilder_smoothing')
+    print('Wilder smoothing ({} rows): loop {:.3f}s, vectorized {:.4f}s, speed-up {:.0f}x, max relative error {:.1e}'.format(
+        rows, loop_time, vector_time, loop_time / vector_time, error))
+
+    loop_time, expected = get_time(get_adx_loop, df['HighPrice'], df['LowPrice'], df['ClosePrice'], period)
+    vector_time, result = get_time(get_adx, df['HighPrice'], df['LowPrice'], df['ClosePrice'], period, repeat=3)
+    error = max([np.nanmax(np.abs(r / e - 1)) for r, e in zip(result, expected)])
+    if not error <= rtol:
+        different.append('get_adx')
+    print('ADX ({} rows): loop {:.3f}s, vectorized {:.4f}s, speed-up {:.0f}x, max relative error {:.1e}'.format(
+        rows, loop_time, vector_time, loop_time / vector_time, error))
+
+    return different
+
+def benchmark_moving_average_bank(rows=1000000, periods=[2, 3, 5, 8, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 200], rtol=1e-9):
+    """
+    Returns the list of the banks with a relative error greater than rtol (empty if there is none), the EMA bank
+    must be equal to get_ema.
+    """
+    df = get_synthetic_ohlcv(rows)
+    different = []
+
+    loop_time, expected = get_time(lambda: [get_sma(df['ClosePrice'], period) for period in periods])
+    bank_time, result = get_time(get_sma_bank, df['ClosePrice'], periods, repeat=3)
+    error = max([np.nanmax(np.abs(result.iloc[:, i] / e - 1)) for i, e in enumerate(expected)])
+    if not error <= rtol:
+        different.append('get_sma_bank')
+    print('SMA bank ({} rows, {} periods): get_sma {:.3f}s, bank {:.3f}s, speed-up {:.1f}x, max relative error {:.1e}'.format(
+        rows, len(periods), loop_time, bank_time, loop_time / bank_time, error))
+
+    periods = EMA_PERIODS
+    loop_time, expected = get_time(lambda: [get_ema(df['ClosePrice'], period) for period in periods])
+    bank_time, result = get_time(get_ema_bank, df['ClosePrice'], periods, repeat=3)
+    equal = all([np.array_equal(result.iloc[:, i].to_numpy(), e.to_numpy(), equal_nan=True) for i, e in enumerate(expected)])
+    if not equal:
+        different.append('get_ema_bank')
+    print('EMA bank ({} rows, {} periods): get_ema {:.3f}s, bank {:.3f}s, equal: {}'.format(
+        rows, len(periods), loop_time, bank_time, equal))
+
+    return different
+
+def benchmark_hurst(rows=5000, window=200, max_workers=1, atol=1e-12):
+    """
+    Returns ['get_hurst'] if the absolute error is greater than atol (empty list if it isn't).
+    """
+    df = get_synthetic_ohlcv(rows)
+
+    loop_time, expected = get_time(get_hurst_loop, df['ClosePrice'], window)
+    rolling_time, result = get_time(get_hurst, df['ClosePrice'], window, max_workers, repeat=3)
+    error = np.nanmax(np.abs(result - expected))
+    print('Hurst ({} rows, window {}): loop {:.3f}s, rolling {:.4f}s, speed-up {:.0f}x, max absolute error {:.1e}'.format(
+        rows, window, loop_time, rolling_time, loop_time / rolling_time, error))
+
+    return [] if error <= atol else ['get_hurst']
+
+def check_streaming_indicators(rows=5000, seed_rows=1000):
+    """
+    Parity of the streaming indicators (seeded with seed_rows, then updated bar by bar) with the batch functions.
+    Returns the list of the columns with different values (empty if all of them are equal).
+    """
+    df = get_synthetic_ohlcv(rows)
+    # flat prices and rounded values are the corner cases of the rolling sums
+    df.iloc[rows // 2:rows // 2 + 30, :4] = df.iloc[rows // 2, 3]
+    df = df.round(2)
+
+    expected = generate_technical_indicators(df.copy())
+
+    state = TechnicalIndicatorsState().seed(df.iloc[:seed_rows])
+    start = time.perf_counter()
+    values = [state.update(*row) for row in df.iloc[seed_rows:][['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice']].itertuples(index=False)]
+    update_time = (time.perf_counter() - start) / (rows - seed_rows)
+    result = pd.DataFrame(values, index=df.index[seed_rows:])
+
+    batch_time, _ = get_time(generate_technical_indicators, df.copy())
+
+    different = [column for column in result.columns
+                 if not np.array_equal(result[column].to_numpy(), expected[column].iloc[seed_rows:].to_numpy(dtype='float64'), equal_nan=True)]
+    print('Streaming indicators ({} rows): update {:.0f}us by bar, batch {:.1f}ms, different columns: {}'.format(
+        rows, update_time * 1000000, batch_time * 1000, different))
+
+    return different
+
+def check_aggregator(days=100, seed_days=10, intervals=None):
+    """
+    Replay of the 1m candles through CandleAggregator (seeded with seed_days, then one candle at a time) against
+    resample_data of the whole history, for each interval of get_intervals (3D, 1W and 1M included).
+    Returns the list of the intervals with different bars (empty if all of them are equal).
+    """
+    if intervals is None:
+        intervals = get_intervals()
+
+    df = get_benchmark_data(days * 1440)
+    seed_rows = seed_days * 1440
+
+    aggregator = CandleAggregator(df.iloc[:seed_rows], intervals)
+    start = time.perf_counter()
+    for row in df.iloc[seed_rows:].itertuples():
+        aggregator.append(row.Index, row.OpenPrice, row.HighPrice, row.LowPrice, row.ClosePrice, row.Volume)
+    update_time = (time.perf_counter() - start) / (len(df) - seed_rows)
+
+    different = []
+    for interval in intervals:
+        expected = resample_data(df, interval)
+        result = aggregator.get_frame(interval)
+        if not (np.array_equal(result.index.values, expected.index.values)
+                and np.array_equal(result.to_numpy(), expected[result.columns].to_numpy(), equal_nan=True)):
+            different.append(interval)
+    print('Candle aggregator ({} days, {} intervals): update {:.0f}us by candle, different intervals: {}'.format(
+        days, len(intervals), update_time * 1000000, different))
+
+    return different
+
+LIVE_SIGNAL_STRATEGIES = ['Signal30SMAStrategy', 'SignalRSIStrategy70_30', 'SignalSMACROSSStrategy5_30',
+                          'SignalEMACROSSStrategy20_50']
+
+def check_live_signals(rows=2000, seed_rows=500, signal_columns=None):
+    """
+    Replay of the live signals (seeded with seed_rows, then one bar at a time) against the signal of the whole
+    history (update_signal_by_strategy), the same comparison of the last two bars of process_candle.
+    Returns the list of the strategies with different signals (empty if all of them are equal).
+    """
+    if signal_columns is None:
+        signal_columns = [name for name in STRATEGIES if STRATEGIES[name]['lookback'] is not None] + LIVE_SIGNAL_STRATEGIES
+
+    df = get_benchmark_data(rows)[['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'Volume']]
+
+    different = []
+    for signal_column in signal_columns:
+        if get_strategy(signal_column)['lookback'] is None:
+            continue
+
+        expected = update_signal_by_strategy(df.copy(), signal_column)[signal_column].to_numpy()
+        # seeded before the first bar, as seed_live_signals in start_symbol
+        live_signal = LiveSignal(signal_column).seed(df.iloc[:seed_rows])
+
+        start = time.perf_counter()
+        signals = [live_signal.get_signals(df.iloc[:i]) for i in range(seed_rows + 1, rows + 1)]
+        update_time = (time.perf_counter() - start) / (rows - seed_rows)
+
+        full_time, _ = get_time(update_signal_by_strategy, df.copy(), signal_column)
+
+        equal = np.array_equal(np.array(signals), np.column_stack([expected[seed_rows - 1:-1], expected[seed_rows:]]))
+        if not equal:
+            different.append(signal_column)
+        print('Live signal {} ({} rows): update {:.2f}ms by bar, whole history {:.1f}ms, equal: {}'.format(
+            signal_column, rows, update_time * 1000, full_time * 1000, equal))
+
+    return different
+
+def get_baseline_signal(signal, buy_first=True):
+    """
+    End of the DataFrame signals of the baseline: signal.at[0, 'value'] = 1.0 (a new row after the last one if the
+    index doesn't have the label 0) and remove_repeated_signal.
+    """
+    if buy_first:
+        signal.at[0, 'value'] = 1.0
+
+    return remove_repeated_signal(signal, 'value')
+
+def get_baseline_cross_signal(short_data, long_data):
+    short_data.columns = ['value']
+    long_data.columns = ['value']
+    # the averages within CROSS_RTOL are equal, their last bits depend on the rounding of the SMA functions
+    short_data = short_data.where(~np.isclose(short_data, long_data, rtol=CROSS_RTOL, atol=0), long_data)
+
+    signal = long_data.copy()
+    signal[short_data > long_data] = 1.0
+    signal[short_data <= long_data] = -1.0
+
+    return get_baseline_signal(signal)
+
+def get_baseline_macd_signal(signal_macd, macd_value):
+    signal_macd.columns = ['value']
+    macd_value.columns = ['value']
+
+    signal = macd_value.copy()
+    signal[signal_macd < macd_value] = 1.0
+    signal[signal_macd >= macd_value] = -1.0
+
+    return get_baseline_signal(signal)
+
+def get_baseline_rsi_signal(signal, overbought_value=70.0, oversold_value=30.0):
+    signal.columns = ['value']
+    signal[signal < oversold_value] = 1.0
+    signal[signal > overbought_value] = -1.0
+    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+
+    return get_baseline_signal(signal)
+
+# name: (DataFrame signal, baseline version, input columns)
+BASELINE_SIGNALS = {
+    'get_cross_signal': (get_cross_signal, get_baseline_cross_signal, ['SMA5', 'SMA30']),
+    'get_cross_signal price': (get_cross_signal, get_baseline_cross_signal, ['ClosePrice', 'SMA30']),
+    'get_macd_signal': (get_macd_signal, get_baseline_macd_signal, ['MACDSignal', 'MACD']),
+    'get_rsi_signal': (get_rsi_signal, get_baseline_rsi_signal, ['RSI']),
+}
+
+def check_baseline_signals(rows=5000, signals=BASELINE_SIGNALS):
+    """
+    The DataFrame signals against their baseline versions (pandas masks, signal.at[0, 'value'] and
+    remove_repeated_signal), as assigned to the candles by update_signal_by_strategy, with the DatetimeIndex of the
+    candles (no forced buy) and with a RangeIndex (buy on the first bar).
+    Returns the list of the (signal, index) with different values (empty if all of them are equal).
+    """
+    df = add_technical_indicators(get_benchmark_data(rows), ['SMA5', 'SMA30', 'MACD', 'RSI'])
+
+    different = []
+    for index in [df.index, pd.RangeIndex(rows)]:
+        data = df.set_axis(index)
+        for name, (function, baseline_function, columns) in signals.items():
+            result = pd.DataFrame(index=index)
+            result['signal'] = function(*[data[[column]].copy() for column in columns])
+            result['baseline'] = baseline_function(*[data[[column]].copy() for column in columns])
+            if not result['signal'].equals(result['baseline']):
+                different.append((name, type(index).__name__))
+    print('Baseline DataFrame signals ({} rows, DatetimeIndex and RangeIndex): different signals: {}'.format(rows, different))
+
+    return different
+
+BACKTEST_STRATEGIES = ['Signal30SMAStrategy', 'SignalRSIStrategy70_30', 'SignalMACDStrategy', 'SignalSMACROSSStrategy5_30']
+BACKTEST_STATS = {'total_return': 'total_return', 'cagr': 'cagr', 'max_drawdown': 'max_drawdown', 'sharpe': 'daily_sharpe'}
+
+def check_backtest(rows=10000, signal_columns=BACKTEST_STRATEGIES, fees=[0.0, 0.00075], rtol=1e-9):
+    """
+    Cross-check of the vectorized backtest (signal_backtest) against bt (signal_strategy): the equity curve and the
+    stats of each strategy, without and with the exchange fee.
+    Returns the list of the (strategy, fee) with different results (empty if all of them are equal).
+    """
+    df = get_benchmark_data(rows)
+    price_data = df[['ClosePrice']]
+
+    different = []
+    for signal_column in signal_columns:
+        signal = update_signal_by_strategy(df.copy(), signal_column)[[signal_column]]
+        for fee in fees:
+            bt_time, backtest = get_time(lambda: signal_strategy(price_data.copy(), signal, signal_column, fee=fee))
+            run_time, _ = get_time(backtest.run)
+            expected = bt.backtest.Result(backtest)
+            vector_time, result = get_time(signal_backtest, price_data, signal, fee, repeat=3)
+
+            equity = result['equity'].to_numpy() / result['equity'].iloc[0] * 100
+            equal = (np.allclose(equity, expected.prices[signal_column].to_numpy(), rtol=rtol, atol=0)
+                     and all([np.isclose(result[key], expected.stats[signal_column][stat], rtol=rtol, atol=0)
+                              for key, stat in BACKTEST_STATS.items()]))
+            if not equal:
+                different.append((signal_column, fee))
+            print('Backtest {} fee {} ({} rows, {} trades): bt {:.2f}s, vectorized {:.4f}s, speed-up {:.0f}x, equal: {}'.format(
+                signal_column, fee, rows, len(result['trades']), bt_time + run_time, vector_time,
+                (bt_time + run_time) / vector_time, equal))
+
+    return different
+
+def check_backfill(symbols=4, days=30, latency=0.05, weight_limit=6000, max_symbols=4, max_pages=8):
+    """
+    Backfill of the symbols from the fake exchange, with latency by request and its request weight limit: the klines
+    of backfill_symbols (concurrent pages) against the sequential pages of get_historical_klines.
+    Returns the list of the symbols with different klines (empty if all of them are equal).
+    """
+    symbol_list = ['BF{}USDT'.format(chr(ord('A') + i)) for i in range(symbols)]
+    with tempfile.TemporaryDirectory() as path:
+        for i, symbol in enumerate(symbol_list):
+            write_candles(path, symbol, get_synthetic_ohlcv(days * 1440, seed=i))
+        exchange = FakeExchange(path, symbol_list, start=pd.Timestamp('2020-01-01') + pd.Timedelta(days=days),
+                                weight_limit=weight_limit, latency=latency)
+    client = FakeClient(exchange)
+    end_ms = exchange.current_time - 1
+
+    start = time.perf_counter()
+    expected = {symbol: client.get_historical_klines(symbol, '1m', 0, end_ms) for symbol in symbol_list}
+    sequential_time = time.perf_counter() - start
+
+    klines = {}
+    start = time.perf_counter()
+    backfill_symbols(client, symbol_list,
+                     lambda concurrent_client, symbol: concurrent_client.get_historical_klines(symbol, '1m', 0, end_ms),
+                     klines.__setitem__, max_symbols=max_symbols, max_pages=max_pages, weight_limit=weight_limit,
+                     on_progress=None)
+    concurrent_time = time.perf_counter() - start
+
+    different = [symbol for symbol in symbol_list if klines.get(symbol) != expected[symbol]]
+    print('Backfill {} symbols x {} days (latency {:.0f}ms): sequential {:.2f}s, concurrent {:.2f}s, speed-up {:.1f}x, '
+          'different symbols: {}'.format(symbols, days, latency * 1000, sequential_time, concurrent_time,
+                                         sequential_time / concurrent_time, different))
+
+    return different
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Indicators and signals benchmarks')
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'], choices=list(SIZES))
+    parser.add_argument('--names', nargs='+', help='functions to benchmark, default: all')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak memory (faster)')
+    parser.add_argument('--output', help='JSON file of the results, default: stdout')
+    parser.add_argument('--save-golden', action='store_true', help='rewrite the golden outputs and exit')
+    parser.add_argument('--compare', action='store_true', help='compare the optimized and reference versions and exit')
+    args = parser.parse_args()
+
+    if args.save_golden:
+        save_golden()
+        sys.exit()
+
+    if args.compare:
+        failures = {}
+        for check in [benchmark_wilder_smoothing, benchmark_moving_average_bank, benchmark_hurst, check_streaming_indicators,
+                      check_aggregator, check_live_signals, check_baseline_signals, check_backtest, check_backfill]:
+            different = check()
+            if different:
+                failures[check.__name__] = different
+
+        for name, different in failures.items():
+            print('Failed {}: {}'.format(name, different), file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    drift = check_golden()
+    for key, description in drift.items():
+        print('Drift {}: {}'.format(key, description), file=sys.stderr)
+
+    report = run_benchmarks(args.sizes, args.names, args.repeat, not args.no_memory)
+    report['golden_drift'] = drift
+
+    if args.output is None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    # the benchmarks are reported with the drift, but the run fails
+    sys.exit(1 if drift else 0)
@@ -8,6 +8,8 @@ from binance.client import Client
 from binance import ThreadedWebsocketManager
 from binance.exceptions import BinanceAPIException, BinanceOrderException
 from binance.enums import *
+from binance.helpers import interval_to_milliseconds
+from fake_exchange_utils import FakeClient, FakeWebsocketManager
 
 """ To read a cfg file
 import configparser
@@ -34,12 +36,19 @@ def get_credentials(test=False):
     
     return api_key, api_secret
 
-def init():
+def init(exchange=None):
+    # local fake exchange (offline/load tests)
+    if exchange is not None:
+        return FakeClient(exchange)
+
     api_key, api_secret = get_credentials()
 
     return Client(api_key, api_secret, {"timeout": 15})
 
-def init_test():
+def init_test(exchange=None):
+    if exchange is not None:
+        return FakeClient(exchange)
+
     api_key, api_secret = get_credentials(test=True)
 
     client = Client(api_key, api_secret)
@@ -70,7 +79,63 @@ def get_last_timestamp_from(df):
     
     return last_timestamp_from_df * 1000
 
-def update_historical_data(client, df, pair, interval):
+def get_missing_ranges(index, interval='1m'):
+    """
+    Find the missing candles inside a sorted DatetimeIndex (exchange outages, crashed runs, ...).
+    Returns a list of tuples (start, end) with the timestamps in milliseconds of the first and last missing candle.
+    """
+    if len(index) < 2:
+        return []
+
+    step = interval_to_milliseconds(interval) * 1000000
+    values = index.asi8
+    gaps = np.flatnonzero(np.diff(values) > step)
+
+    return [(int(values[i] + step) // 1000000, int(values[i + 1] - step) // 1000000) for i in gaps]
+
+def get_gap_empty_ranges(gap_start, gap_end, index, interval='1m'):
+    """
+    Returns the ranges (start, end) of the gap (timestamps in milliseconds) that are still missing after the
+    candles returned by the exchange for the gap (index), the exchange has no candles for them.
+    """
+    step = interval_to_milliseconds(interval)
+    times = np.concatenate([[gap_start - step], index.asi8 // 1000000, [gap_end + step]])
+    gaps = np.flatnonzero(np.diff(times) > step)
+
+    return [(int(times[i] + step), int(times[i + 1] - step)) for i in gaps]
+
+def merge_sorted(df, df_new):
+    """
+    Merge two DataFrames sorted by the index. Rows of df_new with an index already in df are ignored.
+    The insert positions are found with a binary search, there is no hash of the whole history.
+    """
+    if df_new.size == 0:
+        return df
+    if df.size == 0:
+        return df_new
+    if df_new.index[0] > df.index[-1]:
+        # most common case, only new candles at the end
+        return pd.concat([df, df_new])
+
+    positions = df.index.searchsorted(df_new.index)
+    exists = positions < len(df)
+    exists[exists] = df.index[positions[exists]] == df_new.index[exists]
+    df_new = df_new[~exists]
+    positions = positions[~exists]
+
+    values = np.insert(df.to_numpy(), positions, df_new[df.columns].to_numpy(), axis=0)
+    index = pd.DatetimeIndex(np.insert(df.index.values, positions, df_new.index.values), name=df.index.name)
+
+    return pd.DataFrame(values, index=index, columns=df.columns)
+
+def get_new_historical_data(client, df, pair, interval, fill_gaps=True, start=None, end=None, empty_ranges=None):
+    """
+    Returns only the candles that are not in df yet: before the first, after the last candle and, 
+    if fill_gaps, the missing candles between them. Only the missing ranges are requested to the exchange.
+    start and end (timestamps in milliseconds) bound the requested candles, df has the stored candles of this range.
+    empty_ranges: set of the gaps (start, end) that the exchange returned empty (outages), they are not requested
+    again and the new ones are added to the set.
+    """
     last_timestamp_from_df = get_last_timestamp_from(df)
 
     # get timestamp of earliest date data is available
@@ -78,30 +143,55 @@ def update_historical_data(client, df, pair, interval):
 
     if last_timestamp_from_df > timestamp:
         timestamp = last_timestamp_from_df
-
-    df_binance = get_crypto_data(client, pair, interval, timestamp)
-    # remove incomplete candle
-    df_binance = df_binance[:-1]
+    if start is not None and start > timestamp:
+        timestamp = start
+
+    if end is not None and timestamp >= end:
+        # the range is already stored until its end
+        df_binance = pd.DataFrame(columns=['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'Volume'],
+                                  index=pd.DatetimeIndex([], name='OpenTime'),
+                                  dtype='float')
+    else:
+        df_binance = get_crypto_data(client, pair, interval, timestamp, end)
+        if end is None or end >= datetime.now().timestamp() * 1000:
+            # remove incomplete candle
+            df_binance = df_binance[:-1]
 
     if df.size > 0:
         df_binance_before = df_binance[df_binance.index < df.index[0]]
         df_binance_after = df_binance[df_binance.index > df.index[-1]]
+        df_list = [df_binance_before, df_binance_after]
 
-        df = pd.concat([df_binance_before, df, df_binance_after])
-        df.drop_duplicates(inplace=True)
+        if fill_gaps:
+            for gap_start, gap_end in get_missing_ranges(df.index, interval):
+                if empty_ranges is not None and (gap_start, gap_end) in empty_ranges:
+                    continue
 
-        return df
+                df_gap = get_crypto_data(client, pair, interval, gap_start, gap_end)
+                df_list.append(df_gap)
+                if empty_ranges is not None:
+                    empty_ranges.update(get_gap_empty_ranges(gap_start, gap_end, df_gap.index, interval))
+
+        return pd.concat(df_list).sort_index()
     else:
         return df_binance
 
-def get_twm():
+def update_historical_data(client, df, pair, interval):
+    df_binance = get_new_historical_data(client, df, pair, interval)
+
+    return merge_sorted(df, df_binance)
+
+def get_twm(exchange=None, speed=60.0):
+    if exchange is not None:
+        return FakeWebsocketManager(exchange, speed=speed)
+
     api_key, api_secret = get_credentials()
 
     return ThreadedWebsocketManager(api_key = api_key, api_secret = api_secret)
 
-def get_crypto_data(client, pair, interval, timestamp):
+def get_crypto_data(client, pair, interval, timestamp, end_timestamp=None):
     # request historical candle (or klines) data
-    data = client.get_historical_klines(pair, interval, timestamp)
+    data = client.get_historical_klines(pair, interval, timestamp, end_timestamp)
 
     df_crypto = pd.DataFrame(data, columns=[
         'OpenTime', 
@@ -0,0 +1,320 @@
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+from pathlib import Path
+
+from candle_utils import encode_column, decode_column
+
+"""
+Candle store partitioned by symbol and month:
+
+<path>/<PAIR>-1m-binance/<YYYY-MM>.parquet
+
+Each month is an independent parquet file, so updating the history only rewrites
+the months that received new candles (usually the current one).
+
+Files are sorted by OpenTime and written in row groups of one week, so a date range read (read_candles with
+start/end) opens only the months of the range and decodes only the row groups that overlap it (statistics).
+
+Months could be written in a compact format (compact=True): columns encoded with no loss as scaled integers or
+float32 (see encode_column), the encodings are kept in the schema metadata and the columns are decoded to float64
+when read, so the DataFrames are the same.
+"""
+
+# one week of 1m candles by row group (4-5 row groups by month)
+ROW_GROUP_SIZE = 7 * 1440
+
+def get_store_path(path, pair):
+    return Path(path) / (pair + '-1m-binance')
+
+def get_partition_filename(path, pair, month):
+    return get_store_path(path, pair) / (month + '.parquet')
+
+def get_store_pairs(path):
+    """
+    Returns a sorted list with the pairs stored in path.
+    """
+    return sorted([f.name[:-len('-1m-binance')] for f in Path(path).glob('*-1m-binance') if f.is_dir()])
+
+def get_partition_months(path, pair):
+    """
+    Returns a sorted list with the months ('YYYY-MM') stored for the pair.
+    """
+    store_path = get_store_path(path, pair)
+    if not store_path.is_dir():
+        return []
+
+    return sorted([f.stem for f in store_path.glob('*.parquet')])
+
+def get_month_slices(df):
+    """
+    Split a DataFrame sorted by its DatetimeIndex in monthly slices without grouping (hashing) the index.
+    Returns a list of tuples (month, DataFrame).
+    """
+    if df.size == 0:
+        return []
+
+    first_month = df.index[0].to_period('M')
+    last_month = df.index[-1].to_period('M')
+    months = pd.period_range(first_month, last_month, freq='M')
+    bounds = df.index.searchsorted(months.to_timestamp())
+    bounds = list(bounds) + [len(df)]
+
+    slices = []
+    for i in range(len(months)):
+        if bounds[i + 1] > bounds[i]:
+            slices.append((months[i].strftime('%Y-%m'), df.iloc[bounds[i]:bounds[i + 1]]))
+
+    return slices
+
+def encode_table(df):
+    """
+    Returns a table with the columns of df encoded (compact format).
+    """
+    encodings = {}
+    df_encoded = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        df_encoded[column], encodings[column] = encode_column(df[column].to_numpy())
+
+    table = pa.Table.from_pandas(df_encoded)
+    metadata = dict(table.schema.metadata)
+    metadata[b'candle_encodings'] = json.dumps(encodings).encode()
+
+    return table.replace_schema_metadata(metadata)
+
+def decode_table(table):
+    """
+    Returns the table with float64 columns if it is in the compact format, otherwise the same table.
+    """
+    metadata = table.schema.metadata or {}
+    if b'candle_encodings' not in metadata:
+        return table
+
+    encodings = json.loads(metadata[b'candle_encodings'])
+    for column, encoding in encodings.items():
+        i = table.schema.get_field_index(column)
+        if i >= 0:
+            values = decode_column(table.column(i).to_numpy(), encoding)
+            table = table.set_column(i, column, pa.array(values, type=pa.float64()))
+
+    return table
+
+def is_compact_partition(path, pair, month):
+    filename = get_partition_filename(path, pair, month)
+
+    return filename.exists() and b'candle_encodings' in (pq.read_schema(filename).metadata or {})
+
+def is_compact_month(path, pair, month):
+    """
+    Format of the month when it is written with compact=None: the format of the stored month, a new month has the
+    format of the previous month stored (float64 if there is none).
+    """
+    months = [m for m in get_partition_months(path, pair) if m <= month]
+
+    return len(months) > 0 and is_compact_partition(path, pair, months[-1])
+
+def write_partition(path, pair, month, df, compact=False):
+    filename = get_partition_filename(path, pair, month)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
+    # write to a temporary file and replace it, a crash never leaves a broken month behind
+    tmp_filename = filename.with_suffix('.parquet.tmp')
+    options = {}
+    if compact:
+        table = encode_table(df)
+        # open times and scaled integers are (almost) constant increments, floats compress better split by byte
+        options['column_encoding'] = {'OpenTime': 'DELTA_BINARY_PACKED'}
+        for field in table.schema:
+            if pa.types.is_integer(field.type):
+                options['column_encoding'][field.name] = 'DELTA_BINARY_PACKED'
+            elif pa.types.is_floating(field.type):
+                options['column_encoding'][field.name] = 'BYTE_STREAM_SPLIT'
+        options['use_dictionary'] = False
+        options['compression'] = 'zstd'
+    else:
+        table = pa.Table.from_pandas(df)
+
+    pq.write_table(table, tmp_filename,
+                   row_group_size=ROW_GROUP_SIZE,
+                   sorting_columns=[pq.SortingColumn(table.schema.get_field_index('OpenTime'))],
+                   **options)
+    os.replace(tmp_filename, filename)
+
+def read_partition(path, pair, month):
+    filename = get_partition_filename(path, pair, month)
+    try:
+        return decode_table(pq.read_table(filename)).to_pandas()
+    except FileNotFoundError:
+        return None
+
+def get_empty_ranges_filename(path, pair):
+    return get_store_path(path, pair) / 'empty-ranges.json'
+
+def read_empty_ranges(path, pair):
+    """
+    Returns the set of the ranges (start, end), timestamps in milliseconds, without candles in the exchange
+    (outages) found for the pair, see get_new_historical_data.
+    """
+    filename = get_empty_ranges_filename(path, pair)
+    if not filename.is_file():
+        return set()
+
+    with open(filename) as f:
+        return set([tuple(empty_range) for empty_range in json.load(f)])
+
+def write_empty_ranges(path, pair, empty_ranges):
+    filename = get_empty_ranges_filename(path, pair)
+    filename.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(filename, 'w') as f:
+        json.dump(sorted(empty_ranges), f)
+
+def get_time_bounds(start=None, end=None):
+    """
+    Returns the first and last timestamps selected by df[start:end], start and end could be partial
+    date strings ('2022', '2022-12', '2022-12-31') like in the slice of a DataFrame.
+    """
+    if start is not None:
+        start = pd.Period(start).start_time if isinstance(start, str) else pd.Timestamp(start)
+    if end is not None:
+        end = pd.Period(end).end_time if isinstance(end, str) else pd.Timestamp(end)
+
+    return start, end
+
+def get_partition_bounds(path, pair, month):
+    """
+    Returns the first and last open time of the month (from the parquet statistics, no data is read)
+    or (None, None) if the month has no candles.
+    """
+    metadata = pq.ParquetFile(get_partition_filename(path, pair, month)).metadata
+    if metadata.num_rows == 0:
+        return None, None
+
+    bounds = []
+    for row_group, stat in [(0, 'min'), (metadata.num_row_groups - 1, 'max')]:
+        row_group = metadata.row_group(row_group)
+        for i in range(row_group.num_columns):
+            if row_group.column(i).path_in_schema == 'OpenTime':
+                bounds.append(pd.Timestamp(getattr(row_group.column(i).statistics, stat)))
+
+    return tuple(bounds)
+
+def get_store_bounds(path, pair):
+    """
+    Returns the first and last open time stored for the pair (from the parquet statistics, no data is read)
+    or (None, None) if the pair has no data in the store.
+    """
+    months = get_partition_months(path, pair)
+    if len(months) == 0:
+        return None, None
+
+    return get_partition_bounds(path, pair, months[0])[0], get_partition_bounds(path, pair, months[-1])[1]
+
+def read_candles(path, pair, start=None, end=None, columns=None):
+    """
+    Read the months stored for the pair. Returns None if the pair has no data in the store (or in the range).
+
+    Parameters
+    - start, end: first and last candles (inclusive), timestamps or partial date strings with the same range of
+                  df[start:end] ('2022-12' is all December, see get_time_bounds), only the months and row groups
+                  of the range are read (predicate pushdown)
+    - columns: list of columns to read, default: all
+    """
+    start, end = get_time_bounds(start, end)
+
+    months = get_partition_months(path, pair)
+    if start is not None:
+        months = [month for month in months if month >= start.strftime('%Y-%m')]
+    if end is not None:
+        months = [month for month in months if month <= end.strftime('%Y-%m')]
+    if len(months) == 0:
+        return None
+
+    time_filter = None
+    if start is not None:
+        time_filter = ds.field('OpenTime') >= start
+    if end is not None:
+        end_filter = ds.field('OpenTime') <= end
+        time_filter = end_filter if time_filter is None else time_filter & end_filter
+
+    # each month is decoded by itself, the store could have compact and float64 months
+    tables = [decode_table(pq.read_table(get_partition_filename(path, pair, month),
+                                         columns=columns,
+                                         filters=time_filter,
+                                         use_pandas_metadata=True)) for month in months]
+    table = pa.concat_tables(tables)
+
+    if table.num_rows == 0:
+        return None
+
+    df = table.to_pandas()
+    if not df.index.is_monotonic_increasing:
+        df.sort_index(inplace=True)
+
+    return df
+
+def write_candles(path, pair, df, compact=False):
+    """
+    Write (replace) every month present in the DataFrame.
+    """
+    for month, df_month in get_month_slices(df):
+        write_partition(path, pair, month, df_month, compact=compact)
+
+def append_candles(path, pair, df_new, compact=None):
+    """
+    Merge new candles in the store, only the months touched by df_new are rewritten.
+    compact: None - keep the format of the stored month (a new month is compact if the previous month is compact).
+    """
+    for month, df_month in get_month_slices(df_new):
+        df_stored = read_partition(path, pair, month)
+
+        if df_stored is not None and df_stored.size > 0:
+            df_month = pd.concat([df_stored, df_month])
+            # new candles replace the stored ones with the same open time
+            df_month = df_month[~df_month.index.duplicated(keep='last')]
+            df_month = df_month.sort_index()
+
+        is_compact = compact if compact is not None else is_compact_month(path, pair, month)
+        write_partition(path, pair, month, df_month, compact=is_compact)
+
+def compact_candles(path, pair, compact=True):
+    """
+    Rewrite all months of the pair in the compact format (or back to float64 with compact=False).
+    """
+    for month in get_partition_months(path, pair):
+        write_partition(path, pair, month, read_partition(path, pair, month), compact=compact)
+
+def read_single_file_candles(path, pair):
+    """
+    Read the candles from the old single file layout (<PAIR>-1m-binance-all.parquet or <PAIR>-1m-binance.parquet).
+    Returns None if there is no file.
+    """
+    filename = Path(path) / (pair + '-1m-binance.parquet')
+    filename_all = Path(path) / (pair + '-1m-binance-all.parquet')
+
+    for f in [filename_all, filename]:
+        try:
+            return pq.read_table(f).to_pandas()
+        except FileNotFoundError:
+            continue
+
+    return None
+
+def migrate_single_file(path, pair):
+    """
+    One-time migration from the single file layout to the partitioned store.
+    The old files are kept, remove them by hand after checking the store.
+    Returns the migrated DataFrame or None if there is nothing to migrate.
+    """
+    df = read_single_file_candles(path, pair)
+
+    if df is None or df.size == 0:
+        return df
+
+    print('Migrating ' + pair + ' to the partitioned candle store (' + str(len(df)) + ' candles)...')
+    write_candles(path, pair, df)
+
+    return df
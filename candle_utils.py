@@ -0,0 +1,298 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+OHLCV_COLUMNS = ['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'Volume']
+
+class CandleBuffer:
+    """
+    Columnar OHLCV container with amortized O(1) appends.
+
+    Candles are kept in preallocated NumPy arrays that grow in chunks (half of the current capacity,
+    at least chunk_size rows). With max_size the buffer works as a ring: only the last max_size candles
+    are kept and the arrays are never reallocated, the oldest candles are discarded moving the last
+    max_size rows to the beginning of the arrays when the end is reached (twice the max_size is allocated,
+    so the move happens once every max_size appends).
+
+    frame() returns a DataFrame that shares memory with the buffer (no copy), it must be treated as read only
+    and it is invalid after the next append, call frame() again to get the new candles.
+    """
+
+    def __init__(self, capacity=1024, max_size=None, chunk_size=1024):
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+
+        if max_size is not None:
+            capacity = 2 * max_size
+
+        self._times = np.empty(capacity, dtype='datetime64[ns]')
+        self._values = np.empty((len(OHLCV_COLUMNS), capacity), dtype='float64')
+        self._start = 0
+        self._end = 0
+
+    @classmethod
+    def from_frame(cls, df, max_size=None, chunk_size=1024):
+        if max_size is not None:
+            df = df[-max_size:]
+
+        buffer = cls(capacity=len(df) + chunk_size, max_size=max_size, chunk_size=chunk_size)
+        size = len(df)
+        buffer._times[:size] = df.index.values.astype('datetime64[ns]')
+        for i, column in enumerate(OHLCV_COLUMNS):
+            buffer._values[i, :size] = df[column].to_numpy(dtype='float64')
+        buffer._end = size
+
+        return buffer
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def capacity(self):
+        return self._times.size
+
+    def _make_room(self):
+        size = len(self)
+
+        if self.max_size is not None:
+            # ring: move the last candles to the beginning of the arrays
+            self._times[:size] = self._times[self._start:self._end]
+            self._values[:, :size] = self._values[:, self._start:self._end]
+        else:
+            capacity = self.capacity + max(self.chunk_size, self.capacity // 2)
+            times = np.empty(capacity, dtype='datetime64[ns]')
+            values = np.empty((len(OHLCV_COLUMNS), capacity), dtype='float64')
+            times[:size] = self._times[self._start:self._end]
+            values[:, :size] = self._values[:, self._start:self._end]
+            self._times = times
+            self._values = values
+
+        self._start = 0
+        self._end = size
+
+    def append(self, open_time, open_price, high_price, low_price, close_price, volume):
+        if self._end == self.capacity:
+            self._make_room()
+
+        pos = self._end
+        self._times[pos] = np.datetime64(open_time, 'ns')
+        values = self._values
+        values[0, pos] = open_price
+        values[1, pos] = high_price
+        values[2, pos] = low_price
+        values[3, pos] = close_price
+        values[4, pos] = volume
+        self._end += 1
+
+        if self.max_size is not None and len(self) > self.max_size:
+            self._start += 1
+
+    def append_row(self, row):
+        """
+        Append a row (dict) in the format created from the kline socket message, values can be strings.
+        """
+        self.append(row['OpenTime'],
+            float(row['OpenPrice']),
+            float(row['HighPrice']),
+            float(row['LowPrice']),
+            float(row['ClosePrice']),
+            float(row['Volume']))
+
+    @property
+    def index(self):
+        return pd.DatetimeIndex(self._times[self._start:self._end], name='OpenTime', copy=False)
+
+    def get_column(self, column):
+        """
+        Returns a NumPy view of the column.
+        """
+        return self._values[OHLCV_COLUMNS.index(column), self._start:self._end]
+
+    def frame(self):
+        """
+        Returns a DataFrame (view, no copy) with the candles.
+        """
+        return pd.DataFrame(self._values[:, self._start:self._end].T,
+                            index=self.index,
+                            columns=OHLCV_COLUMNS,
+                            copy=False)
+
+DAY_NS = 86400 * 1000000000
+OHLCV_SUMMARIES = {'OpenPrice': 'first', 'HighPrice': 'max', 'LowPrice': 'min', 'ClosePrice': 'last', 'Volume': 'sum'}
+
+def get_bin_labels(values, interval, origin):
+    """
+    Returns the labels (int64 nanoseconds) of the bins used by DataFrame.resample(interval) for the timestamps
+    in values (int64 nanoseconds), origin is the first day of the data (default origin='start_day' of resample).
+
+    Supported intervals: fixed frequencies (min, h, D, ...), weeks (W, closed and labeled at the right) and 
+    month end (M, closed and labeled at the right).
+    """
+    offset = to_offset(interval)
+
+    if isinstance(offset, pd.offsets.Week) and offset.weekday is not None and offset.n == 1:
+        days = values - values % DAY_NS
+        # 1970-01-01 was a thursday (weekday 3)
+        weekdays = (days // DAY_NS + 3) % 7
+        return days + ((offset.weekday - weekdays) % 7) * DAY_NS
+    elif isinstance(offset, pd.offsets.MonthEnd) and offset.n == 1:
+        months = values.astype('datetime64[ns]').astype('datetime64[M]')
+        return ((months + 1).astype('datetime64[D]') - 1).astype('datetime64[ns]').astype('int64')
+    elif isinstance(offset, pd.offsets.Tick):
+        step = pd.Timedelta(offset).value
+        return origin + (values - origin) // step * step
+
+    raise ValueError('Interval not supported: ' + str(interval))
+
+def get_bin_width(interval):
+    """
+    Returns the maximum width (Timedelta) of a bin of the interval.
+    """
+    offset = to_offset(interval)
+
+    if isinstance(offset, pd.offsets.Tick):
+        return pd.Timedelta(offset)
+
+    return pd.Timedelta(days=31 * offset.n if isinstance(offset, pd.offsets.MonthEnd) else 7 * offset.n)
+
+class CandleAggregator:
+    """
+    Streaming OHLCV aggregator for several intervals, its output is identical to resample_data (trade_utils).
+
+    It is seeded once from the 1m history, then only the current (incomplete) bar of each interval is updated
+    for each new 1m candle. Finished bars are kept in a CandleBuffer by interval.
+    The volume is summed with the same compensated (Kahan) sum of pandas, so the values are identical too.
+
+    The resample origin of fixed intervals (e.g. 3D) is the first day of the history used to seed the aggregator.
+    The finished bars are kept even if the 1m candles are discarded (ring mode of CandleBuffer).
+    """
+
+    def __init__(self, df, intervals):
+        self.origin = df.index[0].normalize().value
+        self.offsets = {}
+        self.steps = {}
+        self.bars = {}
+        self.current = {}
+
+        for interval in intervals:
+            self.add_interval(df, interval)
+
+    def add_interval(self, df, interval):
+        self.offsets[interval] = to_offset(interval)
+        if isinstance(self.offsets[interval], pd.offsets.Tick):
+            self.steps[interval] = pd.Timedelta(self.offsets[interval]).value
+
+        df_resample = df.resample(interval).agg(OHLCV_SUMMARIES)
+        df_resample.dropna(inplace=True)
+        self.bars[interval] = CandleBuffer.from_frame(df_resample[:-1])
+
+        # replay the candles of the incomplete bar to get the same compensation of the volume sum
+        labels = get_bin_labels(df.index.asi8, interval, self.origin)
+        start = labels.searchsorted(labels[-1])
+        label = int(labels[-1])
+        self.current[interval] = None
+        for row in df.iloc[start:].itertuples():
+            self._update_bar(interval, label, row.OpenPrice, row.HighPrice, row.LowPrice, row.ClosePrice, row.Volume)
+
+    def _update_bar(self, interval, label, open_price, high_price, low_price, close_price, volume):
+        bar = self.current[interval]
+
+        if bar is not None and bar[0] == label:
+            if high_price > bar[2]:
+                bar[2] = high_price
+            if low_price < bar[3]:
+                bar[3] = low_price
+            bar[4] = close_price
+            # compensated sum (same algorithm of pandas)
+            y = volume - bar[6]
+            t = bar[5] + y
+            bar[6] = t - bar[5] - y
+            bar[5] = t
+        else:
+            if bar is not None:
+                self.bars[interval].append(np.datetime64(int(bar[0]), 'ns'), bar[1], bar[2], bar[3], bar[4], bar[5])
+            self.current[interval] = [label, open_price, high_price, low_price, close_price, volume, 0.0]
+
+    def _get_bin_label(self, interval, value):
+        offset = self.offsets[interval]
+
+        if isinstance(offset, pd.offsets.Tick):
+            # fast path with python integers, the same of get_bin_labels
+            step = self.steps[interval]
+            return self.origin + (value - self.origin) // step * step
+
+        return int(get_bin_labels(np.array([value]), interval, self.origin)[0])
+
+    def append(self, open_time, open_price, high_price, low_price, close_price, volume):
+        value = int(np.datetime64(open_time, 'ns').astype('int64'))
+
+        for interval in self.bars:
+            label = self._get_bin_label(interval, value)
+            self._update_bar(interval, label, open_price, high_price, low_price, close_price, volume)
+
+    def append_row(self, row):
+        self.append(row['OpenTime'],
+            float(row['OpenPrice']),
+            float(row['HighPrice']),
+            float(row['LowPrice']),
+            float(row['ClosePrice']),
+            float(row['Volume']))
+
+    def get_frame(self, interval, df=None):
+        """
+        Returns the finished bars of the interval (view, no copy), the same of resample_data(df, interval).
+        If the interval is not aggregated yet, it is added from df (1m history, including the last candle).
+        """
+        if interval not in self.bars:
+            self.add_interval(df, interval)
+
+        return self.bars[interval].frame()
+
+# Binance prices and quantities have up to 8 decimals
+COMPACT_MAX_DECIMALS = 8
+
+def get_decimals(values, max_decimals=COMPACT_MAX_DECIMALS):
+    """
+    Returns the number of decimals of the values (all of them are rounded at it) or None if greater than max_decimals.
+    """
+    for decimals in range(max_decimals + 1):
+        if np.array_equal(np.round(values, decimals), values):
+            return decimals
+
+    return None
+
+def encode_column(values):
+    """
+    Encode a float64 column with no loss in the smallest type: int32 or int64 scaled by 10**decimals, or float32
+    restored rounding at the decimals. Returns the encoded array and the encoding (dict), float64 if nothing fits.
+    """
+    values = np.asarray(values, dtype='float64')
+    decimals = get_decimals(values) if np.isfinite(values).all() else None
+
+    if decimals is not None:
+        scaled = np.round(values * 10.0**decimals)
+        max_scaled = np.abs(scaled).max(initial=0)
+        is_exact = max_scaled < 2**53 and np.array_equal(scaled / 10.0**decimals, values)
+
+        if is_exact and max_scaled < 2**31:
+            return scaled.astype('int32'), {'dtype': 'int32', 'decimals': decimals}
+
+        values_float32 = values.astype('float32')
+        if np.array_equal(np.round(values_float32.astype('float64'), decimals), values):
+            return values_float32, {'dtype': 'float32', 'decimals': decimals}
+
+        if is_exact:
+            return scaled.astype('int64'), {'dtype': 'int64', 'decimals': decimals}
+
+    return values, {'dtype': 'float64', 'decimals': None}
+
+def decode_column(values, encoding):
+    """
+    Returns the float64 column of an encoded column (encode_column).
+    """
+    if encoding['dtype'] == 'float64':
+        return np.asarray(values, dtype='float64')
+    if encoding['dtype'] == 'float32':
+        return np.round(np.asarray(values, dtype='float64'), encoding['decimals'])
+
+    return np.asarray(values) / 10.0**encoding['decimals']
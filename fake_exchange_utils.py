@@ -0,0 +1,649 @@
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+from binance.exceptions import BinanceAPIException
+
+from candle_store_utils import read_candles, read_single_file_candles
+
+"""
+Local stand-in of Binance for offline and load tests.
+
+FakeExchange serves the 1m klines of the local candle store, simulates the balances, market and OCO orders
+and the request weight limit. FakeClient has the methods of binance.client.Client used by the project and
+FakeWebsocketManager the methods of binance.ThreadedWebsocketManager, it streams the stored candles as kline
+messages faster than real time (speed) and moves the exchange clock, so the orders are matched with these candles.
+
+exchange = FakeExchange('/path/to/data/', ['BTCUSDT', 'ETHUSDT'], start='2024-01-01', balances={'USDT': 1000.0})
+client = init_test(exchange)
+twm = get_twm(exchange)
+"""
+
+MINUTE_MS = 60000
+QUOTE_ASSETS = ['USDT', 'BUSD', 'USDC', 'FDUSD', 'TUSD', 'BRL', 'EUR', 'BTC', 'ETH', 'BNB']
+
+# request weight of each method (https://binance-docs.github.io/apidocs/spot/en/#limits)
+REQUEST_WEIGHTS = {
+    'klines': 2,
+    'order': 1,
+    'cancel_order': 1,
+    'open_orders': 6,
+    'all_open_orders': 80,
+    'account': 20,
+    'my_trades': 20,
+    'exchange_info': 20,
+    'ticker': 2,
+    'all_tickers': 4,
+}
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text=''):
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+        self.text = text
+        self.request = None
+
+def get_api_exception(code, message, status_code=400, headers=None):
+    text = json.dumps({'code': code, 'msg': message})
+
+    return BinanceAPIException(FakeResponse(status_code, headers, text), status_code, text)
+
+def get_symbol_assets(symbol):
+    for quote_asset in QUOTE_ASSETS:
+        if symbol.endswith(quote_asset) and len(symbol) > len(quote_asset):
+            return symbol[:-len(quote_asset)], quote_asset
+
+    raise ValueError('Unable to find the quote asset of ' + symbol)
+
+def format_value(value):
+    return '{:0.8f}'.format(value)
+
+class FakeExchange:
+    """
+    Parameters
+    - data_path: path of the candle store (see candle_store_utils)
+    - symbols: list of symbols loaded from the store
+    - start: exchange start time (the candles before it are the history, the candles after it are streamed),
+             default: first candle of the symbols
+    - balances: dict with the initial free balance by asset
+    - fee: fee charged by fill (in the received asset)
+    - tick_size, step_size, min_notional: symbol filters
+    - weight_limit: request weight limit by minute, 0 to disable
+    - latency: seconds added to each request (network latency)
+    """
+
+    def __init__(self,
+            data_path,
+            symbols,
+            start=None,
+            balances=None,
+            fee=0.00075,
+            tick_size=0.01,
+            step_size=0.00001,
+            min_notional=5.0,
+            weight_limit=6000,
+            latency=0.0):
+        self.fee = fee
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.min_notional = min_notional
+        self.weight_limit = weight_limit
+        self.latency = latency
+        self.lock = threading.RLock()
+
+        self.candles = {}
+        for symbol in symbols:
+            df = read_candles(data_path, symbol)
+            if df is None:
+                df = read_single_file_candles(data_path, symbol)
+            if df is None:
+                raise ValueError('No candles for ' + symbol + ' in ' + str(data_path))
+
+            self.candles[symbol] = {
+                'OpenTime': df.index.values.astype('datetime64[ms]').astype('int64'),
+                'OHLCV': df[['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'Volume']].to_numpy(dtype='float64'),
+            }
+
+        if start is None:
+            start = min([candles['OpenTime'][0] for candles in self.candles.values()])
+        else:
+            start = int(pd.Timestamp(start).value // 1000000)
+        # current time is the open time of the candle in formation (incomplete)
+        self.current_time = start - start % MINUTE_MS
+
+        self.balances = {}
+        for asset, free in (balances or {}).items():
+            self.balances[asset] = {'free': float(free), 'locked': 0.0}
+
+        self.orders = {}
+        self.trades = []
+        self.next_order_id = 1
+        self.next_order_list_id = 1
+
+        self.used_weight = 0
+        self.weight_minute = int(time.time() // 60)
+
+    ### request weight
+    def use_weight(self, request):
+        """
+        Count the request weight in the current (real) minute and raise the same error of Binance (429) over the limit.
+        """
+        weight = REQUEST_WEIGHTS[request]
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            minute = int(time.time() // 60)
+            if minute != self.weight_minute:
+                self.weight_minute = minute
+                self.used_weight = 0
+
+            self.used_weight += weight
+            if self.weight_limit and self.used_weight > self.weight_limit:
+                retry_after = str(int(60 - time.time() % 60) + 1)
+                raise get_api_exception(-1003, 'Too many requests; current limit is ' + str(self.weight_limit) + ' request weight per 1 MINUTE.',
+                                        status_code=429,
+                                        headers={'Retry-After': retry_after, 'x-mbx-used-weight-1m': str(self.used_weight)})
+
+            return FakeResponse(headers={'x-mbx-used-weight-1m': str(self.used_weight)})
+
+    ### market data
+    def get_candle_position(self, symbol, timestamp):
+        """
+        Position of the last candle with open time <= timestamp.
+        """
+        return int(self.candles[symbol]['OpenTime'].searchsorted(timestamp, side='right')) - 1
+
+    def get_price(self, symbol):
+        pos = self.get_candle_position(symbol, self.current_time)
+        if pos < 0:
+            raise get_api_exception(-1121, 'Invalid symbol.')
+
+        return float(self.candles[symbol]['OHLCV'][pos, 3])
+
+    def get_klines(self, symbol, start_time=None, end_time=None, limit=1000):
+        """
+        Klines with open time until the current time (the last one is the candle in formation).
+        """
+        if symbol not in self.candles:
+            raise get_api_exception(-1121, 'Invalid symbol.')
+
+        open_times = self.candles[symbol]['OpenTime']
+        end_time = self.current_time if end_time is None else min(end_time, self.current_time)
+        first = 0 if start_time is None else int(open_times.searchsorted(start_time))
+        last = int(open_times.searchsorted(end_time, side='right'))
+        last = min(last, first + limit)
+
+        values = self.candles[symbol]['OHLCV'][first:last].tolist()
+        times = open_times[first:last].tolist()
+
+        return [[t, format_value(o), format_value(h), format_value(l), format_value(c), format_value(v),
+                 t + MINUTE_MS - 1, '0', 0, '0', '0', '0'] for t, (o, h, l, c, v) in zip(times, values)]
+
+    def get_symbol_info(self, symbol):
+        base_asset, quote_asset = get_symbol_assets(symbol)
+
+        return {
+            'symbol': symbol,
+            'status': 'TRADING',
+            'baseAsset': base_asset,
+            'quoteAsset': quote_asset,
+            'baseAssetPrecision': 8,
+            'quoteAssetPrecision': 8,
+            'filters': [
+                {'filterType': 'PRICE_FILTER', 'minPrice': format_value(self.tick_size), 'maxPrice': '1000000.00000000', 'tickSize': format_value(self.tick_size)},
+                {'filterType': 'LOT_SIZE', 'minQty': format_value(self.step_size), 'maxQty': '9000.00000000', 'stepSize': format_value(self.step_size)},
+                {'filterType': 'NOTIONAL', 'minNotional': format_value(self.min_notional)},
+                {'filterType': 'MARKET_LOT_SIZE', 'minQty': '0.00000000', 'maxQty': '100.00000000'},
+            ]
+        }
+
+    ### balances
+    def get_balance(self, asset):
+        if asset not in self.balances:
+            self.balances[asset] = {'free': 0.0, 'locked': 0.0}
+
+        return self.balances[asset]
+
+    def get_quantity(self, quantity):
+        # trunc quantity to step size
+        return np.floor(round(quantity / self.step_size, 8)) * self.step_size
+
+    ### orders
+    def fill(self, order, price, quantity):
+        """
+        Update balances and create the trade of a filled order. Locked balances of SELL/BUY limit orders are released.
+        """
+        base_asset, quote_asset = get_symbol_assets(order['symbol'])
+        base = self.get_balance(base_asset)
+        quote = self.get_balance(quote_asset)
+        quote_quantity = price * quantity
+
+        if order['side'] == 'BUY':
+            commission = quantity * self.fee
+            commission_asset = base_asset
+            if order['type'] == 'MARKET':
+                quote['free'] -= quote_quantity
+            else:
+                # the quote asset was locked by the order price, the difference to the fill price returns to free
+                locked_quantity = float(order['price']) * quantity
+                quote['locked'] -= locked_quantity
+                quote['free'] += locked_quantity - quote_quantity
+            base['free'] += quantity - commission
+        else:
+            commission = quote_quantity * self.fee
+            commission_asset = quote_asset
+            if order['type'] == 'MARKET':
+                base['free'] -= quantity
+            else:
+                base['locked'] -= quantity
+            quote['free'] += quote_quantity - commission
+
+        order['status'] = 'FILLED'
+        order['executedQty'] = format_value(quantity)
+        order['cummulativeQuoteQty'] = format_value(quote_quantity)
+        order['updateTime'] = self.current_time
+
+        trade = {
+            'symbol': order['symbol'],
+            'id': len(self.trades) + 1,
+            'orderId': order['orderId'],
+            'orderListId': order['orderListId'],
+            'price': format_value(price),
+            'qty': format_value(quantity),
+            'quoteQty': format_value(quote_quantity),
+            'commission': format_value(commission),
+            'commissionAsset': commission_asset,
+            'time': self.current_time,
+            'isBuyer': order['side'] == 'BUY',
+            'isMaker': order['type'] != 'MARKET',
+            'isBestMatch': True,
+        }
+        self.trades.append(trade)
+
+        return {'price': trade['price'], 'qty': trade['qty'], 'commission': trade['commission'], 'commissionAsset': commission_asset, 'tradeId': trade['id']}
+
+    def new_order(self, symbol, side, order_type, quantity, price=0.0, stop_price=0.0, order_list_id=-1):
+        order = {
+            'symbol': symbol,
+            'orderId': self.next_order_id,
+            'orderListId': order_list_id,
+            'clientOrderId': 'fake' + str(self.next_order_id),
+            'price': format_value(price),
+            'origQty': format_value(quantity),
+            'executedQty': format_value(0.0),
+            'cummulativeQuoteQty': format_value(0.0),
+            'status': 'NEW',
+            'timeInForce': 'GTC',
+            'type': order_type,
+            'side': side,
+            'stopPrice': format_value(stop_price),
+            'time': self.current_time,
+            'updateTime': self.current_time,
+            'isWorking': order_type != 'STOP_LOSS_LIMIT',
+        }
+        self.next_order_id += 1
+        self.orders[order['orderId']] = order
+
+        return order
+
+    def create_market_order(self, symbol, side, quantity=None, quote_quantity=None):
+        with self.lock:
+            base_asset, quote_asset = get_symbol_assets(symbol)
+            price = self.get_price(symbol)
+
+            if quantity is None:
+                quantity = self.get_quantity(quote_quantity / price)
+            quantity = float(quantity)
+
+            if side == 'BUY' and self.get_balance(quote_asset)['free'] < quantity * price:
+                raise get_api_exception(-2010, 'Account has insufficient balance for requested action.')
+            if side == 'SELL' and self.get_balance(base_asset)['free'] < quantity:
+                raise get_api_exception(-2010, 'Account has insufficient balance for requested action.')
+            if quantity * price < self.min_notional:
+                raise get_api_exception(-1013, 'Filter failure: NOTIONAL')
+
+            order = self.new_order(symbol, side, 'MARKET', quantity)
+            fill = self.fill(order, price, quantity)
+            response = dict(order)
+            response['transactTime'] = self.current_time
+            response['fills'] = [fill]
+
+            return response
+
+    def create_oco_order(self, symbol, side, quantity, price, stop_price, stop_limit_price):
+        with self.lock:
+            base_asset, quote_asset = get_symbol_assets(symbol)
+            quantity = float(quantity)
+            price = float(price)
+            stop_price = float(stop_price)
+            stop_limit_price = float(stop_limit_price)
+            current_price = self.get_price(symbol)
+
+            if side == 'SELL':
+                if not (price > current_price > stop_price):
+                    raise get_api_exception(-2010, 'The relationship of the prices for the orders is not correct.')
+                balance = self.get_balance(base_asset)
+                amount = quantity
+            else:
+                if not (price < current_price < stop_price):
+                    raise get_api_exception(-2010, 'The relationship of the prices for the orders is not correct.')
+                balance = self.get_balance(quote_asset)
+                amount = quantity * max(price, stop_limit_price)
+
+            if balance['free'] < amount:
+                raise get_api_exception(-2010, 'Account has insufficient balance for requested action.')
+            balance['free'] -= amount
+            balance['locked'] += amount
+
+            order_list_id = self.next_order_list_id
+            self.next_order_list_id += 1
+            stop_order = self.new_order(symbol, side, 'STOP_LOSS_LIMIT', quantity, stop_limit_price, stop_price, order_list_id)
+            limit_order = self.new_order(symbol, side, 'LIMIT_MAKER', quantity, price, 0.0, order_list_id)
+            if side == 'BUY':
+                # the quote asset is locked by the highest price, the limit order unlocks by its own price
+                stop_order['price'] = format_value(max(price, stop_limit_price))
+                limit_order['price'] = format_value(max(price, stop_limit_price))
+                stop_order['fillPrice'] = stop_limit_price
+                limit_order['fillPrice'] = price
+
+            orders = [stop_order, limit_order]
+            return {
+                'orderListId': order_list_id,
+                'contingencyType': 'OCO',
+                'listStatusType': 'EXEC_STARTED',
+                'listOrderStatus': 'EXECUTING',
+                'transactionTime': self.current_time,
+                'symbol': symbol,
+                'orders': [{'symbol': symbol, 'orderId': o['orderId'], 'clientOrderId': o['clientOrderId']} for o in orders],
+                'orderReports': [dict(o) for o in orders],
+            }
+
+    def release(self, order):
+        base_asset, quote_asset = get_symbol_assets(order['symbol'])
+        quantity = float(order['origQty'])
+
+        if order['side'] == 'SELL':
+            balance = self.get_balance(base_asset)
+            amount = quantity
+        else:
+            balance = self.get_balance(quote_asset)
+            amount = quantity * float(order['price'])
+
+        balance['locked'] -= amount
+        balance['free'] += amount
+
+    def cancel_order(self, symbol, order_id):
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None or order['symbol'] != symbol or order['status'] != 'NEW':
+                raise get_api_exception(-2011, 'Unknown order sent.')
+
+            # cancel an order of an oco order cancels the whole list
+            if order['orderListId'] != -1:
+                orders = [o for o in self.orders.values() if o['orderListId'] == order['orderListId'] and o['status'] == 'NEW']
+                # the balance is locked once by list
+                self.release(order)
+            else:
+                orders = [order]
+                self.release(order)
+
+            for o in orders:
+                o['status'] = 'CANCELED'
+                o['updateTime'] = self.current_time
+
+            return dict(order)
+
+    def get_open_orders(self, symbol=None):
+        with self.lock:
+            return [dict(o) for o in self.orders.values() if o['status'] == 'NEW' and (symbol is None or o['symbol'] == symbol)]
+
+    def match_orders(self, symbol, high_price, low_price):
+        """
+        Match the open orders of the symbol with a closed candle. If the stop and the limit are both reached
+        in the same candle the stop is filled (worst case).
+        """
+        order_lists = {}
+        for order in self.orders.values():
+            if order['symbol'] == symbol and order['status'] == 'NEW':
+                order_lists.setdefault(order['orderListId'], {})[order['type']] = order
+
+        for orders in order_lists.values():
+            stop_order = orders.get('STOP_LOSS_LIMIT')
+            limit_order = orders.get('LIMIT_MAKER')
+            if stop_order is None or limit_order is None:
+                continue
+
+            side = stop_order['side']
+            stop_price = float(stop_order['stopPrice'])
+            if side == 'SELL':
+                stop_reached = low_price <= stop_price
+                limit_reached = high_price >= float(limit_order['price'])
+            else:
+                stop_reached = high_price >= stop_price
+                limit_reached = low_price <= limit_order['fillPrice']
+
+            filled, expired = None, None
+            if stop_reached:
+                filled, expired = stop_order, limit_order
+            elif limit_reached:
+                filled, expired = limit_order, stop_order
+
+            if filled is not None:
+                fill_price = filled.get('fillPrice', float(filled['price']))
+                self.fill(filled, fill_price, float(filled['origQty']))
+                expired['status'] = 'EXPIRED'
+                expired['updateTime'] = self.current_time
+
+    ### clock
+    def advance(self, timestamp):
+        """
+        Move the exchange clock to timestamp (open time of the candle in formation), matching the open orders
+        with the candles closed until then.
+        """
+        with self.lock:
+            for symbol, candles in self.candles.items():
+                first = int(candles['OpenTime'].searchsorted(self.current_time))
+                last = int(candles['OpenTime'].searchsorted(timestamp))
+                for pos in range(first, last):
+                    self.match_orders(symbol, candles['OHLCV'][pos, 1], candles['OHLCV'][pos, 2])
+
+            self.current_time = timestamp
+
+class FakeClient:
+    """
+    Same methods (and returns) of binance.client.Client used by the project, served by a FakeExchange.
+    """
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.response = None
+
+    def _check_interval(self, interval):
+        if interval != '1m':
+            raise get_api_exception(-1120, 'Invalid interval, the fake exchange has only 1m klines.')
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        self._check_interval(interval)
+        self.response = self.exchange.use_weight('klines')
+
+        return self.exchange.get_klines(symbol, startTime, endTime, limit)
+
+    def _get_earliest_valid_timestamp(self, symbol, interval):
+        return self.get_klines(symbol=symbol, interval=interval, startTime=0, limit=1)[0][0]
+
+    def get_historical_klines(self, symbol, interval, start_str=None, end_str=None, limit=None):
+        output_data = []
+        start_ts = int(start_str or 0)
+
+        while True:
+            data = self.get_klines(symbol=symbol, interval=interval, startTime=start_ts, endTime=end_str, limit=1000)
+            output_data += data
+
+            if len(data) < 1000:
+                return output_data
+
+            start_ts = data[-1][0] + MINUTE_MS
+
+    def get_symbol_info(self, symbol):
+        self.response = self.exchange.use_weight('exchange_info')
+
+        return self.exchange.get_symbol_info(symbol)
+
+    def get_exchange_info(self):
+        self.response = self.exchange.use_weight('exchange_info')
+
+        return {'symbols': [self.exchange.get_symbol_info(symbol) for symbol in self.exchange.candles]}
+
+    def get_symbol_ticker(self, symbol):
+        self.response = self.exchange.use_weight('ticker')
+
+        return {'symbol': symbol, 'price': format_value(self.exchange.get_price(symbol))}
+
+    def get_all_tickers(self):
+        self.response = self.exchange.use_weight('all_tickers')
+
+        return [{'symbol': symbol, 'price': format_value(self.exchange.get_price(symbol))} for symbol in self.exchange.candles]
+
+    def get_asset_balance(self, asset):
+        self.response = self.exchange.use_weight('account')
+        balance = self.exchange.balances.get(asset)
+
+        if balance is None:
+            return None
+
+        return {'asset': asset, 'free': format_value(balance['free']), 'locked': format_value(balance['locked'])}
+
+    def order_market_buy(self, symbol, quantity=None, quoteOrderQty=None):
+        self.response = self.exchange.use_weight('order')
+
+        return self.exchange.create_market_order(symbol, 'BUY', quantity=quantity, quote_quantity=quoteOrderQty)
+
+    def order_market_sell(self, symbol, quantity=None, quoteOrderQty=None):
+        self.response = self.exchange.use_weight('order')
+
+        return self.exchange.create_market_order(symbol, 'SELL', quantity=quantity, quote_quantity=quoteOrderQty)
+
+    def create_oco_order(self, symbol, side, quantity, price, stopPrice, stopLimitPrice, stopLimitTimeInForce='GTC'):
+        self.response = self.exchange.use_weight('order')
+
+        return self.exchange.create_oco_order(symbol, side, quantity, price, stopPrice, stopLimitPrice)
+
+    def cancel_order(self, symbol, orderId):
+        self.response = self.exchange.use_weight('cancel_order')
+
+        return self.exchange.cancel_order(symbol, orderId)
+
+    def get_open_orders(self, symbol=None):
+        self.response = self.exchange.use_weight('open_orders' if symbol is not None else 'all_open_orders')
+
+        return self.exchange.get_open_orders(symbol)
+
+    def get_my_trades(self, symbol):
+        self.response = self.exchange.use_weight('my_trades')
+
+        return [dict(trade) for trade in self.exchange.trades if trade['symbol'] == symbol]
+
+class FakeWebsocketManager:
+    """
+    Same methods of binance.ThreadedWebsocketManager used by the project. Streams the candles of the FakeExchange
+    after its start time as closed kline messages.
+
+    Parameters
+    - exchange: FakeExchange
+    - speed: speed-up over real time (60 - one 1m candle by second), 0 - as fast as possible
+    - end: stop streaming at this time (default: last candle)
+    """
+
+    def __init__(self, exchange, speed=60.0, end=None):
+        self.exchange = exchange
+        self.speed = speed
+        self.end = None if end is None else int(pd.Timestamp(end).value // 1000000)
+        self.sockets = {}
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        # throughput statistics
+        self.messages = 0
+        self.callback_seconds = 0.0
+        self.started_at = None
+
+    def start(self):
+        self.running = True
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._stream, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def start_kline_socket(self, callback, symbol, interval='1m'):
+        if interval != '1m':
+            raise ValueError('The fake exchange streams only 1m klines.')
+
+        socket_name = symbol.lower() + '@kline_' + interval
+        with self.lock:
+            self.sockets[socket_name] = (symbol, callback)
+
+        return socket_name
+
+    def stop_socket(self, socket_name):
+        with self.lock:
+            self.sockets.pop(socket_name, None)
+
+    def get_stats(self):
+        elapsed = time.time() - self.started_at if self.started_at is not None else 0.0
+
+        return {'messages': self.messages,
+                'elapsed_seconds': elapsed,
+                'callback_seconds': self.callback_seconds,
+                'messages_per_second': self.messages / elapsed if elapsed > 0 else 0.0}
+
+    def _get_message(self, symbol, pos):
+        candles = self.exchange.candles[symbol]
+        open_time = int(candles['OpenTime'][pos])
+        o, h, l, c, v = candles['OHLCV'][pos].tolist()
+
+        return {'e': 'kline',
+                'E': open_time + MINUTE_MS,
+                's': symbol,
+                'k': {'t': open_time, 'T': open_time + MINUTE_MS - 1, 's': symbol, 'i': '1m',
+                      'o': format_value(o), 'c': format_value(c), 'h': format_value(h), 'l': format_value(l), 'v': format_value(v),
+                      'x': True}}
+
+    def _stream(self):
+        last_time = max([int(candles['OpenTime'][-1]) for candles in self.exchange.candles.values()])
+        if self.end is not None:
+            last_time = min(last_time, self.end)
+
+        while self.running and self.exchange.current_time <= last_time:
+            started = time.time()
+            candle_time = self.exchange.current_time
+            # the candle is closed, the next one is in formation
+            self.exchange.advance(candle_time + MINUTE_MS)
+
+            with self.lock:
+                sockets = list(self.sockets.values())
+
+            for symbol, callback in sockets:
+                candles = self.exchange.candles[symbol]
+                pos = self.exchange.get_candle_position(symbol, candle_time)
+                if pos < 0 or candles['OpenTime'][pos] != candle_time:
+                    # no candle in this minute (gap)
+                    continue
+
+                message = self._get_message(symbol, pos)
+                callback_started = time.time()
+                callback(message)
+                self.callback_seconds += time.time() - callback_started
+                self.messages += 1
+
+            if self.speed:
+                time.sleep(max(0.0, 60.0 / self.speed - (time.time() - started)))
+
+        self.running = False
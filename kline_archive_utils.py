@@ -0,0 +1,225 @@
+import re
+import sys
+import hashlib
+import zipfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from candle_store_utils import get_partition_months, get_partition_bounds, is_compact_month, read_partition, write_partition
+
+"""
+Bulk import of the Binance public kline archives (https://data.binance.vision) to the candle store.
+
+The monthly (<PAIR>-1m-<YYYY-MM>.zip) and daily (<PAIR>-1m-<YYYY-MM-DD>.zip) archives must be downloaded to a
+local directory (any layout, it is searched recursively), the .CHECKSUM files next to them are verified.
+Each month is imported by a process: its files are streamed by the pyarrow CSV reader (one block in memory at time)
+and written to the month partition.
+
+python kline_archive_utils.py <archive path> <store path> [PAIR ...]
+"""
+
+ARCHIVE_COLUMNS = [
+    'OpenTime',
+    'OpenPrice',
+    'HighPrice',
+    'LowPrice',
+    'ClosePrice',
+    'Volume',
+    'CloseTime',
+    'QuoteVolume',
+    'Trades',
+    'TakerBuyBaseVolume',
+    'TakerBuyQuoteVolume',
+    'Ignore']
+PRICE_COLUMNS = ['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice', 'Volume']
+ARCHIVE_PATTERN = re.compile(r'^(?P<pair>[A-Z0-9]+)-1m-(?P<month>\d{4}-\d{2})(?P<day>-\d{2})?\.(zip|csv)$')
+# 1m open times greater than it are in microseconds (spot archives since 2025), the others in milliseconds
+MICROSECONDS_THRESHOLD = 10**14
+CSV_BLOCK_SIZE = 1 << 20
+
+def find_archives(archive_path, pairs=None):
+    """
+    Returns a dict {(pair, month): [archive files]} of the 1m kline archives found in archive_path.
+    A csv file (extracted archive) is ignored if its zip file is present.
+    """
+    archives = {}
+
+    for f in sorted(Path(archive_path).rglob('*-1m-*')):
+        match = ARCHIVE_PATTERN.match(f.name)
+        if match is None:
+            continue
+        if pairs is not None and match['pair'] not in pairs:
+            continue
+        if f.suffix == '.csv' and f.with_suffix('.zip').exists():
+            continue
+
+        archives.setdefault((match['pair'], match['month']), []).append(f)
+
+    return archives
+
+def verify_checksum(filename):
+    """
+    Verify the file with the sha256 of its .CHECKSUM file ('<sha256>  <file name>').
+    Returns True if it matches, False if it does not match and None if there is no checksum file.
+    """
+    checksum_filename = Path(str(filename) + '.CHECKSUM')
+    if not checksum_filename.exists():
+        return None
+
+    expected = checksum_filename.read_text().split()[0].lower()
+
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(CSV_BLOCK_SIZE), b''):
+            sha256.update(chunk)
+
+    return sha256.hexdigest() == expected
+
+def open_archive(filename):
+    """
+    Returns a binary file object with the csv of the archive (zip or csv).
+    """
+    if filename.suffix == '.zip':
+        archive = zipfile.ZipFile(filename)
+        return archive.open(archive.namelist()[0])
+
+    return open(filename, 'rb')
+
+def has_header(filename):
+    # some archives (futures) have a header line
+    with open_archive(filename) as f:
+        return not f.read(1).isdigit()
+
+def read_archive(filename):
+    """
+    Stream the csv of the archive. Returns a DataFrame with the OHLCV columns indexed by OpenTime.
+    """
+    read_options = pv.ReadOptions(column_names=ARCHIVE_COLUMNS,
+                                  skip_rows=1 if has_header(filename) else 0,
+                                  block_size=CSV_BLOCK_SIZE)
+    column_types = {column: pa.float64() for column in PRICE_COLUMNS}
+    column_types['OpenTime'] = pa.int64()
+    convert_options = pv.ConvertOptions(include_columns=['OpenTime'] + PRICE_COLUMNS, column_types=column_types)
+
+    open_times = []
+    values = []
+    with open_archive(filename) as f:
+        reader = pv.open_csv(f, read_options=read_options, convert_options=convert_options)
+        for batch in reader:
+            open_times.append(batch.column(0).to_numpy())
+            values.append(np.column_stack([batch.column(i + 1).to_numpy() for i in range(len(PRICE_COLUMNS))]))
+
+    if len(open_times) == 0:
+        return None
+
+    open_times = np.concatenate(open_times)
+    open_times = np.where(open_times > MICROSECONDS_THRESHOLD, open_times * 1000, open_times * 1000000)
+
+    index = pd.DatetimeIndex(open_times.astype('datetime64[ns]'), name='OpenTime')
+    return pd.DataFrame(np.concatenate(values), index=index, columns=PRICE_COLUMNS)
+
+def get_last_minute(month):
+    return pd.Period(month, freq='M').end_time.floor('min')
+
+def is_month_complete(df, month):
+    """
+    The month is complete if it has the last minute of the month.
+    """
+    return df is not None and df.size > 0 and df.index[-1] >= get_last_minute(month)
+
+def is_stored_month_complete(path, pair, month):
+    """
+    is_month_complete of the month stored, from the last open time of the parquet statistics (no data is read).
+    """
+    last_time = get_partition_bounds(path, pair, month)[1]
+
+    return last_time is not None and last_time >= get_last_minute(month)
+
+def import_month(path, pair, month, files, check=True, compact=None):
+    """
+    Import the archives of one month of the pair to the store, merging with the candles already stored.
+    compact: None - keep the format of the stored month (a new month has the format of the previous month), as
+    append_candles.
+    Returns a tuple (pair, month, number of candles, error message or None).
+    """
+    dfs = []
+    for filename in files:
+        if check:
+            valid = verify_checksum(filename)
+            if valid is False:
+                return pair, month, 0, 'checksum mismatch: ' + filename.name
+            if valid is None and filename.suffix == '.zip':
+                print('No checksum file for ' + filename.name)
+
+        df = read_archive(filename)
+        if df is not None:
+            dfs.append(df)
+
+    df_stored = read_partition(path, pair, month)
+    if df_stored is not None:
+        # the archives replace the stored candles with the same open time
+        dfs.insert(0, df_stored)
+
+    if len(dfs) == 0:
+        return pair, month, 0, None
+
+    df = pd.concat(dfs)
+    if not df.index.is_monotonic_increasing or not df.index.is_unique:
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+
+    write_partition(path, pair, month, df, compact=compact if compact is not None else is_compact_month(path, pair, month))
+
+    return pair, month, len(df), None
+
+def import_archives(archive_path, path, pairs=None, max_workers=None, check=True, overwrite=False, compact=None):
+    """
+    Import the 1m kline archives of archive_path to the candle store in path, one process by month.
+
+    Parameters
+    - archive_path: directory with the downloaded archives (searched recursively)
+    - path: candle store path
+    - pairs: list of pairs to import, default: all pairs found
+    - max_workers: number of processes, default: number of cores
+    - check: verify the .CHECKSUM files
+    - overwrite: import the months already complete in the store too
+    - compact: write the months in the compact format (see candle_store_utils), None - keep the format of the
+               stored months (a new month has the format of the previous month)
+
+    Returns a list of tuples (pair, month, number of candles, error message or None) of the imported months.
+    """
+    archives = find_archives(archive_path, pairs)
+
+    tasks = []
+    stored_months = {}
+    for (pair, month), files in archives.items():
+        if pair not in stored_months:
+            stored_months[pair] = set(get_partition_months(path, pair))
+
+        if not overwrite and month in stored_months[pair] and is_stored_month_complete(path, pair, month):
+            continue
+
+        tasks.append((pair, month, files))
+
+    print('Importing {} months ({} skipped)...'.format(len(tasks), len(archives) - len(tasks)))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(import_month, path, pair, month, files, check, compact) for pair, month, files in tasks]
+
+        for future in as_completed(futures):
+            pair, month, size, error = future.result()
+            if error is not None:
+                print('{} {}: {}'.format(pair, month, error))
+            results.append((pair, month, size, error))
+
+    return sorted(results)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit('Usage: python kline_archive_utils.py <archive path> <store path> [PAIR ...]')
+
+    import_archives(sys.argv[1], sys.argv[2], pairs=sys.argv[3:] or None)
@@ -0,0 +1,141 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from strategy_registry_utils import get_strategy
+from streaming_indicator_utils import IndicatorsState
+
+"""
+Live evaluation of the strategy signals: only the last bar is computed for each new candle.
+
+The signal functions of strategy_utils.py build the raw signal of each bar (1 - buy, -1 - sell, 0 - nothing)
+and then remove_repeated_signal keeps the last non-zero value (state) and only the bars where the state changes.
+The raw signal of a bar depends on the indicators of the last bars only (lookback of the strategy), so the live
+signal keeps:
+- the streaming indicators (streaming_indicator_utils.py), exact for any length of history, an EWM can't be
+  recomputed exactly from a tail of the warm-up only
+- the last rows of the indicators, to compute the raw signal of the new bar with the same signal function
+- the last states, to remove the repeated signals
+
+The signals are the same of update_signal_by_strategy for the last bars (see check_live_signals in
+benchmark_utils.py) and the cost of each candle doesn't depend on the length of the history: the history is
+computed once by seed, at start (seed_live_signals in trade_utils.py) and not in the socket callback.
+"""
+
+def get_repeated_value(previous_state, state):
+    """
+    Signal of a bar after remove_repeated_signal: the state if it changed, 0.0 otherwise (NaN states before the
+    first non-zero signal).
+    """
+    if math.isnan(state):
+        return 0.0
+    if math.isnan(previous_state) or state != previous_state:
+        return state
+
+    return 0.0
+
+def get_raw_signal(strategy, df):
+    """
+    Returns the raw signal (numpy array) of the strategy for the rows of df, without removing the repeated signals.
+    """
+    return strategy['function'](df, remove_repeated_signals=False).astype('float64')
+
+def is_live_strategy(signal_column):
+    """
+    True if the signal of the strategy could be computed by LiveSignal (known strategy with a limited lookback).
+    """
+    strategy = get_strategy(signal_column)
+
+    return strategy is not None and strategy['lookback'] is not None
+
+class LiveSignal:
+    """
+    Signal of a strategy (SignalColumnName of trading-strategies.csv) updated bar by bar.
+    """
+
+    def __init__(self, signal_column):
+        self.signal_column = signal_column
+        self.strategy = get_strategy(signal_column)
+        if self.strategy is None or self.strategy['lookback'] is None:
+            raise ValueError('Strategy without live signal: ' + signal_column)
+
+        self.lookback = self.strategy['lookback']
+        self.last_time = None
+
+    def seed(self, df):
+        """
+        Compute the signal of the history (DataFrame with the OHLC bars of the interval).
+        """
+        self.indicators = IndicatorsState(self.strategy['inputs'])
+        values = {column: [] for column in self.indicators.columns}
+        for row in df[['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice']].itertuples(index=False):
+            for column, value in self.indicators.update(*row).items():
+                values[column].append(value)
+
+        values['ClosePrice'] = df['ClosePrice'].to_numpy(dtype='float64').tolist()
+        raw = get_raw_signal(self.strategy, {column: np.array(value, dtype='float64') for column, value in values.items()})
+
+        # last non-zero signal of each bar
+        states = pd.Series(np.where(raw == 0.0, np.nan, raw)).ffill().to_numpy()
+        self.states = deque([np.nan] * 3 + states[-3:].tolist(), maxlen=3)
+        # last values of the signal inputs by column
+        self.rows = {column: deque(value[-self.lookback:], maxlen=self.lookback) for column, value in values.items()}
+        self.last_time = df.index[-1] if len(df) > 0 else None
+
+        return self
+
+    def update(self, time, open_price, high_price, low_price, close_price):
+        """
+        Add a new bar and returns its signal.
+        """
+        values = self.indicators.update(open_price, high_price, low_price, close_price)
+        values['ClosePrice'] = float(close_price)
+        for column, value in values.items():
+            self.rows[column].append(value)
+
+        # the signal functions read the columns as arrays, no DataFrame is built
+        raw = get_raw_signal(self.strategy, {column: np.array(row, dtype='float64') for column, row in self.rows.items()})[-1]
+
+        state = raw if raw != 0.0 and not math.isnan(raw) else self.states[-1]
+        self.states.append(state)
+        self.last_time = time
+
+        return get_repeated_value(self.states[-2], state)
+
+    def get_start(self, df):
+        """
+        Returns the position of the first bar of df after the last bar computed, None if df doesn't have it.
+        The index is sorted, the search doesn't depend on the size of the history.
+        """
+        if self.last_time is None:
+            return None
+
+        index = df.index
+        position = index.searchsorted(self.last_time)
+        if position == len(index) or index[position] != self.last_time:
+            return None
+
+        return position + 1
+
+    def get_signals(self, df):
+        """
+        Returns the signals of the last two bars of df (the same of df[signal_column].iloc[-2] and .iloc[-1] after
+        update_signal_by_strategy). Only the bars after the last call (or the seed) are computed. The whole history
+        of df is computed (and printed, it's slow) if the signal is not seeded or df doesn't have the last bar.
+        """
+        start = self.get_start(df)
+        if start is None:
+            if self.last_time is None:
+                print('{}: not seeded, computing the signal of {} bars.'.format(self.signal_column, len(df)))
+            else:
+                print('{}: the last bar computed ({}) is not in the bars, computing the signal of {} bars again.'.format(
+                    self.signal_column, self.last_time, len(df)))
+            self.seed(df)
+        else:
+            new_bars = df.iloc[start:]
+            for row in zip(new_bars.index, *[new_bars[column].to_numpy() for column in ['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice']]):
+                self.update(*row)
+
+        return get_repeated_value(self.states[0], self.states[1]), get_repeated_value(self.states[1], self.states[2])
@@ -0,0 +1,159 @@
+import argparse
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from backtest_utils import get_backtest, get_backtest_stats, get_weight_array
+from candle_store_utils import get_store_pairs, get_time_bounds, read_candles
+from strategy_registry_utils import get_strategy
+from trade_utils import resample_data, update_signal_by_strategy
+
+"""
+Backtest of strategies over all the pairs of the candle store (vectorized backtest of backtest_utils.py).
+
+Each pair is a task of a process pool with max_workers processes: the process reads only the OHLC columns and the
+months of the range (read_candles), resamples them to the interval and backtests each strategy, then only the stats
+and the daily equity are returned, so at most max_workers pairs are in memory at the same time.
+
+The portfolio of a strategy splits the initial capital equally between the pairs, with no rebalancing: its daily
+equity is the sum of the equities of the pairs (the capital of a pair stays in cash before its first candle and
+keeps its last value after the last one).
+"""
+
+PRICE_COLUMNS = ['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice']
+
+# name of the buy and hold benchmark in the reports
+BUY_AND_HOLD = 'BuyAndHold'
+
+STATS = ['total_return', 'cagr', 'max_drawdown', 'sharpe']
+
+def backtest_pair(path, pair, signal_columns, interval, start, end, fee, _initial_capital):
+    """
+    Backtest of the strategies (and buy and hold) of one pair.
+    Returns a tuple (pair, list of dicts with the stats by strategy, dict with the daily equity by strategy, error
+    message or None).
+    """
+    try:
+        df = read_candles(path, pair, start, end, columns=PRICE_COLUMNS)
+        if df is None:
+            return pair, [], {}, 'no candles'
+        if interval != '1m':
+            df = resample_data(df, interval)
+        if len(df) < 2:
+            return pair, [], {}, 'not enough candles'
+
+        rows = []
+        equities = {}
+        for signal_column in [BUY_AND_HOLD] + signal_columns:
+            if signal_column == BUY_AND_HOLD:
+                weight = pd.Series(1.0, index=df.index)
+            else:
+                df = update_signal_by_strategy(df, signal_column)
+                weight = pd.Series(get_weight_array(df[signal_column].to_numpy()), index=df.index)
+
+            result = get_backtest(df[['ClosePrice']], weight, fee, _initial_capital)
+            row = {'Symbol': pair, 'SignalColumnName': signal_column, 'Start': df.index[0], 'End': df.index[-1]}
+            row.update({stat: result[stat] for stat in STATS})
+            row['trades'] = len(result['trades'])
+            rows.append(row)
+            equities[signal_column] = result['equity'].resample('D').last().dropna()
+
+        return pair, rows, equities, None
+    except Exception as e:
+        return pair, [], {}, str(e)
+
+def get_portfolio_equity(equities, _initial_capital):
+    """
+    Daily equity of the equal weight portfolio of the pairs (list of daily equities that start with _initial_capital).
+    """
+    df_equity = pd.concat(equities, axis=1).sort_index()
+    df_equity = df_equity.ffill().fillna(_initial_capital)
+
+    return df_equity.sum(axis=1) / len(equities)
+
+def run_portfolio_backtest(path, signal_columns, interval='1h', pairs=None, start=None, end=None, fee=0.0,
+                           max_workers=4, _initial_capital=1000000.0):
+    """
+    Backtests the strategies (SignalColumnName of trading-strategies.csv) on each pair of the candle store in path:
+    - interval: interval of the bars of the strategies ('1m' - the stored candles)
+    - pairs: list of pairs, default: all the pairs of the store
+    - start, end: range of the candles, timestamps or partial date strings with the range of df[start:end]
+    - fee: fee by traded value (exchange_fee of get_trade_info)
+    - max_workers: number of processes (and pairs in memory)
+
+    Returns a dict with:
+    - symbols: DataFrame with the stats of each pair and strategy (BuyAndHold is the benchmark)
+    - portfolio: DataFrame with the stats of the equal weight portfolio of each strategy
+    - equity: DataFrame with the daily equity of the portfolio of each strategy
+    """
+    for signal_column in signal_columns:
+        if get_strategy(signal_column) is None:
+            print('Unknown strategy: ' + signal_column)
+    signal_columns = [signal_column for signal_column in signal_columns if get_strategy(signal_column) is not None]
+
+    if pairs is None:
+        pairs = get_store_pairs(path)
+
+    # '2020-03' is all March, as in get_data
+    start, end = get_time_bounds(start or None, end or None)
+
+    rows = []
+    equities = {signal_column: [] for signal_column in [BUY_AND_HOLD] + signal_columns}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(backtest_pair, path, pair, signal_columns, interval, start, end, fee, _initial_capital)
+                   for pair in pairs]
+
+        for i, future in enumerate(as_completed(futures)):
+            pair, pair_rows, pair_equities, error = future.result()
+            if error is not None:
+                print('{}: {}'.format(pair, error))
+                continue
+
+            rows += pair_rows
+            for signal_column, equity in pair_equities.items():
+                equities[signal_column].append(equity)
+            print('{} done ({}/{})'.format(pair, i + 1, len(pairs)))
+
+    df_symbols = pd.DataFrame(rows, columns=['Symbol', 'SignalColumnName', 'Start', 'End'] + STATS + ['trades'])
+    df_symbols = df_symbols.sort_values(['SignalColumnName', 'Symbol'], ignore_index=True)
+
+    portfolio_rows = []
+    df_equity = pd.DataFrame()
+    for signal_column, pair_equities in equities.items():
+        if len(pair_equities) == 0:
+            continue
+
+        equity = get_portfolio_equity(pair_equities, _initial_capital)
+        df_equity[signal_column] = equity
+
+        df_strategy = df_symbols[df_symbols['SignalColumnName'] == signal_column]
+        row = {'SignalColumnName': signal_column, 'symbols': len(pair_equities)}
+        row.update(get_backtest_stats(equity))
+        row['trades'] = df_strategy['trades'].sum()
+        row['positive_symbols'] = (df_strategy['total_return'] > 0).sum()
+        portfolio_rows.append(row)
+
+    df_portfolio = pd.DataFrame(portfolio_rows)
+    if len(df_portfolio) > 0:
+        df_portfolio = df_portfolio.sort_values('total_return', ascending=False, ignore_index=True)
+
+    return {'symbols': df_symbols, 'portfolio': df_portfolio, 'equity': df_equity}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backtest of strategies over all the pairs of the candle store')
+    parser.add_argument('path', help='candle store path')
+    parser.add_argument('strategies', nargs='+', help='SignalColumnName of the strategies')
+    parser.add_argument('--interval', default='1h')
+    parser.add_argument('--pairs', nargs='+', help='pairs to backtest, default: all')
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--fee', type=float, default=0.0)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--output', help='CSV file of the stats by pair and strategy')
+    args = parser.parse_args()
+
+    report = run_portfolio_backtest(args.path, args.strategies, args.interval, args.pairs, args.start, args.end,
+                                    args.fee, args.max_workers)
+    if args.output is not None:
+        report['symbols'].to_csv(args.output, index=False)
+
+    print(report['portfolio'].to_string())
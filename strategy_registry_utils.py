@@ -0,0 +1,192 @@
+import re
+from strategy_utils import *
+
+"""
+Registry of the strategies that could be used in trading-strategies.csv (SignalColumnName).
+
+Each strategy is a dict with:
+- function: function(df, remove_repeated_signals=True) of the DataFrame with the candles and indicators, returns
+            the signal as an int8 array (the raw signal of each bar with remove_repeated_signals=False), the columns
+            are read with no copy by the array signals of strategy_utils.py
+- inputs: indicator columns used by the function (see add_technical_indicator in trade_utils.py)
+- warm_up: number of bars of history needed before the signal is reliable
+- lookback: number of bars (the current one included) that the raw signal of a bar depends on, None if it depends on
+            the whole history (position state), see live_signal_utils.py
+
+The names with parameters (Signal30SMAStrategy, SignalRSIStrategy70_30, SignalSMACROSSStrategy5_30, ...) are parsed
+by the patterns the first time they are used and kept in the registry, so any period or threshold combination could
+be used without changing the code and each lookup is a dict access.
+"""
+
+def get_ewm_warm_up(alpha):
+    """
+    Bars until the weight of the first value in an exponential average is less than 0.25% (3 spans).
+    """
+    return round(3 * (2 / alpha - 1))
+
+# warm-up of the indicator columns without the period in the name
+INDICATOR_WARM_UP = {
+    'MACD': get_ewm_warm_up(2 / 27),
+    'MACDSignal': get_ewm_warm_up(2 / 27) + get_ewm_warm_up(2 / 10),
+    'MACDHist': get_ewm_warm_up(2 / 27) + get_ewm_warm_up(2 / 10),
+    'RSI': 1 + get_ewm_warm_up(1 / 14),
+    # Wilder smoothing seeded with the mean of 14 bars, ADX smooths DX again
+    'DI+': 1 + 14 + get_ewm_warm_up(1 / 14),
+    'DI-': 1 + 14 + get_ewm_warm_up(1 / 14),
+    'ADX': 1 + 2 * (14 + get_ewm_warm_up(1 / 14)),
+    'RVI': 4 + 10,
+    'RVISignal': 4 + 10 + 3,
+    'UpperBBand': 20,
+    'MidiBBand': 20,
+    'LowerBBand': 20,
+    'BBW': 20,
+    'ATR': 1 + get_ewm_warm_up(1 / 14),
+}
+
+STRATEGIES = {}
+STRATEGY_PATTERNS = []
+
+def get_indicator_warm_up(column):
+    match = re.fullmatch(r'(SMA|EMA)(\d+)', column)
+    if match:
+        period = int(match[2])
+        return period if match[1] == 'SMA' else get_ewm_warm_up(2 / (period + 1))
+
+    if column not in INDICATOR_WARM_UP:
+        raise ValueError('Unknown indicator: ' + column)
+
+    return INDICATOR_WARM_UP[column]
+
+# the signals compare a bar with the previous one (shift), some of them after changing the previous values
+DEFAULT_LOOKBACK = 5
+
+def register_strategy(name, function, inputs, warm_up=None, lookback=DEFAULT_LOOKBACK):
+    """
+    Add the strategy to the registry, the default warm-up is the greatest warm-up of the inputs.
+    Returns the strategy.
+    """
+    if warm_up is None:
+        warm_up = max([get_indicator_warm_up(column) for column in inputs])
+
+    STRATEGIES[name] = {'function': function, 'inputs': inputs, 'warm_up': warm_up, 'lookback': lookback}
+
+    return STRATEGIES[name]
+
+def register_strategy_pattern(pattern, factory):
+    """
+    Add a name pattern (regex with groups of integer parameters) to the registry, factory(*parameters) returns
+    a tuple (function, inputs) or (function, inputs, warm_up).
+    """
+    STRATEGY_PATTERNS.append((re.compile(pattern), factory))
+
+def get_strategy(signal_column):
+    """
+    Returns the strategy (dict with function, inputs and warm_up) or None if the name is unknown.
+    """
+    strategy = STRATEGIES.get(signal_column)
+    if strategy is not None:
+        return strategy
+
+    for pattern, factory in STRATEGY_PATTERNS:
+        match = pattern.fullmatch(signal_column)
+        if match:
+            return register_strategy(signal_column, *factory(*[int(value) for value in match.groups()]))
+
+    return None
+
+def get_price_cross_strategy(period):
+    column = 'SMA' + str(period)
+    return (lambda df, remove_repeated_signals=True: get_cross_signal_array(df['ClosePrice'],
+                                                                            df[column],
+                                                                            remove_repeated_signals),
+            [column])
+
+def get_rsi_strategy(overbought_value, oversold_value):
+    return (lambda df, remove_repeated_signals=True: get_rsi_signal_array(df['RSI'],
+                                                                          overbought_value=overbought_value,
+                                                                          oversold_value=oversold_value,
+                                                                          remove_repeated_signals=remove_repeated_signals),
+            ['RSI'])
+
+def get_average_cross_strategy(average, short_period, long_period):
+    short_column = average + str(short_period)
+    long_column = average + str(long_period)
+    return (lambda df, remove_repeated_signals=True: get_cross_signal_array(df[short_column],
+                                                                            df[long_column],
+                                                                            remove_repeated_signals),
+            [short_column, long_column])
+
+# SignalColumnName of the parameters of each factory (see get_strategy_name)
+STRATEGY_NAMES = {
+    get_price_cross_strategy: 'Signal{period}SMAStrategy',
+    get_rsi_strategy: 'SignalRSIStrategy{overbought_value}_{oversold_value}',
+    get_average_cross_strategy: 'Signal{average}CROSSStrategy{short_period}_{long_period}',
+}
+
+def get_strategy_name(factory, parameters):
+    """
+    Returns the name (SignalColumnName) of the strategy of factory(**parameters).
+    """
+    if factory not in STRATEGY_NAMES:
+        raise ValueError('Strategy factory without name: ' + factory.__name__)
+
+    return STRATEGY_NAMES[factory].format(**parameters)
+
+register_strategy_pattern(r'Signal(\d+)SMAStrategy', get_price_cross_strategy)
+register_strategy_pattern(r'SignalRSIStrategy(\d+)_(\d+)', get_rsi_strategy)
+register_strategy_pattern(r'SignalSMACROSSStrategy(\d+)_(\d+)', lambda short, long: get_average_cross_strategy('SMA', short, long))
+register_strategy_pattern(r'SignalEMACROSSStrategy(\d+)_(\d+)', lambda short, long: get_average_cross_strategy('EMA', short, long))
+
+register_strategy('SignalMACDStrategy',
+                  lambda df, remove_repeated_signals=True: get_macd_signal_array(df['MACDSignal'],
+                                                                                 df['MACD'],
+                                                                                 remove_repeated_signals),
+                  ['MACDSignal', 'MACD'])
+register_strategy('SignalRSIADXStrategy',
+                  lambda df, remove_repeated_signals=True: get_rsi_adx_signal_array(df['RSI'],
+                                                                                    df['ADX'],
+                                                                                    df['DI+'],
+                                                                                    df['DI-'],
+                                                                                    overbought_value=70.0,
+                                                                                    oversold_value=30.0,
+                                                                                    remove_repeated_signals=remove_repeated_signals),
+                  ['RSI', 'ADX', 'DI+', 'DI-'])
+# the position is kept from the first entry on, the signal depends on the whole history
+register_strategy('SignalSMAMACDStrategy',
+                  lambda df, remove_repeated_signals=True: get_sma_macd_signal_array(df['ClosePrice'],
+                                                                                     df['SMA30'],
+                                                                                     df['SMA100'],
+                                                                                     df['MACD'],
+                                                                                     remove_repeated_signals),
+                  ['SMA30', 'SMA100', 'MACD'],
+                  lookback=None)
+register_strategy('SignalMACDRVIStrategy',
+                  lambda df, remove_repeated_signals=True: get_macd_rvi_signal_array(df['MACDSignal'],
+                                                                                     df['MACD'],
+                                                                                     df['RVISignal'],
+                                                                                     df['RVI'],
+                                                                                     remove_repeated_signals),
+                  ['MACDSignal', 'MACD', 'RVISignal', 'RVI'])
+register_strategy('SignalBBandsStrategy',
+                  lambda df, remove_repeated_signals=True: get_bbands_signal_array(df['ClosePrice'],
+                                                                                   df['UpperBBand'],
+                                                                                   df['LowerBBand'],
+                                                                                   remove_repeated_signals),
+                  ['UpperBBand', 'LowerBBand'])
+register_strategy('SignalInvertedRSIStrategy',
+                  lambda df, remove_repeated_signals=True: get_inverted_rsi_signal_array(df['RSI'],
+                                                                                         remove_repeated_signals=remove_repeated_signals),
+                  ['RSI'])
+register_strategy('SignalDMIStrategy',
+                  lambda df, remove_repeated_signals=True: get_dmi_signal_array(df['DI+'],
+                                                                                df['DI-'],
+                                                                                df['ADX'],
+                                                                                remove_repeated_signals=remove_repeated_signals),
+                  ['DI+', 'DI-', 'ADX'])
+register_strategy('SignalADXMACDStrategy',
+                  lambda df, remove_repeated_signals=True: get_adx_macd_signal_array(df['MACD'],
+                                                                                     df['DI+'],
+                                                                                     df['DI-'],
+                                                                                     df['ADX'],
+                                                                                     remove_repeated_signals),
+                  ['MACD', 'DI+', 'DI-', 'ADX'])
@@ -11,133 +11,399 @@ def remove_repeated_signal(signal, column_name):
 
     return remove_repeated_values(signal)
 
-def get_cross_signal(short_data, long_data, buy_first=True):
-    # the column names must be the same
-    short_data.columns = ['value']
-    long_data.columns = ['value']
+def get_forward_filled(values, is_set, initial):
+    """
+    Values of the last position where is_set is True up to each position (initial before the first one).
+    """
+    positions = np.where(is_set, np.arange(len(values)), -1)
+    np.maximum.accumulate(positions, out=positions)
 
-    signal = long_data.copy()
-    signal[short_data > long_data] = 1.0
-    signal[short_data <= long_data] = -1.0
+    return np.where(positions >= 0, values[positions], initial)
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+def get_first_exit(exit, price, start, stop_level, target_level, chunk_size=256):
+    """
+    First position from start with the exit condition or the price out of the levels (len(price) if none), the bars
+    are checked in chunks that double in size, so a long position costs about its length.
+    """
+    size = len(price)
+    while start < size:
+        end = min(start + chunk_size, size)
+        prices = price[start:end]
+        found = np.flatnonzero(exit[start:end] | (prices < stop_level) | (prices > target_level))
+        if len(found) > 0:
+            return start + int(found[0])
+
+        start = end
+        chunk_size *= 2
+
+    return size
+
+def get_long_flat_signal(entry, exit=None, price=None, stop=None, target=None,
+        entry_requires_flat=True,
+        exit_flattens=True,
+        exit_first=False,
+        initial_long=False):
+    """
+    Long/flat state machine over the bars, linear time. Returns an int8 array: 1 - buy, -1 - sell, 0 - no signal.
+
+    Parameters
+    - entry, exit: boolean arrays with the entry and exit conditions of each bar
+    - price, stop, target: arrays of the price and of the stop-loss and profit levels, the levels of the entry bar are
+                           kept while long and the position exits when price < stop or price > target
+    - entry_requires_flat: enter only if flat, otherwise every entry bar is a buy signal
+    - exit_flattens: an exit closes the position, otherwise the position is kept and every exit bar is a sell signal
+    - exit_first: check the exit before the entry in each bar (the last one checked wins in the same bar)
+    - initial_long: start long
+
+    The position is a forward fill of the entries and exits (cumulative operations), the levels of each bar are
+    the ones of the last entry taken. Only with levels, entry_requires_flat and exit_flattens the levels depend on
+    the previous positions (the entries while long are ignored), then the positions are evaluated one at a time,
+    each one with a vectorized search of its exit (get_first_exit).
+    """
+    entry = np.asarray(entry, dtype=bool)
+    size = len(entry)
+    exit = np.zeros(size, dtype=bool) if exit is None else np.asarray(exit, dtype=bool)
+
+    if stop is not None or target is not None:
+        price = np.asarray(price, dtype='float64')
+        stop = np.full(size, -np.inf) if stop is None else np.asarray(stop, dtype='float64')
+        target = np.full(size, np.inf) if target is None else np.asarray(target, dtype='float64')
+
+        if entry_requires_flat and exit_flattens:
+            return get_long_flat_positions_signal(entry, exit, price, stop, target, exit_first, initial_long)
+
+        # the entries taken: all of them, or only the first one if the position is never closed
+        taken = entry
+        if entry_requires_flat:
+            taken = np.zeros(size, dtype=bool)
+            if not initial_long and entry.any():
+                taken[np.argmax(entry)] = True
+        stop_level = get_forward_filled(stop, taken, -np.inf)
+        target_level = get_forward_filled(target, taken, np.inf)
+        # with exit_first, the exit of a bar is checked with the levels before its entry
+        if exit_first:
+            stop_level = np.concatenate([[-np.inf], stop_level[:-1]])
+            target_level = np.concatenate([[np.inf], target_level[:-1]])
+        exit = exit | (price < stop_level) | (price > target_level)
+
+    # position after each bar: the last entry or exit checked (the exits only close it with exit_flattens)
+    if exit_flattens:
+        long = get_forward_filled(entry if exit_first else entry & ~exit, entry | exit, initial_long)
+    else:
+        long = np.logical_or.accumulate(entry) | initial_long
+    previous = np.concatenate([[initial_long], long[:-1]])
+
+    signal = np.zeros(size, dtype='int8')
+    if exit_first:
+        exit_signal = previous & exit
+        held = previous & ~exit if exit_flattens else previous
+        signal[exit_signal] = -1
+        signal[entry & ~held if entry_requires_flat else entry] = 1
+    else:
+        entry_signal = entry & ~previous if entry_requires_flat else entry
+        signal[entry_signal] = 1
+        signal[(previous | entry_signal) & exit] = -1
 
-    signal = remove_repeated_signal(signal, 'value')
+    return signal
+
+def get_long_flat_positions_signal(entry, exit, price, stop, target, exit_first, initial_long):
+    """
+    get_long_flat_signal with levels, entry_requires_flat and exit_flattens: one iteration by position.
+    """
+    size = len(entry)
+    signal = np.zeros(size, dtype='int8')
+
+    # next entry from each position (size if none)
+    next_entry = np.where(entry, np.arange(size), size)
+    next_entry = np.minimum.accumulate(next_entry[::-1])[::-1]
+
+    position = 0
+    long = initial_long
+    stop_level = -np.inf
+    target_level = np.inf
+    while position < size:
+        if long:
+            start = position
+        else:
+            position = int(next_entry[position])
+            if position == size:
+                break
+
+            signal[position] = 1
+            stop_level = stop[position]
+            target_level = target[position]
+            start = position + 1 if exit_first else position
+
+        position = get_first_exit(exit, price, start, stop_level, target_level)
+        if position == size:
+            break
+
+        signal[position] = -1
+        long = False
+        # with exit_first, the same bar could enter again
+        if not exit_first:
+            position += 1
 
     return signal
 
-def get_macd_signal(signal_macd, macd_value, buy_first=True):
-    signal_macd.columns = ['value']
-    macd_value.columns = ['value']
-    
-    signal = macd_value.copy()
+def set_signal_values(signal, state):
+    """
+    Set the bars of the signal (DataFrame 'value' column or Series) with a state (1/-1) of get_long_flat_signal and
+    0.0 in the others, the same of setting the bars and then signal[(signal != 1.0) & (signal != -1.0)] = 0.0.
+    """
+    values = signal.to_numpy(dtype='float64').ravel()
+    values = np.where(state != 0, state, np.where((values == 1.0) | (values == -1.0), values, 0.0))
 
-    signal[signal_macd < macd_value] = 1.0
-    signal[signal_macd >= macd_value] = -1.0
+    if isinstance(signal, pd.DataFrame):
+        signal['value'] = values
+    else:
+        signal[:] = values
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return signal
 
-    signal = remove_repeated_signal(signal, 'value')
+# Array signals: the *_array functions take numpy arrays (or Series and one-column DataFrames, not copied) and return
+# an int8 array (1 - buy, -1 - sell, 0 - no signal) in out if passed (int8 array with the size of the inputs).
+# The DataFrame functions are wrappers that return float64 'value' frames with the index of the input: buy_first sets
+# the bar labeled 0 (the first one of a RangeIndex) to 1 before removing the repeated signals, and the bars without
+# signal keep the value of the input copied to build the signal if it's 1 or -1. The previous versions set it with
+# signal.at[0, 'value'], on an index without the label 0 (a DatetimeIndex) that appended a row dropped when the signal
+# was assigned to the candles, so there is no forced buy there.
 
-    return signal 
+def get_signal_input(data):
+    """
+    Returns the float64 values of a one-column DataFrame, Series or array (no copy if they are float64).
+    """
+    if isinstance(data, pd.DataFrame):
+        data = data.iloc[:, 0]
 
-def get_macd_rvi_signal(signal_macd, macd_value, signal_rvi, rvi_value, buy_first=True):
+    return np.asarray(data, dtype='float64').ravel()
+
+def get_signal_buffer(size, out=None):
     """
-    Reference: https://forexwot.com/super-macd-rvi-trading-strategy-for-day-trading-crypto-forex-stocks-high-winrate-strategy.html
+    Returns out (or a new int8 array) with size zeros.
+    """
+    if out is None:
+        return np.zeros(size, dtype='int8')
+
+    if out.shape != (size,) or out.dtype != np.int8:
+        raise ValueError('out must be an int8 array with {} values'.format(size))
+    out[:] = 0
+
+    return out
+
+def get_previous_values(values):
+    """
+    Values shifted one bar (NaN in the first one), the same of shift().
+    """
+    previous = np.empty_like(values)
+    previous[:1] = np.nan
+    previous[1:] = values[:-1]
+
+    return previous
+
+def set_base_signal(signal, base):
+    """
+    Set the bars of the signal where the base values are 1 or -1 (the bars without signal of the DataFrame functions).
+    """
+    np.copyto(signal, base, casting='unsafe', where=(base == 1.0) | (base == -1.0))
+
+    return signal
+
+def remove_repeated_signal_array(signal, out=None):
+    """
+    Array version of remove_repeated_signal: keep only the bars where the last non-zero signal changes.
+    The output has the type of the signal (or out), out could be the signal itself.
+    """
+    signal = np.asarray(signal)
+    positions = np.flatnonzero((signal != 0) & (signal == signal))
+    values = signal[positions]
+    changes = np.ones(len(values), dtype=bool)
+    np.not_equal(values[1:], values[:-1], out=changes[1:])
+
+    if out is None:
+        out = np.zeros(len(signal), dtype=signal.dtype)
+    else:
+        out[:] = 0
+    out[positions[changes]] = values[changes]
+
+    return out
+
+def get_signal_frame(data, values, buy_first=True, remove_repeated_signals=True):
+    """
+    DataFrame ('value' column, float64) of the signal values with the index of data, see the array signals.
     """
-    signal_macd.columns = ['value']
-    macd_value.columns = ['value']
-    signal_rvi.columns = ['value']
-    rvi_value.columns = ['value']
-    
-    signal = macd_value.copy()
- 
+    values = np.array(values, dtype='float64')
+
+    if buy_first:
+        first = data.index.get_indexer([0])[0]
+        if first >= 0:
+            values[first] = 1.0
+
+    if remove_repeated_signals:
+        values = remove_repeated_signal_array(values, out=values)
+
+    return pd.DataFrame({'value': values}, index=data.index, copy=False)
+
+def get_array_signal(signal, remove_repeated_signals):
+    if remove_repeated_signals:
+        return remove_repeated_signal_array(signal, out=signal)
+
+    return signal
+
+# relative difference of the cross signals compared as a tie (sell): get_sma_bank and get_sma round the same average
+# differently (~1e-11), and with prices in cents the averages are often equal, so the exact comparison would follow
+# the rounding of each function
+CROSS_RTOL = 1e-9
+
+def get_cross_signal_array(short_data, long_data, remove_repeated_signals=True, out=None):
+    short_data = get_signal_input(short_data)
+    long_data = get_signal_input(long_data)
+    tie_data = long_data + CROSS_RTOL * np.abs(long_data)
+
+    signal = get_signal_buffer(len(long_data), out)
+    signal[short_data > tie_data] = 1
+    signal[short_data <= tie_data] = -1
+
+    return get_array_signal(signal, remove_repeated_signals)
+
+def get_cross_signal(short_data, long_data, buy_first=True, remove_repeated_signals=True):
+    long_values = get_signal_input(long_data)
+    signal = get_cross_signal_array(short_data, long_values, remove_repeated_signals=False)
+
+    # the bars without comparison (NaN) keep the long value
+    return get_signal_frame(long_data, np.where(signal != 0, signal, long_values), buy_first, remove_repeated_signals)
+
+def get_macd_signal_array(signal_macd, macd_value, remove_repeated_signals=True, out=None):
+    signal_macd = get_signal_input(signal_macd)
+    macd_value = get_signal_input(macd_value)
+
+    signal = get_signal_buffer(len(macd_value), out)
+    signal[signal_macd < macd_value] = 1
+    signal[signal_macd >= macd_value] = -1
+
+    return get_array_signal(signal, remove_repeated_signals)
+
+def get_macd_signal(signal_macd, macd_value, buy_first=True, remove_repeated_signals=True):
+    macd_values = get_signal_input(macd_value)
+    signal = get_macd_signal_array(signal_macd, macd_values, remove_repeated_signals=False)
+
+    # the bars without comparison (NaN) keep the MACD value
+    return get_signal_frame(macd_value, np.where(signal != 0, signal, macd_values), buy_first, remove_repeated_signals)
+
+def get_macd_rvi_signal_array(signal_macd, macd_value, signal_rvi, rvi_value, remove_repeated_signals=True, out=None):
+    signal_macd = get_signal_input(signal_macd)
+    macd_value = get_signal_input(macd_value)
+    signal_rvi = get_signal_input(signal_rvi)
+    rvi_value = get_signal_input(rvi_value)
+
+    signal = set_base_signal(get_signal_buffer(len(macd_value), out), macd_value)
     #long
-    signal[(signal_macd < macd_value) & (signal_rvi < rvi_value)] = 1.0
+    signal[(signal_macd < macd_value) & (signal_rvi < rvi_value)] = 1
     #exit
     #signal[(signal_macd > macd_value) & (signal.shift() == 1.0)] = -1.0
 
     #short
-    signal[(signal_macd > macd_value) & (signal_rvi > rvi_value)] = -1.0
+    signal[(signal_macd > macd_value) & (signal_rvi > rvi_value)] = -1
     #exit
     #signal[(signal_macd < macd_value) & (signal.shift() == -1.0)] = 1.0
 
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_array_signal(signal, remove_repeated_signals)
+
+def get_macd_rvi_signal(signal_macd, macd_value, signal_rvi, rvi_value, buy_first=True, remove_repeated_signals=True):
+    """
+    Reference: https://forexwot.com/super-macd-rvi-trading-strategy-for-day-trading-crypto-forex-stocks-high-winrate-strategy.html
+    """
+    signal = get_macd_rvi_signal_array(signal_macd, macd_value, signal_rvi, rvi_value, remove_repeated_signals=False)
+
+    return get_signal_frame(macd_value, signal, buy_first, remove_repeated_signals)
 
-    signal = remove_repeated_signal(signal, 'value')
+def get_rsi_signal_array(signal, overbought_value=70.0, oversold_value=30.0, remove_repeated_signals=True, out=None):
+    rsi = get_signal_input(signal)
+    buy = rsi < oversold_value
 
-    return signal 
+    signal = set_base_signal(get_signal_buffer(len(rsi), out), rsi)
+    signal[buy] = 1
+    # the bars with a buy signal are compared as 1.0
+    signal[np.where(buy, 1.0, rsi) > overbought_value] = -1
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_rsi_signal(signal, overbought_value=70.0, oversold_value=30.0, buy_first=True, remove_repeated_signals=True):
-    signal.columns = ['value']
-    signal[signal < oversold_value] = 1.0
-    signal[signal > overbought_value] = -1.0
+    values = get_rsi_signal_array(signal, overbought_value, oversold_value, remove_repeated_signals=False)
 
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_signal_frame(signal, values, buy_first, remove_repeated_signals)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+def get_rsi_enter_signal_array(signal, overbought_value=70.0, oversold_value=30.0, remove_repeated_signals=True, out=None):
+    # each rule compares the values changed by the previous ones
+    values = get_signal_input(signal).copy()
+    values[(get_previous_values(values) > oversold_value) & (values <= oversold_value)] = 1.0
+    values[(get_previous_values(values) < overbought_value) & (values >= overbought_value)] = -1.0
 
-    return signal
+    signal = set_base_signal(get_signal_buffer(len(values), out), values)
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_rsi_enter_signal(signal, overbought_value=70.0, oversold_value=30.0, buy_first=True, remove_repeated_signals=True):
-    signal.columns = ['value']
-    signal[(signal.shift() > oversold_value) & (signal <= oversold_value)] = 1.0
-    signal[(signal.shift() < overbought_value) & (signal >= overbought_value)] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    values = get_rsi_enter_signal_array(signal, overbought_value, oversold_value, remove_repeated_signals=False)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+    return get_signal_frame(signal, values, buy_first, remove_repeated_signals)
 
-    return signal
+def get_rsi_return_signal_array(signal, overbought_value=70.0, oversold_value=30.0, remove_repeated_signals=True, out=None):
+    # each rule compares the values changed by the previous ones
+    values = get_signal_input(signal).copy()
+    values[(get_previous_values(values) < oversold_value) & (values >= oversold_value)] = 1.0
+    values[(get_previous_values(values) > overbought_value) & (values <= overbought_value)] = -1.0
+
+    signal = set_base_signal(get_signal_buffer(len(values), out), values)
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_rsi_return_signal(signal, overbought_value=70.0, oversold_value=30.0, buy_first=True, remove_repeated_signals=True):
-    signal.columns = ['value']
-    signal[(signal.shift() < oversold_value) & (signal >= oversold_value)] = 1.0
-    signal[(signal.shift() > overbought_value) & (signal <= overbought_value)] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    values = get_rsi_return_signal_array(signal, overbought_value, oversold_value, remove_repeated_signals=False)
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_signal_frame(signal, values, buy_first, remove_repeated_signals)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+def get_inverted_rsi_signal_array(signal, overbought_value=70.0, oversold_value=30.0, remove_repeated_signals=True, out=None):
+    # each rule compares the values changed by the previous ones
+    values = get_signal_input(signal).copy()
+    values[(values >= overbought_value) & (get_previous_values(values) < overbought_value)] = 1.0
+    values[(values < overbought_value) & (get_previous_values(values) >= overbought_value)] = -1.0
 
-    return signal
+    values[(values <= oversold_value) & (get_previous_values(values) > oversold_value)] = -1.0
+    values[(values > oversold_value) & (get_previous_values(values) <= oversold_value)] = 1.0
+
+    signal = set_base_signal(get_signal_buffer(len(values), out), values)
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_inverted_rsi_signal(signal, overbought_value=70.0, oversold_value=30.0, buy_first=True, remove_repeated_signals=True):
     """
     Buy when overbought begins (signal >= overbought_value) and sell when signal returns to a value below overbought_value.
     Sell when oversold begins (signal <= oversold_value) and buy when signal returns to a value above oversold_value.
     """
-
-    signal.columns = ['value']
-    signal[(signal >= overbought_value) & (signal.shift() < overbought_value)] = 1.0
-    signal[(signal < overbought_value) & (signal.shift() >= overbought_value)] = -1.0
-
-    signal[(signal <= oversold_value) & (signal.shift() > oversold_value)] = -1.0
-    signal[(signal > oversold_value) & (signal.shift() <= oversold_value)] = 1.0
-
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
-
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
-
-    return signal
+    values = get_inverted_rsi_signal_array(signal, overbought_value, oversold_value, remove_repeated_signals=False)
+
+    return get_signal_frame(signal, values, buy_first, remove_repeated_signals)
+
+def get_rsi_adx_signal_array(signal,
+        adx,
+        di_plus,
+        di_minus,
+        overbought_value=70.0,
+        oversold_value=30.0,
+        adx_value=25.0,
+        remove_repeated_signals=True,
+        out=None):
+    rsi = get_signal_input(signal)
+    adx = get_signal_input(adx)
+    di_plus = get_signal_input(di_plus)
+    di_minus = get_signal_input(di_minus)
+
+    signal = set_base_signal(get_signal_buffer(len(rsi), out), rsi)
+    signal[(rsi < oversold_value) & (adx > adx_value) & (di_minus > di_plus)] = 1
+    signal[(rsi > overbought_value) & (adx > adx_value) & (di_minus < di_plus)] = -1
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_rsi_adx_signal(signal, 
         adx, di_plus, 
@@ -150,51 +416,51 @@ def get_rsi_adx_signal(signal,
     """
     https://usethebitcoin.com/how-to-trade-pullbacks-using-rsi-and-adx/
     """
-    signal.columns = ['value']
-    adx.columns = ['value']
-    di_plus.columns = ['value']
-    di_minus.columns = ['value']
+    values = get_rsi_adx_signal_array(signal, adx, di_plus, di_minus, overbought_value, oversold_value, adx_value,
+                                      remove_repeated_signals=False)
 
-    signal[(signal < oversold_value) & (adx > adx_value) & (di_minus > di_plus)] = 1.0
-    signal[(signal > overbought_value) & (adx > adx_value) & (di_minus < di_plus)] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_signal_frame(signal, values, buy_first, remove_repeated_signals)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+def get_5_minute_signal_array(price_data, macd_history, ema, remove_repeated_signals=True, out=None):
+    price = get_signal_input(price_data)
+    ema = get_signal_input(ema)
 
-    return signal
+    entry = (price > ema) & (get_signal_input(macd_history) > 0)
+    exit = price < ema
+
+    # once long, every bar below the ema is a sell signal (the position is never closed)
+    state = get_long_flat_signal(entry, exit, entry_requires_flat=False, exit_flattens=False)
+    signal = set_base_signal(get_signal_buffer(len(price), out), price)
+    np.copyto(signal, state, where=state != 0)
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_5_minute_signal(price_data, macd_history, ema, buy_first=True, remove_repeated_signals=True):
     """
     https://www.investopedia.com/articles/forex/08/five-minute-momo.asp
     """
-    price_data.columns = ['value']
-    macd_history.columns = ['value']
-    ema.columns = ['value']
+    values = get_5_minute_signal_array(price_data, macd_history, ema, remove_repeated_signals=False)
 
-    signal = price_data.copy()
-    long = False
+    return get_signal_frame(price_data, values, buy_first, remove_repeated_signals)
 
-    for i in range(price_data.size):
-        if price_data.iloc[i]['value'] > ema.iloc[i]['value'] and macd_history.iloc[i]['value'] > 0:
-            signal.iloc[i] = 1.0
-            long = True
-        
-        if price_data.iloc[i]['value'] < ema.iloc[i]['value'] and long:
-            signal.iloc[i] = -1.0
+def get_sma_macd_signal_array(price_data, short_data, long_data, macd_data, remove_repeated_signals=True, out=None):
+    price = get_signal_input(price_data)
+    short = get_signal_input(short_data)
 
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    # number of consecutive bars with a positive MACD up to each bar (the first bar is never counted)
+    positive = get_signal_input(macd_data) > 0
+    positive[:1] = False
+    positions = np.arange(len(positive))
+    num_positive_candles = positions - np.maximum.accumulate(np.where(positive, -1, positions))
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    entry = (price > short) & (price > get_signal_input(long_data)) & (num_positive_candles < 6)
+    exit = price < short
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+    state = get_long_flat_signal(entry, exit, entry_requires_flat=False, exit_flattens=False)
+    signal = set_base_signal(get_signal_buffer(len(price), out), price)
+    np.copyto(signal, state, where=state != 0)
 
-    return signal
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_sma_macd_signal(price_data, short_data, long_data, macd_data, buy_first=True, remove_repeated_signals=True):
     """ 
@@ -205,37 +471,21 @@ def get_sma_macd_signal(price_data, short_data, long_data, macd_data, buy_first=
     - TODO Exit of half investment on 2x the difference from entry to stop
     - Exit on price_data below SMA 50 (short)
     """
-    price_data.columns = ['value']
-    short_data.columns = ['value']
-    long_data.columns = ['value']
-    macd_data.columns = ['value']
-
-    signal = price_data.copy()
-    long = False
-    for i in range(price_data.size):
-        if price_data.iloc[i]['value'] > short_data.iloc[i]['value'] and price_data.iloc[i]['value'] > long_data.iloc[i]['value']:
-            num_positive_candles = 0
-            pos = i
-            while (pos > 0 and macd_data.iloc[pos]['value'] > 0):
-                pos-=1
-                num_positive_candles+=1
-            
-            if num_positive_candles < 6:
-                signal.iloc[i] = 1.0
-                long = True
-        
-        if price_data.iloc[i]['value'] < short_data.iloc[i]['value'] and long:
-            signal.iloc[i] = -1.0
-    
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    values = get_sma_macd_signal_array(price_data, short_data, long_data, macd_data, remove_repeated_signals=False)
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_signal_frame(price_data, values, buy_first, remove_repeated_signals)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+def get_adx_macd_signal_array(macd, di_plus, di_minus, adx, remove_repeated_signals=True, out=None):
+    macd = get_signal_input(macd)
+    di_plus = get_signal_input(di_plus)
+    di_minus = get_signal_input(di_minus)
+    adx = get_signal_input(adx)
 
-    return signal
+    signal = set_base_signal(get_signal_buffer(len(macd), out), macd)
+    signal[(macd > 0) & (di_plus > di_minus) & (adx > 20)] = 1
+    signal[(macd < 0) & (di_plus < di_minus) & (adx > 20)] = -1
+
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_adx_macd_signal(macd, di_plus, di_minus, adx, buy_first=True, remove_repeated_signals=True):
     """
@@ -251,161 +501,113 @@ def get_adx_macd_signal(macd, di_plus, di_minus, adx, buy_first=True, remove_rep
     ADX line rises above 20
     Open a short trade where these conditions meet
     """
-    macd.columns = ['value']
-    di_plus.columns = ['value']
-    di_minus.columns = ['value']
-    adx.columns = ['value']
+    values = get_adx_macd_signal_array(macd, di_plus, di_minus, adx, remove_repeated_signals=False)
 
-    signal = macd.copy()
+    return get_signal_frame(macd, values, buy_first, remove_repeated_signals)
 
-    signal[(macd > 0) & (di_plus > di_minus) & (adx > 20)] = 1.0
-    signal[(macd < 0) & (di_plus < di_minus) & (adx > 20)] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+def get_bbands_signal_array(price_data, upper_band, lower_band, remove_repeated_signals=True, out=None):
+    price = get_signal_input(price_data)
+    upper_band = get_signal_input(upper_band)
+    lower_band = get_signal_input(lower_band)
+    previous_price = get_previous_values(price)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+    signal = set_base_signal(get_signal_buffer(len(price), out), price)
+    signal[(previous_price < lower_band) & (price >= lower_band)] = 1
+    signal[(previous_price > upper_band) & (price <= upper_band)] = -1
 
-    return signal
+    return get_array_signal(signal, remove_repeated_signals)
 
 def get_bbands_signal(price_data, upper_band, lower_band, buy_first=True, remove_repeated_signals=True):
-    price_data.columns = ['value']
-    upper_band.columns = ['value']
-    lower_band.columns = ['value']
-
-    signal = price_data.copy()
-    signal[(price_data.shift() < lower_band) & (price_data >= lower_band)] = 1.0
-    signal[(price_data.shift() > upper_band) & (price_data <= upper_band)] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
-    
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    values = get_bbands_signal_array(price_data, upper_band, lower_band, remove_repeated_signals=False)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+    return get_signal_frame(price_data, values, buy_first, remove_repeated_signals)
 
-    return signal
+def get_rsi_bbands_signal_array(price_data, upper_band, lower_band, rsi, remove_repeated_signals=True, out=None):
+    price = get_signal_input(price_data)
+    rsi = get_signal_input(rsi)
 
-def get_rsi_bbands_signal(price_data, upper_band, lower_band, rsi, buy_first=True, remove_repeated_signals=True):
-    """
-    https://www.linkedin.com/pulse/algorithmic-trading-mean-reversion-using-python-bryan-chen/
-    """
-    price_data.columns = ['value']
-    upper_band.columns = ['value']
-    lower_band.columns = ['value']
-    rsi.columns = ['value']
-
-    signal = price_data.copy()
-    signal[(rsi < 30) & (price_data < lower_band)] = 1.0
-    signal [(rsi > 70) & (price_data > upper_band)] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    signal = set_base_signal(get_signal_buffer(len(price), out), price)
+    signal[(rsi < 30) & (price < get_signal_input(lower_band))] = 1
+    signal[(rsi > 70) & (price > get_signal_input(upper_band))] = -1
 
     #buy/sell next trading day
     #signal = signal.shift()
     #signal = signal.fillna(0)
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_array_signal(signal, remove_repeated_signals)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+def get_rsi_bbands_signal(price_data, upper_band, lower_band, rsi, buy_first=True, remove_repeated_signals=True):
+    """
+    https://www.linkedin.com/pulse/algorithmic-trading-mean-reversion-using-python-bryan-chen/
+    """
+    values = get_rsi_bbands_signal_array(price_data, upper_band, lower_band, rsi, remove_repeated_signals=False)
 
-    return signal
+    return get_signal_frame(price_data, values, buy_first, remove_repeated_signals)
 
-def get_dmi_signal(di_plus, di_minus, adx, adx_value=25.0, buy_first=True, remove_repeated_signals=True):
-    di_plus.columns = ['value']
-    di_minus.columns = ['value']
-    adx.columns = ['value']
+def get_dmi_signal_array(di_plus, di_minus, adx, adx_value=25.0, remove_repeated_signals=True, out=None):
+    di_plus = get_signal_input(di_plus)
+    di_minus = get_signal_input(di_minus)
+    adx = get_signal_input(adx)
 
-    signal = adx.copy()
-    signal[(di_plus > di_minus) & (adx >= adx_value) & (di_plus > di_plus.shift())] = 1.0
-    signal[(di_plus < di_minus) & (adx >= adx_value) & (di_minus > di_minus.shift())] = -1.0
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    signal = set_base_signal(get_signal_buffer(len(adx), out), adx)
+    signal[(di_plus > di_minus) & (adx >= adx_value) & (di_plus > get_previous_values(di_plus))] = 1
+    signal[(di_plus < di_minus) & (adx >= adx_value) & (di_minus > get_previous_values(di_minus))] = -1
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_array_signal(signal, remove_repeated_signals)
 
-    if remove_repeated_signals:
-        signal = remove_repeated_signal(signal, 'value')
+def get_dmi_signal(di_plus, di_minus, adx, adx_value=25.0, buy_first=True, remove_repeated_signals=True):
+    values = get_dmi_signal_array(di_plus, di_minus, adx, adx_value, remove_repeated_signals=False)
 
-    return signal
+    return get_signal_frame(adx, values, buy_first, remove_repeated_signals)
 
-def get_ema_atr_signal(price_data, rsi_value, ema_value, atr_value, oversold_value=30):
+def get_ema_atr_signal_array(price_data, rsi_value, ema_value, atr_value, oversold_value=30, out=None):
     """
     entry: rsi < oversold_value & price > ema200
     stop-loss: ema 200 - (atr/2)
     profit: price + ((price - stop-loss) * 2)
     """
-    price_data.columns = ['value']
-    rsi_value.columns = ['value']
-    ema_value.columns = ['value']
-    atr_value.columns = ['value']
-
-    signal = price_data.copy()
-    long = False
-    stop_loss = 0.0
-    profit = 0.0
-    for i in range(price_data.size):
-        #entry
-        if price_data.iloc[i]['value'] > ema_value.iloc[i]['value'] and rsi_value.iloc[i]['value'] < oversold_value and not long:
-            signal.iloc[i] = 1.0
-            stop_loss = ema_value.iloc[i]['value'] - (atr_value.iloc[i]['value'] / 2)
-            profit = price_data.iloc[i]['value'] + ((price_data.iloc[i]['value'] - stop_loss) * 2)
-            long = True
-        
-        #stop-loss
-        if price_data.iloc[i]['value'] < stop_loss and long:
-            signal.iloc[i] = -1.0
-            long = False
-
-        #profit
-        if price_data.iloc[i]['value'] > profit and long:
-            signal.iloc[i] = -1.0
-            long = False
-            
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    price = get_signal_input(price_data)
+    ema = get_signal_input(ema_value)
+
+    entry = (price > ema) & (get_signal_input(rsi_value) < oversold_value)
+    stop_loss = ema - (get_signal_input(atr_value) / 2)
+    profit = price + ((price - stop_loss) * 2)
+
+    state = get_long_flat_signal(entry, price=price, stop=stop_loss, target=profit)
+    signal = set_base_signal(get_signal_buffer(len(price), out), price)
+    np.copyto(signal, state, where=state != 0)
 
     return signal
 
-def get_rsi_atr_signal(price_data, rsi_value, atr_value, oversold_value=30):
+def get_ema_atr_signal(price_data, rsi_value, ema_value, atr_value, oversold_value=30):
+    values = get_ema_atr_signal_array(price_data, rsi_value, ema_value, atr_value, oversold_value)
+
+    return get_signal_frame(price_data, values, buy_first=False, remove_repeated_signals=False)
+
+def get_rsi_atr_signal_array(price_data, rsi_value, atr_value, oversold_value=30, out=None):
     """
     entry: rsi < oversold_value
     stop-loss: price - (atr * 2)
     profit: price + ((price - stop-loss) * 2)
     """
-    price_data.columns = ['value']
-    rsi_value.columns = ['value']
-    atr_value.columns = ['value']
-
-    signal = price_data.copy()
-    long = False
-    stop_loss = 0.0
-    profit = 0.0
-    for i in range(price_data.size):
-        #entry
-        if rsi_value.iloc[i]['value'] < oversold_value and not long:
-            signal.iloc[i] = 1.0
-            stop_loss = price_data.iloc[i]['value'] - (atr_value.iloc[i]['value'] * 2)
-            profit = price_data.iloc[i]['value'] + ((price_data.iloc[i]['value'] - stop_loss) * 2)
-            long = True
-        
-        #stop-loss
-        if price_data.iloc[i]['value'] < stop_loss and long:
-            signal.iloc[i] = -1.0
-            long = False
-
-        #profit
-        if price_data.iloc[i]['value'] > profit and long:
-            signal.iloc[i] = -1.0
-            long = False
-            
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    price = get_signal_input(price_data)
+
+    entry = get_signal_input(rsi_value) < oversold_value
+    stop_loss = price - (get_signal_input(atr_value) * 2)
+    profit = price + ((price - stop_loss) * 2)
+
+    state = get_long_flat_signal(entry, price=price, stop=stop_loss, target=profit)
+    signal = set_base_signal(get_signal_buffer(len(price), out), price)
+    np.copyto(signal, state, where=state != 0)
 
     return signal
 
-def get_planBTC_strategy(rsi_value, buy_first=True):
+def get_rsi_atr_signal(price_data, rsi_value, atr_value, oversold_value=30):
+    values = get_rsi_atr_signal_array(price_data, rsi_value, atr_value, oversold_value)
+
+    return get_signal_frame(price_data, values, buy_first=False, remove_repeated_signals=False)
+
+def get_planBTC_strategy_array(rsi_value, buy_first=True, out=None):
     """
     https://planbtc.com/20220807QuantInvesting101.pdf
     * Data tested from January 2011
@@ -415,7 +617,7 @@ def get_planBTC_strategy(rsi_value, buy_first=True):
     IF (RSI was below 50% last six months AND jumps +2% from the low) THEN buy, 
     ELSE hold
     """
-    rsi_value.columns = ['value']
+    rsi = get_signal_input(rsi_value)
 
     # strategy params
     months_range = 6
@@ -423,39 +625,34 @@ def get_planBTC_strategy(rsi_value, buy_first=True):
     overbought_drop_value = 65
     oversold_value = 50
 
-    signal = rsi_value.copy()
-    long = False
+    # max and min of the last six months and the current month
+    rolling_rsi = pd.Series(rsi).rolling(months_range + 1, min_periods=1)
+    max_rsi_last_6_months = rolling_rsi.max().to_numpy()
+    min_rsi_last_6_months = rolling_rsi.min().to_numpy()
+
+    # SELL is checked before BUY in each month
+    sell = (max_rsi_last_6_months >= overbought_value) & (rsi <= overbought_drop_value)
+    buy = (min_rsi_last_6_months <= oversold_value) & (rsi >= min_rsi_last_6_months + 2)
+
+    state = get_long_flat_signal(buy, sell, exit_first=True, initial_long=buy_first)
+    signal = set_base_signal(get_signal_buffer(len(rsi), out), rsi)
     if buy_first:
-        signal.iloc[0] = 1.0
-        long = True
-
-    for i in range(rsi_value.size):
-        rsi = rsi_value.iloc[i]
-        max_rsi_last_6_months = rsi_value[i-months_range:i+1].max()
-        min_rsi_last_6_months = rsi_value[i-months_range:i+1].min()
-        if i < 6:
-            max_rsi_last_6_months = rsi_value[:i+1].max()
-            min_rsi_last_6_months = rsi_value[:i+1].min()
-
-        # SELL
-        if (max_rsi_last_6_months >= overbought_value and 
-                rsi <= overbought_drop_value and 
-                long):
-            signal.iloc[i] = -1.0
-            long = False
-        
-        # BUY
-        if (min_rsi_last_6_months <= oversold_value and 
-                rsi >= min_rsi_last_6_months + 2 and 
-                not long):
-            signal.iloc[i] = 1.0
-            long = True
-
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+        signal[:1] = 1
+    np.copyto(signal, state, where=state != 0)
 
     return signal
 
-def get_rsi_hurst_signal(rsi, hurst_signal, buy_first=True):
+def get_planBTC_strategy(rsi_value, buy_first=True):
+    """
+    See get_planBTC_strategy_array, returns the signal with the type (Series or DataFrame) and index of rsi_value.
+    """
+    signal = rsi_value.copy()
+    if isinstance(signal, pd.DataFrame):
+        signal.columns = ['value']
+
+    return set_signal_values(signal, get_planBTC_strategy_array(rsi_value, buy_first))
+
+def get_rsi_hurst_signal_array(rsi, hurst_signal, remove_repeated_signals=True, out=None):
     """
     BUY when:
     - RSI is more than 75 and Persistence signal is 1
@@ -465,20 +662,18 @@ def get_rsi_hurst_signal(rsi, hurst_signal, buy_first=True):
     - RSI is more than 75 and Persistence signal is -1
     - RSI is less than 25 and Persistence signal is 1
     """
-    rsi.columns = ['value']
-    hurst_signal.columns = ['value']
-
-    signal = rsi.copy()
-    signal[(rsi > 75) & (hurst_signal == 1)] = 1.0
-    signal[(rsi < 25) & (hurst_signal == -1)] = 1.0
-    signal[(rsi > 75) & (hurst_signal == -1)] = -1.0
-    signal[(rsi < 25) & (hurst_signal == 1)] = -1.0
+    rsi = get_signal_input(rsi)
+    hurst_signal = get_signal_input(hurst_signal)
 
-    signal[(signal != 1.0) & (signal != -1.0)] = 0.0
+    signal = set_base_signal(get_signal_buffer(len(rsi), out), rsi)
+    signal[(rsi > 75) & (hurst_signal == 1)] = 1
+    signal[(rsi < 25) & (hurst_signal == -1)] = 1
+    signal[(rsi > 75) & (hurst_signal == -1)] = -1
+    signal[(rsi < 25) & (hurst_signal == 1)] = -1
 
-    if buy_first:
-        signal.at[0, 'value'] = 1.0
+    return get_array_signal(signal, remove_repeated_signals)
 
-    signal = remove_repeated_signal(signal, 'value')
+def get_rsi_hurst_signal(rsi, hurst_signal, buy_first=True):
+    values = get_rsi_hurst_signal_array(rsi, hurst_signal, remove_repeated_signals=False)
 
-    return signal
\ No newline at end of file
+    return get_signal_frame(rsi, values, buy_first)
@@ -0,0 +1,574 @@
+import re
+import math
+import numpy as np
+import pandas as pd
+from collections import deque
+
+from technical_indicator_utils import ROLLING_STATS_BLOCK_SIZE
+
+"""
+Streaming (incremental) versions of the indicators of technical_indicator_utils.
+
+Each state is seeded once with the history (seed) and then advanced one bar at a time (update) in constant time,
+update returns the values of the new bar. The states use the same online algorithms of pandas (compensated rolling
+sums, ewm recursion), so the values are the same of the batch functions, see check_streaming_indicators in
+benchmark_utils.py.
+
+state = RSIState().seed(df['ClosePrice'])
+rsi = state.update(close_price)
+"""
+
+NAN = float('nan')
+
+class RollingMeanState:
+    """
+    Same algorithm of Series.rolling(window).mean() (Kahan sums to add and remove values).
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def add(self, value):
+        if self.prev_value is None:
+            self.prev_value = value
+
+        if value == value:
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_ct += 1
+
+            if value == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = value
+
+    def remove(self, value):
+        if value == value:
+            self.nobs -= 1
+            y = - value - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_ct -= 1
+
+    def update(self, value):
+        value = float(value)
+        if len(self.values) == self.window:
+            self.remove(self.values.popleft())
+        self.values.append(value)
+        self.add(value)
+
+        if self.nobs >= self.window:
+            result = self.sum_x / self.nobs
+            if self.num_consecutive_same_value >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return result
+
+        return NAN
+
+class EWMState:
+    """
+    Same algorithm of Series.ewm(...).mean() (ignore_na=False).
+    """
+
+    def __init__(self, span=None, alpha=None, adjust=True):
+        com = (span - 1) / 2.0 if span is not None else 1.0 / alpha - 1.0
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.old_wt = 1.0
+        self.weighted = None
+
+    def update(self, value):
+        value = float(value)
+
+        if self.weighted is None:
+            self.weighted = value
+        elif self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if value == value:
+                # avoid numerical errors on constant series
+                if self.weighted != value:
+                    self.weighted = self.old_wt * self.weighted + self.new_wt * value
+                    self.weighted /= (self.old_wt + self.new_wt)
+                if self.adjust:
+                    self.old_wt += self.new_wt
+                else:
+                    self.old_wt = 1.0
+        elif value == value:
+            self.weighted = value
+
+        return self.weighted
+
+class WilderState:
+    """
+    Same values of get_wilder_smoothing: SMA of the first periods values as seed, then EWM (alpha = 1/periods).
+    A NaN after the seed propagates to the end.
+    """
+
+    def __init__(self, periods):
+        self.periods = periods
+        self.window = []
+        self.ewm = None
+        self.is_nan = False
+
+    def update(self, value):
+        value = float(value)
+
+        if self.is_nan:
+            return NAN
+
+        if self.ewm is None:
+            if len(self.window) == 0 and value != value:
+                # NaNs in the beginning
+                return NAN
+
+            self.window.append(value)
+            if len(self.window) < self.periods:
+                return NAN
+
+            self.ewm = EWMState(alpha=1/self.periods, adjust=False)
+            return self.ewm.update(pd.Series(self.window).mean())
+
+        if value != value:
+            self.is_nan = True
+            return NAN
+
+        return self.ewm.update(value)
+
+class SMAState:
+    """
+    Same algorithm of get_sma_bank: difference of the cumulative sums of the prices minus the first price.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.reference = None
+        self.cumsum = 0.0
+        self.count = 0
+        # cumulative sum and count of valid prices at the start of the window
+        self.sums = deque([(0.0, 0)], maxlen=period + 1)
+        self.run = 0
+        self.prev_value = None
+
+    def seed(self, close_price):
+        for value in close_price.to_numpy(dtype='float64'):
+            self.update(value)
+
+        return self
+
+    def update(self, close_price):
+        value = float(close_price)
+        if value == value:
+            if self.reference is None:
+                self.reference = value
+            self.cumsum += value - self.reference
+            self.count += 1
+
+        if value == self.prev_value:
+            self.run += 1
+        else:
+            self.run = 1
+        self.prev_value = value
+
+        self.sums.append((self.cumsum, self.count))
+        if len(self.sums) <= self.period:
+            return NAN
+
+        start_sum, start_count = self.sums[0]
+        if self.count - start_count < self.period:
+            return NAN
+        if self.run >= self.period:
+            return value
+
+        return (self.cumsum - start_sum) / self.period + self.reference
+
+class EMAState:
+    def __init__(self, period):
+        self.ewm = EWMState(span=period, adjust=False)
+
+    def seed(self, close_price):
+        for value in close_price.to_numpy(dtype='float64'):
+            self.update(value)
+
+        return self
+
+    def update(self, close_price):
+        return self.ewm.update(close_price)
+
+class MACDState:
+    def __init__(self):
+        self.short_ema = EMAState(12)
+        self.long_ema = EMAState(26)
+        self.signal_ema = EMAState(9)
+
+    def seed(self, close_price):
+        for value in close_price.to_numpy(dtype='float64'):
+            self.update(value)
+
+        return self
+
+    def update(self, close_price):
+        """
+        Returns MACD, signal and histogram.
+        """
+        macd = self.short_ema.update(close_price) - self.long_ema.update(close_price)
+        signal = self.signal_ema.update(macd)
+
+        return macd, signal, macd - signal
+
+class RSIState:
+    def __init__(self, period=14):
+        self.up = EWMState(alpha=1/period)
+        self.down = EWMState(alpha=1/period)
+        self.prev_close = None
+
+    def seed(self, close_price):
+        for value in close_price.to_numpy(dtype='float64'):
+            self.update(value)
+
+        return self
+
+    def update(self, close_price):
+        close_price = float(close_price)
+        delta = close_price - self.prev_close if self.prev_close is not None else NAN
+        self.prev_close = close_price
+
+        up = self.up.update(0.0 if delta < 0 else delta)
+        down = self.down.update(-0.0 if delta > 0 else -delta)
+
+        if up == 0:
+            rsi = 0.0
+        elif down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + up / down))
+
+        return float(np.round(rsi, 2))
+
+class TRState:
+    def __init__(self):
+        self.prev_close = NAN
+
+    def update(self, high_price, low_price, close_price):
+        high_low = high_price - low_price
+        high_close = abs(high_price - self.prev_close)
+        low_close = abs(low_price - self.prev_close)
+        self.prev_close = close_price
+
+        if high_low != high_low or high_close != high_close or low_close != low_close:
+            return NAN
+
+        return max(high_low, high_close, low_close)
+
+class ADXState:
+    def __init__(self, period=14):
+        self.tr = TRState()
+        self.smoothed_dm_plus = WilderState(period)
+        self.smoothed_dm_minus = WilderState(period)
+        self.smoothed_tr = WilderState(period)
+        self.adx = WilderState(period)
+        self.prev_high = NAN
+        self.prev_low = NAN
+
+    def seed(self, high_price, low_price, close_price):
+        for values in zip(high_price.to_numpy(dtype='float64'), low_price.to_numpy(dtype='float64'), close_price.to_numpy(dtype='float64')):
+            self.update(*values)
+
+        return self
+
+    def update(self, high_price, low_price, close_price):
+        """
+        Returns DI+, DI- and ADX.
+        """
+        high_price, low_price, close_price = float(high_price), float(low_price), float(close_price)
+        tr = self.tr.update(high_price, low_price, close_price)
+
+        up = high_price - self.prev_high
+        down = self.prev_low - low_price
+        dm_plus = (up if up > 0 else 0.0) if up > down else 0.0
+        dm_minus = (down if down > 0 else 0.0) if down > up else 0.0
+        #if yesterday's value is NaN, DM must be NaN too
+        if self.prev_high != self.prev_high:
+            dm_plus = NAN
+        if self.prev_low != self.prev_low:
+            dm_minus = NAN
+        self.prev_high = high_price
+        self.prev_low = low_price
+
+        smoothed_dm_plus = np.float64(self.smoothed_dm_plus.update(dm_plus))
+        smoothed_dm_minus = np.float64(self.smoothed_dm_minus.update(dm_minus))
+        smoothed_tr = np.float64(self.smoothed_tr.update(tr))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            di_plus = (smoothed_dm_plus/smoothed_tr)*100
+            di_minus = (smoothed_dm_minus/smoothed_tr)*100
+            dx = abs((di_plus - di_minus)/(di_plus + di_minus))*100
+
+        return float(di_plus), float(di_minus), self.adx.update(dx)
+
+class RVIState:
+    def __init__(self, period=10):
+        self.close_open = deque([NAN] * 4, maxlen=4)
+        self.high_low = deque([NAN] * 4, maxlen=4)
+        self.rvi = deque([NAN] * 3, maxlen=3)
+        self.numerator = RollingMeanState(period)
+        self.denominator = RollingMeanState(period)
+
+    def seed(self, open_price, close_price, low_price, high_price):
+        for values in zip(open_price.to_numpy(dtype='float64'), close_price.to_numpy(dtype='float64'),
+                low_price.to_numpy(dtype='float64'), high_price.to_numpy(dtype='float64')):
+            self.update(*values)
+
+        return self
+
+    def update(self, open_price, close_price, low_price, high_price):
+        """
+        Returns RVI and signal.
+        """
+        a = float(close_price) - float(open_price)
+        e = float(high_price) - float(low_price)
+        # deques have the values of the last 4 bars (the oldest first)
+        numerator = (a + 2 * self.close_open[2] + 2 * self.close_open[1] + 2 * self.close_open[0]) / 6
+        denominator = (e + 2 * self.high_low[2] + 2 * self.high_low[1] + 2 * self.high_low[0]) / 6
+        self.close_open.append(a)
+        self.high_low.append(e)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rvi = float(np.float64(self.numerator.update(numerator)) / self.denominator.update(denominator))
+        signal = (rvi + 2 * self.rvi[2] + 2 * self.rvi[1] + self.rvi[0]) / 6
+        self.rvi.append(rvi)
+
+        return rvi, signal
+
+class RollingStatsState:
+    """
+    Same algorithm of get_rolling_stats: sums of the prices shifted by the first price of the block, by block of
+    ROLLING_STATS_BLOCK_SIZE rows. update returns the mean and the standard deviation (ddof=1).
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.block_size = max(ROLLING_STATS_BLOCK_SIZE, period)
+        self.position = -1
+        # first prices of the previous and the current block
+        self.references = [0.0, 0.0]
+        self.has_reference = False
+        self.sum1 = 0.0
+        self.sum2 = 0.0
+        self.count = 0
+        # sums at the end of the previous block
+        self.last_sum1 = 0.0
+        self.last_sum2 = 0.0
+        # (sum1, sum2, count, block) of the last period + 1 positions, the first one is the end of the previous window
+        self.sums = deque([(0.0, 0.0, 0, 0)], maxlen=period + 1)
+        self.run = 0
+        self.prev_value = None
+
+    def update(self, value):
+        value = float(value)
+        self.position += 1
+        block = self.position // self.block_size
+        if self.position > 0 and self.position % self.block_size == 0:
+            self.last_sum1 = self.sum1
+            self.last_sum2 = self.sum2
+            self.references = [self.references[1], 0.0]
+            self.has_reference = False
+            self.sum1 = 0.0
+            self.sum2 = 0.0
+
+        if value == value:
+            if not self.has_reference:
+                self.references[1] = value
+                self.has_reference = True
+            shifted = value - self.references[1]
+            self.sum1 += shifted
+            self.sum2 += shifted * shifted
+            self.count += 1
+
+        if value == self.prev_value:
+            self.run += 1
+        else:
+            self.run = 1
+        self.prev_value = value
+
+        self.sums.append((self.sum1, self.sum2, self.count, block))
+        if len(self.sums) <= self.period:
+            return NAN, NAN
+
+        before_sum1, before_sum2, before_count, before_block = self.sums[0]
+        if self.count - before_count < self.period:
+            return NAN, NAN
+
+        if before_block == block:
+            window_sum1 = self.sum1 - before_sum1
+            window_sum2 = self.sum2 - before_sum2
+        else:
+            # sums of the previous block moved to the reference of this block
+            size_previous = block * self.block_size - 1 - (self.position - self.period)
+            delta = self.references[1] - self.references[0]
+            previous_sum1 = self.last_sum1 - before_sum1
+            previous_sum2 = self.last_sum2 - before_sum2
+            window_sum1 = previous_sum1 - size_previous * delta + self.sum1
+            window_sum2 = previous_sum2 - 2 * delta * previous_sum1 + size_previous * delta * delta + self.sum2
+
+        if self.run >= self.period:
+            return value, (0.0 if self.period > 1 else NAN)
+
+        mean = self.references[1] + window_sum1 / self.period
+        if self.period == 1:
+            return mean, NAN
+
+        variance = (window_sum2 - window_sum1 * window_sum1 / self.period) / (self.period - 1)
+        return mean, math.sqrt(max(variance, 0.0))
+
+class BBandsState:
+    def __init__(self, period=20, multiplier=2):
+        self.multiplier = multiplier
+        self.stats = RollingStatsState(period)
+
+    def seed(self, close_price):
+        for value in close_price.to_numpy(dtype='float64'):
+            self.update(value)
+
+        return self
+
+    def update(self, close_price):
+        """
+        Returns upper, middle and lower bands and band width.
+        """
+        mean, std = self.stats.update(close_price)
+        mean = np.float64(mean)
+        upper = mean + std * self.multiplier
+        lower = mean - std * self.multiplier
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bbw = (upper - lower) / mean
+
+        return float(upper), float(mean), float(lower), float(bbw)
+
+class ATRState:
+    def __init__(self, period=14):
+        self.tr = TRState()
+        self.ewm = EWMState(alpha=1/period, adjust=False)
+
+    def seed(self, high_price, low_price, close_price):
+        for values in zip(high_price.to_numpy(dtype='float64'), low_price.to_numpy(dtype='float64'), close_price.to_numpy(dtype='float64')):
+            self.update(*values)
+
+        return self
+
+    def update(self, high_price, low_price, close_price):
+        return self.ewm.update(self.tr.update(float(high_price), float(low_price), float(close_price)))
+
+SMA_PERIODS = [2, 3, 5, 8, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 200]
+EMA_PERIODS = [20, 30, 40, 50]
+
+class IndicatorsState:
+    """
+    Streaming indicators of a list of columns of generate_technical_indicators (any period for SMA<n> and EMA<n>),
+    update returns a dict with the columns of each indicator (the other columns of the same indicator included).
+    """
+
+    def __init__(self, columns):
+        # list of (state, positions of the OHLC inputs, output columns)
+        self.states = []
+        added = set()
+        for column in columns:
+            if column in added:
+                continue
+
+            match = re.fullmatch(r'(SMA|EMA)(\d+)', column)
+            if match:
+                state = (SMAState if match[1] == 'SMA' else EMAState)(int(match[2])), [3], [column]
+            elif column in ['MACD', 'MACDSignal', 'MACDHist']:
+                state = MACDState(), [3], ['MACD', 'MACDSignal', 'MACDHist']
+            elif column == 'RSI':
+                state = RSIState(), [3], ['RSI']
+            elif column in ['DI+', 'DI-', 'ADX']:
+                state = ADXState(), [1, 2, 3], ['DI+', 'DI-', 'ADX']
+            elif column in ['RVI', 'RVISignal']:
+                state = RVIState(), [0, 3, 2, 1], ['RVI', 'RVISignal']
+            elif column in ['UpperBBand', 'MidiBBand', 'LowerBBand', 'BBW']:
+                state = BBandsState(), [3], ['UpperBBand', 'MidiBBand', 'LowerBBand', 'BBW']
+            elif column == 'ATR':
+                state = ATRState(), [1, 2, 3], ['ATR']
+            else:
+                raise ValueError('Unknown indicator: ' + column)
+
+            self.states.append(state)
+            added.update(state[2])
+
+        self.columns = [column for _, _, outputs in self.states for column in outputs]
+
+    def seed(self, df):
+        for row in df[['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice']].itertuples(index=False):
+            self.update(*row)
+
+        return self
+
+    def update(self, open_price, high_price, low_price, close_price):
+        prices = (open_price, high_price, low_price, close_price)
+        values = {}
+        for state, inputs, outputs in self.states:
+            result = state.update(*[prices[i] for i in inputs])
+            values.update(zip(outputs, result if len(outputs) > 1 else [result]))
+
+        return values
+
+class TechnicalIndicatorsState:
+    """
+    Streaming version of generate_technical_indicators (trade_utils), update returns a dict with the same columns.
+    """
+
+    def __init__(self):
+        self.sma = {period: SMAState(period) for period in SMA_PERIODS}
+        self.ema = {period: EMAState(period) for period in EMA_PERIODS}
+        self.macd = MACDState()
+        self.rsi = RSIState()
+        self.adx = ADXState()
+        self.rvi = RVIState()
+        self.bbands = BBandsState()
+        self.atr = ATRState()
+        self.values = {}
+
+    def seed(self, df):
+        for row in df[['OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice']].itertuples(index=False):
+            self.update(*row)
+
+        return self
+
+    def update(self, open_price, high_price, low_price, close_price):
+        values = {}
+        for period, state in self.sma.items():
+            values['SMA' + str(period)] = state.update(close_price)
+        for period, state in self.ema.items():
+            values['EMA' + str(period)] = state.update(close_price)
+        values['MACD'], values['MACDSignal'], values['MACDHist'] = self.macd.update(close_price)
+        values['RSI'] = self.rsi.update(close_price)
+        values['DI+'], values['DI-'], values['ADX'] = self.adx.update(high_price, low_price, close_price)
+        values['RVI'], values['RVISignal'] = self.rvi.update(open_price, close_price, low_price, high_price)
+        values['UpperBBand'], values['MidiBBand'], values['LowerBBand'], values['BBW'] = self.bbands.update(close_price)
+        values['ATR'] = self.atr.update(high_price, low_price, close_price)
+        self.values = values
+
+        return values
@@ -0,0 +1,204 @@
+import bisect
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest_utils import get_daily_stats, get_equity_growth, get_weight_array
+from trade_utils import add_technical_indicators
+
+"""
+Parameter sweeps (grid searches) of the strategies with the vectorized backtest of backtest_utils.py.
+
+The strategy is a factory of strategy_registry_utils.py (get_average_cross_strategy, get_rsi_strategy,
+get_price_cross_strategy, ...): factory(**parameters) returns the signal function and its indicator inputs. The
+indicators of the whole grid are computed once and copied to a shared memory block with the prices, the worker
+processes read them with no copy, each task only sends the parameters. The results are ranked as they arrive
+(on_result) and the configurations with a drawdown greater than abandon_drawdown are abandoned without computing
+their stats.
+
+Example, the SMA cross grid of the notebook:
+
+    periods = [5, 10, 15, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+    grid = [{'average': 'SMA', 'short_period': short, 'long_period': long}
+            for short in periods for long in periods if long > short]
+    ranking = run_sweep(df, get_average_cross_strategy, grid, fee=0.00075, max_workers=8)
+"""
+
+# arrays of the shared memory block of the sweep in each process (column name -> array)
+sweep_data = {}
+
+def get_grid(grid):
+    """
+    Returns the list of parameters (dicts) of a grid: a dict with the values of each parameter (all the
+    combinations) or a list of dicts.
+    """
+    if isinstance(grid, dict):
+        return [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+
+    return list(grid)
+
+def get_sweep_data(df, factory, grid):
+    """
+    Returns the arrays used by the configurations of the grid (column name -> float64 array): the close prices, the
+    day of each bar (Day, days since 1970-01-01, for the daily stats) and the indicator inputs computed once over df.
+    """
+    inputs = []
+    for parameters in grid:
+        inputs += [column for column in factory(**parameters)[1] if column not in inputs]
+    df = add_technical_indicators(df.copy(), inputs)
+
+    data = {'ClosePrice': df['ClosePrice'].to_numpy(dtype='float64'),
+            'Day': ((df.index.normalize() - pd.Timestamp(0, tz=df.index.tz)) // pd.Timedelta(days=1)).to_numpy(dtype='float64')}
+    for column in inputs:
+        data[column] = df[column].to_numpy(dtype='float64')
+
+    return data
+
+def init_sweep_worker(name, columns, rows):
+    """
+    Worker initializer: maps the columns of the shared memory block (float64 arrays of rows values).
+    """
+    block = shared_memory.SharedMemory(name=name)
+    values = np.ndarray((len(columns), rows), dtype='float64', buffer=block.buf)
+
+    sweep_data.clear()
+    sweep_data['block'] = block
+    sweep_data['columns'] = dict(zip(columns, values))
+
+def close_sweep_data():
+    """
+    Releases the arrays and the shared memory block of this process.
+    """
+    block = sweep_data.get('block')
+    sweep_data.clear()
+    if block is not None:
+        block.close()
+
+def run_sweep_task(factory, parameters, start, end, fee, abandon_drawdown, periods_per_year):
+    """
+    Backtest of one configuration with the bars start:end of the arrays of the sweep, returns a dict with the
+    parameters, the stats, the number of trades and if it was abandoned.
+    """
+    columns = {column: values[start:end] for column, values in sweep_data['columns'].items()}
+    function = factory(**parameters)[0]
+    weight = get_weight_array(function(columns))
+    growth, entries, exits = get_equity_growth(columns['ClosePrice'], weight, fee)
+    equity = np.cumprod(growth)
+
+    result = dict(parameters)
+    result['trades'] = len(entries)
+    result['abandoned'] = False
+
+    if abandon_drawdown is not None:
+        drawdown = equity / np.maximum.accumulate(np.maximum(equity, 1.0)) - 1
+        if drawdown.min() < -abandon_drawdown:
+            result['abandoned'] = True
+            result['abandon_bar'] = start + int(np.argmax(drawdown < -abandon_drawdown))
+            return result
+
+    # as bt, the initial capital is the value of the day before the first bar
+    day = columns['Day']
+    day_ends = np.append(np.flatnonzero(day[1:] != day[:-1]), len(day) - 1)
+    years = (day[-1] - day[0] + 1) * 86400 / 31557600
+    daily = np.concatenate([[1.0], equity[day_ends]])
+    result.update(get_daily_stats(equity[-1] - 1, daily, years, periods_per_year))
+
+    return result
+
+class SweepRunner:
+    """
+    Runs sweep tasks (run_sweep_task) with the arrays of get_sweep_data copied once to a shared memory block.
+
+    Parameters
+    - data: column name -> float64 array, all of them with the same size
+    - max_workers: number of processes, 1 - runs in this process
+    """
+
+    def __init__(self, data, max_workers=1):
+        self.columns = list(data)
+        self.rows = len(data['ClosePrice'])
+        self.block = shared_memory.SharedMemory(create=True, size=max(len(self.columns) * self.rows * 8, 1))
+        values = np.ndarray((len(self.columns), self.rows), dtype='float64', buffer=self.block.buf)
+        for i, column in enumerate(self.columns):
+            values[i] = data[column]
+        del values
+
+        self.executor = None
+        if max_workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                initializer=init_sweep_worker,
+                                                initargs=(self.block.name, self.columns, self.rows))
+        else:
+            init_sweep_worker(self.block.name, self.columns, self.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def run(self, tasks):
+        """
+        Runs the tasks (tuples of the arguments of run_sweep_task), yields (task number, result) as they finish.
+        """
+        if self.executor is None:
+            for i, task in enumerate(tasks):
+                yield i, run_sweep_task(*task)
+            return
+
+        futures = {self.executor.submit(run_sweep_task, *task): i for i, task in enumerate(tasks)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        close_sweep_data()
+        self.block.close()
+        self.block.unlink()
+
+def get_rank_key(result, rank_by):
+    # the abandoned configurations are ranked last
+    if result['abandoned'] or np.isnan(result[rank_by]):
+        return np.inf
+
+    return -result[rank_by]
+
+def rank_results(results, rank_by='total_return'):
+    """
+    Returns the results sorted by rank_by (greater is better), the abandoned configurations at the end.
+    """
+    return sorted(results, key=lambda result: get_rank_key(result, rank_by))
+
+def run_sweep(df, factory, grid, fee=0.0, max_workers=1, abandon_drawdown=None, rank_by='total_return',
+              on_result=None, periods_per_year=252):
+    """
+    Backtests factory(**parameters) for each configuration of the grid (see get_grid) with the candles of df
+    (OHLC DataFrame with a DatetimeIndex, the indicators are added to a copy):
+    - fee: fee by traded value (exchange_fee of get_trade_info)
+    - max_workers: number of processes, 1 - runs in this process
+    - abandon_drawdown: the configurations with a greater drawdown (0.5 - 50%) are abandoned (no stats)
+    - rank_by: stat of the ranking (greater is better): total_return, cagr, max_drawdown or sharpe
+    - on_result: function(result, ranking) called with each result as it arrives and the ranking so far
+
+    Returns the DataFrame of the results ranked by rank_by, the abandoned configurations at the end.
+    """
+    grid = get_grid(grid)
+    data = get_sweep_data(df, factory, grid)
+    tasks = [(factory, parameters, 0, len(df), fee, abandon_drawdown, periods_per_year) for parameters in grid]
+
+    ranking = []
+    keys = []
+    with SweepRunner(data, max_workers) as runner:
+        for _, result in runner.run(tasks):
+            key = get_rank_key(result, rank_by)
+            position = bisect.bisect_right(keys, key)
+            keys.insert(position, key)
+            ranking.insert(position, result)
+            if on_result is not None:
+                on_result(result, ranking)
+
+    return pd.DataFrame(ranking)
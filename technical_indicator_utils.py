@@ -1,6 +1,8 @@
+import math
 import numpy as np
 import pandas as pd
 from hurst import compute_Hc
+from concurrent.futures import ProcessPoolExecutor
 
 def get_sma(close_price, period):
     return close_price.rolling(period).mean()
@@ -8,6 +10,59 @@ def get_sma(close_price, period):
 def get_ema(close_price, period):
     return close_price.ewm(span=period, adjust=False).mean()
 
+def get_sma_bank(close_price, periods):
+    """
+    SMAs of several periods from one cumulative sum. Returns a DataFrame with the columns SMA<period>, the columns
+    are views of one 2-D (period x time) array (no copy).
+
+    The sum is accumulated over the prices minus the first price, so the values are the same of get_sma up to the
+    floating point rounding (relative error < 1e-9), the cross signals compare the averages with this tolerance
+    (CROSS_RTOL of strategy_utils). Like pandas, a window with a constant price returns the price itself (exact ties).
+    SMAState (streaming_indicator_utils) runs the same sums bar by bar.
+    """
+    values = close_price.to_numpy(dtype='float64')
+    size = len(values)
+    valid = ~np.isnan(values)
+    reference = values[valid][0] if valid.any() else 0.0
+
+    cumsum = np.concatenate([[0.0], np.cumsum(np.where(valid, values - reference, 0.0))])
+    count = np.concatenate([[0], np.cumsum(valid)])
+    # number of consecutive equal prices ending at each position
+    positions = np.arange(size)
+    is_new_value = np.concatenate([[True], values[1:] != values[:-1]])
+    run = positions - np.maximum.accumulate(np.where(is_new_value, positions, 0)) + 1
+    max_run = run.max() if size > 0 else 0
+
+    bank = np.full((len(periods), size), np.nan)
+    for i, period in enumerate(periods):
+        if period > size:
+            continue
+
+        # computed in place in the row of the bank, no temporary arrays
+        sma = bank[i, period - 1:]
+        np.subtract(cumsum[period:], cumsum[:-period], out=sma)
+        sma /= period
+        sma += reference
+        if max_run >= period:
+            np.copyto(sma, values[period - 1:], where=run[period - 1:] >= period)
+        if not valid.all():
+            sma[(count[period:] - count[:-period]) < period] = np.nan
+
+    return pd.DataFrame(bank.T, index=close_price.index, columns=['SMA' + str(period) for period in periods], copy=False)
+
+def get_ema_bank(close_price, periods):
+    """
+    EMAs of several periods in one 2-D (period x time) array, returns a DataFrame with the columns EMA<period>
+    (views of the array, no copy). The values are the same of get_ema (and EMAState).
+    """
+    bank = np.empty((len(periods), len(close_price)))
+    for i, period in enumerate(periods):
+        # the recurrence runs in the pandas ewm kernel by period: a loop over time with all the periods at once
+        # runs in python, and the closed forms (powers of 1 - alpha) lose the precision of the recurrence
+        bank[i] = get_ema(close_price, period).to_numpy()
+
+    return pd.DataFrame(bank.T, index=close_price.index, columns=['EMA' + str(period) for period in periods], copy=False)
+
 def get_macd(close_price):
     #Calculate the MACD and Signal Line indicators
     #Calculate the Short Term Exponential Moving Average
@@ -44,7 +99,61 @@ def get_rsi(close_price, period = 14):
 
     return np.round(rsi, 2)
 
+def get_seeded_ewm(data, seed_position, seed, periods):
+    """
+    Exponential moving average with alpha = 1/periods (adjust=False) starting at seed_position with the seed value.
+    A NaN after the seed propagates to the end (same of the loop versions).
+    """
+    values = np.asarray(data, dtype='float64')
+    result = np.full(len(values), np.nan)
+    if seed_position >= len(values):
+        return result
+
+    values = values[seed_position:].copy()
+    values[0] = seed
+    result[seed_position:] = pd.Series(values).ewm(alpha=1/periods, adjust=False).mean().to_numpy()
+
+    nans = np.flatnonzero(np.isnan(values))
+    if len(nans) > 0:
+        result[seed_position + nans[0]:] = np.nan
+
+    return result
+
 def get_wilder_smoothing(data, periods):
+    """
+    Wilder smoothing (RMA): SMA of the first periods values as seed, then (previous * (periods - 1) + value) / periods.
+    The same values of get_wilder_smoothing_loop (up to the floating point rounding, relative error ~1e-15).
+    """
+    data = pd.Series(np.asarray(data, dtype='float64'))
+    valid = np.flatnonzero(data.notna().to_numpy())
+    if len(valid) == 0:
+        return np.full(len(data), np.nan)
+
+    start = valid[0] #Check if nans present in beginning
+    seed = data.iloc[start:(start+periods)].mean() #Simple Moving Average
+
+    return get_seeded_ewm(data, start+periods-1, seed, periods)
+
+def get_smoothing(data, periods):
+    """
+    Smoothing with the sum of the first periods values as seed, then previous - previous/periods + value.
+    The same values of get_smoothing_loop (up to the floating point rounding).
+    """
+    data = pd.Series(np.asarray(data, dtype='float64'))
+    valid = np.flatnonzero(data.notna().to_numpy())
+    if len(valid) == 0:
+        return np.full(len(data), np.nan)
+
+    start = valid[0] #Check if nans present in beginning
+    seed = data.iloc[start:(start+periods)].sum()
+
+    # smooth / periods is a wilder smoothing of data seeded with the mean
+    return get_seeded_ewm(data, start+periods-1, seed / periods, periods) * periods
+
+def get_wilder_smoothing_loop(data, periods):
+    """
+    Reference version (python loop) of get_wilder_smoothing.
+    """
     start = np.where(~np.isnan(data))[0][0] #Check if nans present in beginning
     wilder = np.array([np.nan]*len(data))
     wilder[start+periods-1] = float(data[start:(start+periods)].mean()) #Simple Moving Average
@@ -54,7 +163,10 @@ def get_wilder_smoothing(data, periods):
 
     return(wilder)
 
-def get_smoothing(data, periods):
+def get_smoothing_loop(data, periods):
+    """
+    Reference version (python loop) of get_smoothing.
+    """
     start = np.where(~np.isnan(data))[0][0] #Check if nans present in beginning
     smooth = np.array([np.nan]*len(data))
     smooth[start+periods-1] = data[start:(start+periods)].sum()
@@ -66,7 +178,43 @@ def get_smoothing(data, periods):
 
 def get_adx(high_price, low_price, close_price, period=14):
     """ https://school.stockcharts.com/doku.php?id=technical_indicators:average_directional_index_adx
-        https://blog.quantinsti.com/adx-indicator-python/ """
+        https://blog.quantinsti.com/adx-indicator-python/ 
+        
+        Computed with NumPy arrays and the vectorized Wilder smoothing, see get_adx_loop for the reference version."""
+
+    tr = get_tr(high_price, low_price, close_price).to_numpy()
+
+    high = high_price.to_numpy(dtype='float64')
+    low = low_price.to_numpy(dtype='float64')
+    high_shift = high_price.shift().to_numpy(dtype='float64')
+    low_shift = low_price.shift().to_numpy(dtype='float64')
+    up = high - high_shift
+    down = low_shift - low
+
+    #DM+ = (Today's high - Yesterday's High) if greater than (Yesterday's Low - Today's Low) and 0, otherwise 0
+    dm_plus = np.where(up > down, np.where(up > 0, up, 0), 0)
+    #DM- = (Yesterday's Low - Today's Low) if greater than (Today's high - Yesterday's High) and 0, otherwise 0
+    dm_minus = np.where(down > up, np.where(down > 0, down, 0), 0)
+
+    #if yesterday's value is NaN, DM must be NaN too
+    dm_plus = np.where(np.isnan(high_shift), high_shift, dm_plus)
+    dm_minus = np.where(np.isnan(low_shift), low_shift, dm_minus)
+
+    smoothed_dm_plus = get_wilder_smoothing(dm_plus, period)
+    smoothed_dm_minus = get_wilder_smoothing(dm_minus, period)
+    smoothed_tr = get_wilder_smoothing(tr, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        di_plus = (smoothed_dm_plus/smoothed_tr)*100
+        di_minus = (smoothed_dm_minus/smoothed_tr)*100
+        dx = abs((di_plus - di_minus)/(di_plus + di_minus))*100
+    adx = get_wilder_smoothing(dx, period)
+
+    index = high_price.index
+    return pd.Series(di_plus, index=index, name='DI+'), pd.Series(di_minus, index=index, name='DI-'), pd.Series(adx, index=index, name='ADX')
+
+def get_adx_loop(high_price, low_price, close_price, period=14):
+    """ Reference version of get_adx (DataFrame and python loops). """
 
     df_adx = pd.DataFrame(columns=[
         'TR', 
@@ -103,14 +251,14 @@ def get_adx(high_price, low_price, close_price, period=14):
     df_adx['DM+'] = np.where(high_price.shift().isna(), high_price.shift(), df_adx['DM+'])
     df_adx['DM-'] = np.where(low_price.shift().isna(), low_price.shift(), df_adx['DM-'])
 
-    df_adx['SmoothedDM+'] = get_wilder_smoothing(df_adx['DM+'], period)
-    df_adx['SmoothedDM-'] = get_wilder_smoothing(df_adx['DM-'], period)
-    df_adx['SmoothedTR'] = get_wilder_smoothing(df_adx['TR'], period)
+    df_adx['SmoothedDM+'] = get_wilder_smoothing_loop(df_adx['DM+'], period)
+    df_adx['SmoothedDM-'] = get_wilder_smoothing_loop(df_adx['DM-'], period)
+    df_adx['SmoothedTR'] = get_wilder_smoothing_loop(df_adx['TR'], period)
 
     df_adx['DI+'] = (df_adx['SmoothedDM+']/df_adx['SmoothedTR'])*100
     df_adx['DI-'] = (df_adx['SmoothedDM-']/df_adx['SmoothedTR'])*100
     df_adx['DX'] = abs((df_adx['DI+'] - df_adx['DI-'])/(df_adx['DI+'] + df_adx['DI-']))*100
-    df_adx['ADX'] = get_wilder_smoothing(df_adx['DX'], period)
+    df_adx['ADX'] = get_wilder_smoothing_loop(df_adx['DX'], period)
     
     return df_adx['DI+'], df_adx['DI-'], df_adx['ADX']
 
@@ -133,25 +281,120 @@ def get_fibonacci_retracement_levels(price_max, price_min):
 
     return {"price_max": price_max, "level1": level1, "level2": level2, "level3": level3, "price_min": price_min}
 
-def get_bbands(close_price, period=20, multiplier=2):
-    upper = close_price.rolling(period).mean() + close_price.rolling(period).std() * multiplier
-    midi = close_price.rolling(period).mean()
-    lower = close_price.rolling(period).mean() - close_price.rolling(period).std() * multiplier
-    bbw = (upper - lower) / close_price.rolling(period).mean()
+# rows of the blocks of get_rolling_stats (at least the period)
+ROLLING_STATS_BLOCK_SIZE = 1024
+
+def get_rolling_stats(close_price, period):
+    """
+    Rolling mean and standard deviation (ddof=1) of the series in one pass, the same values of rolling(period).mean()
+    and .std() up to the floating point rounding (the std is closer to the exact one than pandas). Returns two Series.
+
+    The sums of the prices and of their squares are accumulated by block of ROLLING_STATS_BLOCK_SIZE rows, shifted
+    by the first price of the block (shifted data algorithm), so they stay small and the variance has no cancellation.
+    The sums of a window that starts in the previous block are moved to the price of its last block.
+    Like pandas, a window with a constant price has the price as mean and 0 as std.
+    RollingStatsState (streaming_indicator_utils) runs the same sums bar by bar.
+    """
+    values = close_price.to_numpy(dtype='float64')
+    size = len(values)
+    mean = np.full(size, np.nan)
+    std = np.full(size, np.nan)
+    if size < period:
+        return pd.Series(mean, index=close_price.index), pd.Series(std, index=close_price.index)
+
+    block_size = max(ROLLING_STATS_BLOCK_SIZE, period)
+    blocks = -(-size // block_size)
+    # the padding of the last block is never used
+    shifted = np.zeros(blocks * block_size)
+    shifted[:size] = values
+    shifted = shifted.reshape(blocks, block_size)
+    invalid = np.isnan(shifted)
+    has_nan = invalid.any()
+    if has_nan:
+        # first valid price of each block, 0 if none
+        references = shifted[np.arange(blocks), (~invalid).argmax(axis=1)]
+        references[invalid.all(axis=1)] = 0.0
+        shifted -= references[:, None]
+        shifted[invalid] = 0.0
+    else:
+        references = shifted[:, 0].copy()
+        shifted -= references[:, None]
+
+    # cumulative sums by block, with a 0 before the first bar
+    sum1 = np.zeros(blocks * block_size + 1)
+    sum2 = np.zeros(blocks * block_size + 1)
+    np.cumsum(shifted, axis=1, out=sum1[1:].reshape(blocks, block_size))
+    np.cumsum(np.square(shifted, out=shifted), axis=1, out=sum2[1:].reshape(blocks, block_size))
+
+    # window of the bar t: (t - period, t], its sums are the differences of the positions t + 1 and t + 1 - period
+    window_sum1 = sum1[period:size + 1] - sum1[:size + 1 - period]
+    window_sum2 = sum2[period:size + 1] - sum2[:size + 1 - period]
+
+    # the first period bars of each block have the sums before the window in the previous block
+    cross = (np.arange(block_size, size, block_size)[:, None] + np.arange(period)).ravel()
+    cross = cross[cross < size]
+    if len(cross) > 0:
+        # sums of the previous block (before, last] moved to the reference of the block of t
+        before = cross - period
+        last = cross // block_size * block_size - 1
+        size_previous = last - before
+        delta = references[cross // block_size] - references[cross // block_size - 1]
+        previous_sum1 = sum1[last + 1] - sum1[before + 1]
+        previous_sum2 = sum2[last + 1] - sum2[before + 1]
+        window_sum1[cross - period + 1] = previous_sum1 - size_previous * delta + sum1[cross + 1]
+        window_sum2[cross - period + 1] = (previous_sum2 - 2 * delta * previous_sum1 + size_previous * delta * delta
+                                           + sum2[cross + 1])
+
+    window_mean = mean[period - 1:]
+    np.add(np.repeat(references, block_size)[period - 1:size], window_sum1 / period, out=window_mean)
+    if period > 1:
+        variance = window_sum2
+        variance -= window_sum1 * window_sum1 / period
+        variance /= period - 1
+        np.sqrt(np.maximum(variance, 0.0), out=std[period - 1:])
+
+    # windows with a constant price (the NaNs are always different)
+    is_new_value = values[1:] != values[:-1]
+    if not is_new_value.all():
+        changes = np.concatenate([[0], np.cumsum(is_new_value)])
+        flat = (changes[period - 1:] - changes[:size - period + 1]) == 0
+        window_mean[flat] = values[period - 1:][flat]
+        if period > 1:
+            std[period - 1:][flat] = 0.0
+
+    if has_nan:
+        count = np.concatenate([[0], np.cumsum(~invalid.ravel()[:size])])
+        incomplete = np.concatenate([np.zeros(period - 1, dtype='bool'), (count[period:] - count[:-period]) < period])
+        mean[incomplete] = np.nan
+        std[incomplete] = np.nan
+
+    return pd.Series(mean, index=close_price.index), pd.Series(std, index=close_price.index)
+
+def get_bbands(close_price, period=20, multiplier=2, stats=None):
+    """
+    Bollinger bands, stats: rolling mean and std of close_price (get_rolling_stats), computed if None.
+    """
+    mean, std = get_rolling_stats(close_price, period) if stats is None else stats
+    upper = mean + std * multiplier
+    midi = mean.copy()
+    lower = mean - std * multiplier
+    bbw = (upper - lower) / mean
 
     return upper, midi, lower, bbw
 
 def get_momentum(close_price, n):
     return close_price / close_price.shift(n) - 1
 
-def get_sma_ratio(close_price, n):
-    return close_price / close_price.rolling(n).mean() - 1
+def get_sma_ratio(close_price, n, stats=None):
+    mean, _ = get_rolling_stats(close_price, n) if stats is None else stats
+    return close_price / mean - 1
 
 def get_sharpe_ratio(returns):
     return returns.mean() / returns.std()
 
-def get_bbands_ratio(close_price, n=20):
-    return (close_price - close_price.rolling(n).mean()) / (2 * close_price.rolling(n).std())
+def get_bbands_ratio(close_price, n=20, stats=None):
+    mean, std = get_rolling_stats(close_price, n) if stats is None else stats
+    return (close_price - mean) / (2 * std)
 
 def normalize(data):
     #return (data.values - data.values.mean()) / data.values.std()
@@ -168,17 +411,101 @@ def bband_width(upper_band, lower_band, midi_band):
 
     return (upper_band - lower_band) / midi_band
 
-def bband_b(close_price, upper_band, lower_band):
+def bband_b(close_price, upper_band=None, lower_band=None, period=20, multiplier=2, stats=None):
+    """
+    %B of the bands, computed from the rolling stats of close_price (period, multiplier) if the bands are None.
+    """
+    if upper_band is None or lower_band is None:
+        upper_band, _, lower_band, _ = get_bbands(close_price, period, multiplier, stats)
+
     return ((close_price - lower_band) / (upper_band - lower_band)) * 100
 
-def get_hurst(price_data, window=200):
+def get_hurst_window_sizes(window):
+    """
+    Chunk sizes used by compute_Hc on a series of length window (min_window=10, max_window=window-1).
+    """
+    sizes = [int(10**x) for x in np.arange(math.log10(10), math.log10(window - 1), 0.25)]
+    sizes.append(window)
+
+    return sizes
+
+def get_rolling_hurst(prices, window):
+    """
+    Hurst exponent (compute_Hc with kind='price') of every series prices[b:b + window], returns an array of
+    len(prices) - window + 1 values.
+
+    compute_Hc splits the series in chunks of each size, averages their simplified rescaled range (R/S) and fits
+    log10(R/S) on log10(size). The R/S of a chunk is the same for every window that contains it, so it is computed
+    once for all chunks with rolling max, min and std, and the windows only sum the values of their chunks.
+    """
+    sizes = get_hurst_window_sizes(window)
+    starts = np.arange(len(prices) - window + 1)
+    pcts = pd.Series(prices[1:] / prices[:-1] - 1.)
+    prices = pd.Series(prices)
+
+    log_rs = np.empty((len(sizes), len(starts)))
+    for i, size in enumerate(sizes):
+        # R/S of the chunk prices[s:s + size] at position s
+        r = (prices.rolling(size).max() / prices.rolling(size).min() - 1.).to_numpy()[size - 1:]
+        std = pcts.rolling(size - 1).std().to_numpy()[size - 2:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.where((r == 0) | (std == 0), 0., r / std)
+
+        # mean of the chunks of the window, the chunks with R/S = 0 are skipped (like compute_Hc)
+        total = np.zeros(len(starts))
+        count = np.zeros(len(starts))
+        for k in range(window // size):
+            chunk_rs = rs[starts + k * size]
+            total += chunk_rs
+            count += chunk_rs != 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_rs[i] = np.log10(total / count)
+
+    # least squares slope of log10(R/S) on log10(size)
+    x = np.log10(sizes)
+    x = x - x.mean()
+
+    return (x[:, None] * log_rs).sum(axis=0) / (x * x).sum()
+
+def get_hurst(price_data, window=200, max_workers=1, chunk_size=100000):
     """
     Hurst = 0.5 -> Brownian Motion (random walk)
     Hurst < 0.5 -> Mean reversion
     Hurst > 0.5 -> Momentum/Trend
 
+    Value at i: Hurst exponent of the window price_data[i - window:i], the same of compute_Hc(kind='price') up to
+    the floating point rounding (absolute error < 1e-12). Windows with NaNs (or with no chunk to compute) are NaN,
+    compute_Hc raises an error.
+    The data is split in chunks of chunk_size windows, max_workers > 1 computes them in a process pool
+    (the values do not depend on max_workers).
+
     Reference: https://www.coursera.org/learn/machine-learning-trading-finance
     """
+    prices = np.asarray(price_data, dtype='float64').ravel()
+    hurst = np.full((len(prices), 1), np.nan)
+    if len(prices) <= window:
+        return hurst
+
+    # the last price is not in any window
+    prices = prices[:-1]
+    starts = range(0, len(prices) - window + 1, chunk_size)
+    chunks = [prices[start:start + chunk_size + window - 1] for start in starts]
+
+    if max_workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            values = list(executor.map(get_rolling_hurst, chunks, [window] * len(chunks)))
+    else:
+        values = [get_rolling_hurst(chunk, window) for chunk in chunks]
+
+    hurst[window:, 0] = np.concatenate(values)
+
+    return hurst
+
+def get_hurst_loop(price_data, window=200):
+    """
+    Reference version (compute_Hc by window) of get_hurst.
+    """
     hurst = np.zeros((len(price_data), 1))
     for i in range(0, len(price_data)):
         if i < window:
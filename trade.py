@@ -7,7 +7,10 @@ from time import sleep
 from threading import Thread
 
 from binance_utils import get_twm, init, init_test
-from trade_utils import get_data, process_candle, roll_oco_orders
+from backfill_utils import backfill_symbols
+from candle_utils import CandleBuffer, CandleAggregator
+from fake_exchange_utils import FakeExchange
+from trade_utils import check_strategies, get_data, get_intervals, process_candle, roll_oco_orders, seed_live_signals, PROCESS_CANDLE_STAGES
 
 def handle_socket_message(msg):
     #print(f"message type: {msg['e']}")
@@ -56,10 +59,31 @@ def handle_socket_message(msg):
                     symbol_data[symbol], 
                     new_row, 
                     base_asset_order_dic[symbol], 
-                    quote_asset_order_dic[symbol])
+                    quote_asset_order_dic[symbol],
+                    aggregator=symbol_aggregator[symbol],
+                    live_signals=symbol_live_signals[symbol],
+                    timings=symbol_timings[symbol])
 
             if debug:
-                print(symbol_data[symbol].tail())
+                print(symbol_data[symbol].frame().tail())
+
+def start_symbol(symbol, df):
+    symbol_data[symbol] = CandleBuffer.from_frame(df, max_size=max_candles)
+    # the resampled bars of each interval are updated incrementally
+    symbol_aggregator[symbol] = CandleAggregator(df, get_intervals())
+    # signals of the strategies seeded with the history here, the socket computes only the new bars
+    symbol_live_signals[symbol] = seed_live_signals(symbol, symbol_aggregator[symbol], {})
+    symbol_timings[symbol] = {}
+    twm_sockets[symbol] = twm.start_kline_socket(callback=handle_socket_message, symbol=symbol, interval=interval)
+    print(symbol + ' started.')
+
+def load_symbol_data(client, symbol):
+    if exchange is not None:
+        # the store of the fake exchange has the candles after its start too, they are streamed by the socket
+        end = pd.to_datetime(exchange.current_time, unit='ms') - pd.Timedelta(1, unit='ns')
+        return get_data(client, symbol, interval, save=False, end=end, path=fake_cfg['data_path'])
+
+    return get_data(client, symbol, interval, save=live_trade)
 
 def threaded_roll_oco_orders():
     while 1:
@@ -68,13 +92,21 @@ def threaded_roll_oco_orders():
 
 def print_last_candle():
     for key in symbol_data:
-        print('{}: {:%Y-%m-%d %H:%M:%S} ClosePrice: {:0.8f}'.format(key, symbol_data[key].index[-1], symbol_data[key]['ClosePrice'].iloc[-1]))
+        print('{}: {:%Y-%m-%d %H:%M:%S} ClosePrice: {:0.8f}'.format(key, symbol_data[key].index[-1], symbol_data[key].get_column('ClosePrice')[-1]))
+
+def print_timings():
+    for key in symbol_timings:
+        timings = symbol_timings[key]
+        candles = max(timings.get('candles', 0), 1)
+        print('{} ({} candles): {}'.format(key, timings.get('candles', 0),
+            ', '.join(['{} {:0.2f}ms'.format(stage, timings.get(stage, 0.0) * 1000 / candles) for stage in PROCESS_CANDLE_STAGES])))
 
 def exit_trade():
     global twm_sockets
     global thread_oco_orders
 
     print_last_candle()
+    print_timings()
     print('Exiting the program and stopping all processes.')
     
     # close sockets
@@ -92,12 +124,13 @@ def main(mode):
     global thread_oco_orders
 
     try:
+        check_strategies(max_candles)
+
         twm.start()
         print('Wait for trading to start...')
 
-        for symbol in symbol_list:
-            symbol_data[symbol] = get_data(client, symbol, interval, save=live_trade)
-            twm_sockets[symbol] = twm.start_kline_socket(callback=handle_socket_message, symbol=symbol, interval=interval)
+        # load the symbols in parallel, each socket starts as soon as its symbol is caught up
+        backfill_symbols(client, symbol_list, load_symbol_data, start_symbol)
 
         # start thread to roll oco orders
         if oco_rolling:
@@ -115,11 +148,14 @@ def main(mode):
                     print('\n\t h : help')
                     print('\n\t e : exit')
                     print('\n\t p : print last candles')
+                    print('\n\t t : print the processing time by candle of each stage')
                 elif selection == 'e':
                     exit_trade()
                     break
                 elif selection == 'p':
                     print_last_candle()
+                elif selection == 't':
+                    print_timings()
                 else:
                     print('Unknown option.')
     except KeyboardInterrupt:
@@ -143,8 +179,20 @@ quote_asset_order_list = cfg['params']['quote_asset_order']
 interval = cfg['params']['interval']
 live_trade = bool(cfg['params']['live_trade'])
 oco_rolling = bool(cfg['params']['roll_oco_orders'])
+# number of 1m candles kept in memory by symbol: 0 - all
+max_candles = cfg['params'].get('max_candles', 0) or None
 # End trade parameters
 
+# local fake exchange to test offline (see fake_exchange_utils.py)
+fake_cfg = cfg.get('fake_exchange', {})
+exchange = None
+if fake_cfg.get('enabled', 0):
+    exchange = FakeExchange(fake_cfg['data_path'],
+            symbol_list,
+            start=fake_cfg.get('start'),
+            balances=fake_cfg.get('balances'))
+    print('FAKE EXCHANGE!!!')
+
 # create a dictionary with the symbol and its respective order asset
 base_asset_order_dic = {}
 quote_asset_order_dic = {}
@@ -154,15 +202,18 @@ for i in range(len(symbol_list)):
 
 # create binance client and a instance of ThreadedWebsocketManager
 if live_trade:
-    client = init()
+    client = init(exchange)
     print('LIVE TRADE!!!')
 else:
-    client = init_test()
+    client = init_test(exchange)
     print('Test Trade...')
 
 symbol_data = {}
+symbol_aggregator = {}
+symbol_live_signals = {}
+symbol_timings = {}
 twm_sockets = {}
-twm = get_twm()
+twm = get_twm(exchange, speed=fake_cfg.get('speed', 60.0))
 thread_oco_orders = Thread(target = threaded_roll_oco_orders, daemon=True)
 
 if __name__ == "__main__":   
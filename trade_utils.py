@@ -1,11 +1,17 @@
+import re
+import time
 import pandas as pd
-import pyarrow as pa
-import pyarrow.parquet as pq
 from pathlib import Path
 from binance_utils import *
-from technical_indicator_utils import get_sma, get_ema, get_macd, get_rsi, get_adx, get_rvi, get_bbands, get_atr
+from candle_store_utils import read_candles, append_candles, migrate_single_file, read_single_file_candles
+from candle_store_utils import get_partition_months, get_store_bounds, get_time_bounds
+from candle_store_utils import read_empty_ranges, write_empty_ranges
+from candle_utils import OHLCV_SUMMARIES, get_bin_labels, get_bin_width
+from technical_indicator_utils import get_sma, get_sma_bank, get_ema, get_ema_bank, get_macd, get_rsi, get_adx, get_rvi, get_bbands, get_atr
 from message_utils import telegram_bot_sendtext
 from strategy_utils import *
+from strategy_registry_utils import get_strategy
+from live_signal_utils import LiveSignal, is_live_strategy
 
 def initialize_ohlc_df():
     df = pd.DataFrame(columns=[
@@ -20,20 +26,10 @@ def initialize_ohlc_df():
 
     return df
 
-def add_row(df, row):
-    df.loc[pd.to_datetime(row['OpenTime'])] = [pd.to_numeric(row['OpenPrice']),
-        pd.to_numeric(row['HighPrice']),
-        pd.to_numeric(row['LowPrice']),
-        pd.to_numeric(row['ClosePrice']),
-        pd.to_numeric(row['Volume'])]
- 
-    return df
-
-def resample_data(df, time_resample):
-    df_resample = df.copy()
-    summaries = {'OpenPrice': 'first', 'HighPrice': 'max', 'LowPrice': 'min', 'ClosePrice': 'last', 'Volume': 'sum'}
-
-    df_resample = df.resample(time_resample).agg(summaries)
+def resample_data(df, time_resample, origin='start_day'):
+    # only the columns present (get_data with columns)
+    summaries = {column: OHLCV_SUMMARIES[column] for column in df.columns}
+    df_resample = df.resample(time_resample, origin=origin).agg(summaries)
     df_resample.dropna(inplace=True)
     # remove incomplete candle
     df_resample = df_resample[:-1]
@@ -42,26 +38,13 @@ def resample_data(df, time_resample):
 
 def generate_technical_indicators(df):
     #SMA
-    df['SMA2'] = get_sma(df['ClosePrice'], 2)
-    df['SMA3'] = get_sma(df['ClosePrice'], 3)
-    df['SMA5'] = get_sma(df['ClosePrice'], 5)
-    df['SMA8'] = get_sma(df['ClosePrice'], 8)
-    df['SMA10'] = get_sma(df['ClosePrice'], 10)
-    df['SMA20'] = get_sma(df['ClosePrice'], 20)
-    df['SMA30'] = get_sma(df['ClosePrice'], 30)
-    df['SMA40'] = get_sma(df['ClosePrice'], 40)
-    df['SMA50'] = get_sma(df['ClosePrice'], 50)
-    df['SMA60'] = get_sma(df['ClosePrice'], 60)
-    df['SMA70'] = get_sma(df['ClosePrice'], 70)
-    df['SMA80'] = get_sma(df['ClosePrice'], 80)
-    df['SMA90'] = get_sma(df['ClosePrice'], 90)
-    df['SMA100'] = get_sma(df['ClosePrice'], 100)
-    df['SMA200'] = get_sma(df['ClosePrice'], 200)
+    sma_bank = get_sma_bank(df['ClosePrice'], [2, 3, 5, 8, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 200])
+    for column in sma_bank.columns:
+        df[column] = sma_bank[column]
     #EMA
-    df['EMA20'] = get_ema(df['ClosePrice'], 20)
-    df['EMA30'] = get_ema(df['ClosePrice'], 30)
-    df['EMA40'] = get_ema(df['ClosePrice'], 40)
-    df['EMA50'] = get_ema(df['ClosePrice'], 50)
+    ema_bank = get_ema_bank(df['ClosePrice'], [20, 30, 40, 50])
+    for column in ema_bank.columns:
+        df[column] = ema_bank[column]
 
 
     df['MACD'], df['MACDSignal'], df['MACDHist'] = get_macd(df['ClosePrice'])
@@ -73,170 +56,108 @@ def generate_technical_indicators(df):
 
     return df
 
+def add_technical_indicator(df, column):
+    """
+    Compute the indicator column in df, with the other columns returned by the same function.
+    Returns the list of columns added.
+    """
+    match = re.fullmatch(r'(SMA|EMA)(\d+)', column)
+    if match:
+        if match[1] == 'SMA':
+            df[column] = get_sma_bank(df['ClosePrice'], [int(match[2])])[column]
+        else:
+            df[column] = get_ema(df['ClosePrice'], int(match[2]))
+        return [column]
+
+    if column in ['MACD', 'MACDSignal', 'MACDHist']:
+        df['MACD'], df['MACDSignal'], df['MACDHist'] = get_macd(df['ClosePrice'])
+        return ['MACD', 'MACDSignal', 'MACDHist']
+    elif column == 'RSI':
+        df['RSI'] = get_rsi(df['ClosePrice'])
+        return ['RSI']
+    elif column in ['DI+', 'DI-', 'ADX']:
+        df['DI+'], df['DI-'], df['ADX'] = get_adx(df['HighPrice'], df['LowPrice'], df['ClosePrice'])
+        return ['DI+', 'DI-', 'ADX']
+    elif column in ['RVI', 'RVISignal']:
+        df['RVI'], df['RVISignal'] = get_rvi(df['OpenPrice'], df['ClosePrice'], df['LowPrice'], df['HighPrice'])
+        return ['RVI', 'RVISignal']
+    elif column in ['UpperBBand', 'MidiBBand', 'LowerBBand', 'BBW']:
+        df['UpperBBand'], df['MidiBBand'], df['LowerBBand'], df['BBW'] = get_bbands(df['ClosePrice'])
+        return ['UpperBBand', 'MidiBBand', 'LowerBBand', 'BBW']
+    elif column == 'ATR':
+        df['ATR'] = get_atr(df['HighPrice'], df['LowPrice'], df['ClosePrice'])
+        return ['ATR']
+
+    raise ValueError('Unknown indicator: ' + column)
+
+def add_technical_indicators(df, columns):
+    """
+    Compute only the indicator columns needed, each one once.
+
+    The computed columns are kept in df.attrs with the version of df (size and first/last candle), the next calls
+    with the same frame (several strategies) reuse them. A frame with new candles is a new version.
+    """
+    version = (len(df), df.index[0], df.index[-1]) if len(df) > 0 else (0,)
+    computed = df.attrs.get('indicators')
+    if computed is None or computed['version'] != version:
+        computed = {'version': version, 'columns': set()}
+        df.attrs['indicators'] = computed
+
+    # the SMAs from one cumulative sum
+    sma_columns = list(dict.fromkeys([column for column in columns
+                                      if column not in computed['columns'] and re.fullmatch(r'SMA\d+', column)]))
+    if len(sma_columns) > 1:
+        sma_bank = get_sma_bank(df['ClosePrice'], [int(column[3:]) for column in sma_columns])
+        for column in sma_columns:
+            df[column] = sma_bank[column]
+        computed['columns'].update(sma_columns)
+
+    for column in columns:
+        if column not in computed['columns']:
+            computed['columns'].update(add_technical_indicator(df, column))
+
+    return df
+
 def update_signal_by_strategy(df, signal_column):
-    df = generate_technical_indicators(df)
-
-    if signal_column == 'Signal5SMAStrategy':
-        df['Signal5SMAStrategy'] = get_cross_signal(df[['ClosePrice']].copy(), df[['SMA5']].copy())
-    elif signal_column == 'Signal10SMAStrategy':
-        df['Signal10SMAStrategy'] = get_cross_signal(df[['ClosePrice']].copy(), df[['SMA10']].copy())
-    elif signal_column == 'Signal20SMAStrategy':
-        df['Signal20SMAStrategy'] = get_cross_signal(df[['ClosePrice']].copy(), df[['SMA20']].copy())
-    elif signal_column == 'Signal30SMAStrategy':
-        df['Signal30SMAStrategy'] = get_cross_signal(df[['ClosePrice']].copy(), df[['SMA30']].copy())
-    elif signal_column == 'Signal50SMAStrategy':
-        df['Signal50SMAStrategy'] = get_cross_signal(df[['ClosePrice']].copy(), df[['SMA50']].copy())
-    elif signal_column == 'Signal100SMAStrategy':
-        df['Signal100SMAStrategy'] = get_cross_signal(df[['ClosePrice']].copy(), df[['SMA100']].copy())
-    elif signal_column == 'SignalMACDStrategy':
-        df['SignalMACDStrategy'] = get_macd_signal(df[['MACDSignal']].copy(), df[['MACD']].copy())
-
-    ### RSI
-    # overbought 80 oversold [40, 35, 30, 25, 20]
-    elif signal_column == 'SignalRSIStrategy80_40':
-        df['SignalRSIStrategy80_40'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=80, oversold_value=40)
-    elif signal_column == 'SignalRSIStrategy80_35':
-        df['SignalRSIStrategy80_35'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=80, oversold_value=35)
-    elif signal_column == 'SignalRSIStrategy80_30':
-        df['SignalRSIStrategy80_30'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=80, oversold_value=30)
-    elif signal_column == 'SignalRSIStrategy80_25':
-        df['SignalRSIStrategy80_25'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=80, oversold_value=25)
-    elif signal_column == 'SignalRSIStrategy80_20':
-        df['SignalRSIStrategy80_20'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=80, oversold_value=20)
-    # overbought 75  oversold [40, 35, 30, 25, 20]
-    elif signal_column == 'SignalRSIStrategy75_40':
-        df['SignalRSIStrategy75_40'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=75, oversold_value=40)
-    elif signal_column == 'SignalRSIStrategy75_35':
-        df['SignalRSIStrategy75_35'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=75, oversold_value=35)
-    elif signal_column == 'SignalRSIStrategy75_30':
-        df['SignalRSIStrategy75_30'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=75, oversold_value=30)
-    elif signal_column == 'SignalRSIStrategy75_25':
-        df['SignalRSIStrategy75_25'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=75, oversold_value=25)
-    elif signal_column == 'SignalRSIStrategy75_20':
-        df['SignalRSIStrategy75_20'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=75, oversold_value=20)
-    # overbought 70 oversold [40, 35, 30, 25, 20]
-    elif signal_column == 'SignalRSIStrategy70_40':
-        df['SignalRSIStrategy70_40'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=70, oversold_value=40)
-    elif signal_column == 'SignalRSIStrategy70_35':
-        df['SignalRSIStrategy70_35'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=70, oversold_value=35)
-    elif signal_column == 'SignalRSIStrategy70_30':
-        df['SignalRSIStrategy70_30'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=70, oversold_value=30)
-    elif signal_column == 'SignalRSIStrategy70_25':
-        df['SignalRSIStrategy70_25'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=70, oversold_value=25)
-    elif signal_column == 'SignalRSIStrategy70_20':
-        df['SignalRSIStrategy70_20'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=70, oversold_value=20)
-    # overbought 65 oversold [40, 35, 30, 25, 20]
-    elif signal_column == 'SignalRSIStrategy65_40':
-        df['SignalRSIStrategy65_40'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=65, oversold_value=40)
-    elif signal_column == 'SignalRSIStrategy65_35':
-        df['SignalRSIStrategy65_35'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=65, oversold_value=35)
-    elif signal_column == 'SignalRSIStrategy65_30':
-        df['SignalRSIStrategy65_30'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=65, oversold_value=30)
-    elif signal_column == 'SignalRSIStrategy65_25':
-        df['SignalRSIStrategy65_25'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=65, oversold_value=25)
-    elif signal_column == 'SignalRSIStrategy65_20':
-        df['SignalRSIStrategy65_20'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=65, oversold_value=20)
-    # overbought 60 oversold [40, 35, 30, 25, 20]
-    elif signal_column == 'SignalRSIStrategy60_40':
-        df['SignalRSIStrategy60_40'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=60, oversold_value=40)
-    elif signal_column == 'SignalRSIStrategy60_35':
-        df['SignalRSIStrategy60_35'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=60, oversold_value=35)
-    elif signal_column == 'SignalRSIStrategy60_30':
-        df['SignalRSIStrategy60_30'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=60, oversold_value=30)
-    elif signal_column == 'SignalRSIStrategy60_25':
-        df['SignalRSIStrategy60_25'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=60, oversold_value=25)
-    elif signal_column == 'SignalRSIStrategy60_20':
-        df['SignalRSIStrategy60_20'] = get_rsi_signal(df[['RSI']].copy(), overbought_value=60, oversold_value=20)
-    ###
-
-    ### SMA CROSS
-    elif signal_column == 'SignalSMACROSSStrategy2_10':
-        df['SignalSMACROSSStrategy2_10'] = get_cross_signal(df[['SMA2']].copy(), df[['SMA10']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy3_8':
-        df['SignalSMACROSSStrategy3_8'] = get_cross_signal(df[['SMA3']].copy(), df[['SMA8']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy3_40':
-        df['SignalSMACROSSStrategy3_40'] = get_cross_signal(df[['SMA3']].copy(), df[['SMA40']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy3_50':
-        df['SignalSMACROSSStrategy3_50'] = get_cross_signal(df[['SMA3']].copy(), df[['SMA50']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy5_30':
-        df['SignalSMACROSSStrategy5_30'] = get_cross_signal(df[['SMA5']].copy(), df[['SMA30']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy5_50':
-        df['SignalSMACROSSStrategy5_50'] = get_cross_signal(df[['SMA5']].copy(), df[['SMA50']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy5_90':
-        df['SignalSMACROSSStrategy5_90'] = get_cross_signal(df[['SMA5']].copy(), df[['SMA90']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy8_20':
-        df['SignalSMACROSSStrategy8_20'] = get_cross_signal(df[['SMA8']].copy(), df[['SMA20']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy8_40':
-        df['SignalSMACROSSStrategy8_40'] = get_cross_signal(df[['SMA8']].copy(), df[['SMA40']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy8_50':
-        df['SignalSMACROSSStrategy8_50'] = get_cross_signal(df[['SMA8']].copy(), df[['SMA50']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy8_70':
-        df['SignalSMACROSSStrategy8_70'] = get_cross_signal(df[['SMA8']].copy(), df[['SMA70']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy10_30':
-        df['SignalSMACROSSStrategy10_30'] = get_cross_signal(df[['SMA10']].copy(), df[['SMA30']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy10_80':
-        df['SignalSMACROSSStrategy10_80'] = get_cross_signal(df[['SMA10']].copy(), df[['SMA80']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy20_30':
-        df['SignalSMACROSSStrategy20_30'] = get_cross_signal(df[['SMA20']].copy(), df[['SMA30']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy20_40':
-        df['SignalSMACROSSStrategy20_40'] = get_cross_signal(df[['SMA20']].copy(), df[['SMA40']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy20_50':
-        df['SignalSMACROSSStrategy20_50'] = get_cross_signal(df[['SMA20']].copy(), df[['SMA50']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy20_70':
-        df['SignalSMACROSSStrategy20_70'] = get_cross_signal(df[['SMA20']].copy(), df[['SMA70']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy20_80':
-        df['SignalSMACROSSStrategy20_80'] = get_cross_signal(df[['SMA20']].copy(), df[['SMA80']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy30_40':
-        df['SignalSMACROSSStrategy30_40'] = get_cross_signal(df[['SMA30']].copy(), df[['SMA40']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy40_50':
-        df['SignalSMACROSSStrategy40_50'] = get_cross_signal(df[['SMA40']].copy(), df[['SMA50']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy40_60':
-        df['SignalSMACROSSStrategy40_60'] = get_cross_signal(df[['SMA40']].copy(), df[['SMA60']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy50_60':
-        df['SignalSMACROSSStrategy50_60'] = get_cross_signal(df[['SMA50']].copy(), df[['SMA60']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy50_70':
-        df['SignalSMACROSSStrategy50_70'] = get_cross_signal(df[['SMA50']].copy(), df[['SMA70']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy70_80':
-        df['SignalSMACROSSStrategy70_80'] = get_cross_signal(df[['SMA70']].copy(), df[['SMA80']].copy())
-    elif signal_column == 'SignalSMACROSSStrategy80_90':
-        df['SignalSMACROSSStrategy80_90'] = get_cross_signal(df[['SMA80']].copy(), df[['SMA90']].copy())
-    ###
-
-    ### SMA CROSS
-    elif signal_column == 'SignalEMACROSSStrategy20_40':
-        df['SignalEMACROSSStrategy20_40'] = get_cross_signal(df[['EMA20']].copy(), df[['EMA40']].copy())
-    ###
-
-    elif signal_column == 'SignalRSIADXStrategy':
-        df['SignalRSIADXStrategy'] = get_rsi_adx_signal(df[['RSI']].copy(), 
-                                                        df[['ADX']].copy(), 
-                                                        df[['DI+']].copy(), 
-                                                        df[['DI-']].copy(), 
-                                                        overbought_value=70.0, 
-                                                        oversold_value=30.0)
-    elif signal_column == 'SignalSMAMACDStrategy':
-        df['SignalSMAMACDStrategy'] = get_sma_macd_signal(df[['ClosePrice']].copy(), 
-                                                          df[['SMA30']].copy(), 
-                                                          df[['SMA100']].copy(), 
-                                                          df[['MACD']].copy())
-    elif signal_column == 'SignalMACDRVIStrategy':
-        df['SignalMACDRVIStrategy'] = get_macd_rvi_signal(df[['MACDSignal']].copy(), 
-                                                          df[['MACD']].copy(), 
-                                                          df[['RVISignal']].copy(), 
-                                                          df[['RVI']].copy())
-    elif signal_column == 'SignalBBandsStrategy':
-        df['SignalBBandsStrategy'] = get_bbands_signal(df[['ClosePrice']].copy(), 
-                                                       df[['UpperBBand']].copy(), 
-                                                       df[['LowerBBand']].copy())
-    elif signal_column == 'SignalInvertedRSIStrategy':
-        df['SignalInvertedRSIStrategy'] = get_inverted_rsi_signal(df[['RSI']].copy())
-    elif signal_column == 'SignalDMIStrategy':
-        df['SignalDMIStrategy'] = get_dmi_signal(df[['DI+']].copy(), df[['DI-']].copy(), df[['ADX']].copy())
-    elif signal_column == 'SignalADXMACDStrategy':
-        df['SignalADXMACDStrategy'] = get_adx_macd_signal(df[['MACD']].copy(), df[['DI+']].copy(), df[['DI-']].copy(), df[['ADX']].copy())
+    """
+    Add the signal column of the strategy (see strategy_registry_utils.py), only with the indicators it uses.
+    The signal is an int8 column: 1 - buy, -1 - sell, 0 - no signal.
+    """
+    strategy = get_strategy(signal_column)
+    if strategy is None:
+        print('Unknown strategy: ' + signal_column)
+        return generate_technical_indicators(df)
+
+    df = add_technical_indicators(df, strategy['inputs'])
+    df[signal_column] = strategy['function'](df)
 
     return df
 
+def get_strategy_history(signal_column, interval):
+    """
+    Returns the number of 1m candles needed by the warm-up of the strategy in the interval, None if the strategy is unknown.
+    """
+    strategy = get_strategy(signal_column)
+    if strategy is None:
+        return None
+
+    return strategy['warm_up'] * int(get_bin_width(interval) / pd.Timedelta(minutes=1))
+
+def check_strategies(max_candles=None):
+    """
+    Print the unknown strategies of trading-strategies.csv and the ones with more warm-up than max_candles 1m candles.
+    """
+    path = Path(__file__).parent
+    df_strategies = pd.read_csv(path / 'trading-strategies.csv')
+
+    for index, strategy in df_strategies.iterrows():
+        history = get_strategy_history(strategy['SignalColumnName'], strategy['Interval'])
+        if history is None:
+            print('Unknown strategy: ' + strategy['SignalColumnName'])
+        elif max_candles is not None and history > max_candles:
+            print('{} {} {} needs {} 1m candles of history, max_candles is {}.'.format(
+                strategy['Symbol'], strategy['Interval'], strategy['SignalColumnName'], history, max_candles))
+
 def roll_oco_orders(client):
     order = {}
     orders = get_all_open_orders(client)
@@ -303,15 +224,84 @@ def roll_oco_orders(client):
     
     return
 
-def process_candle(client, symbol, df, new_row, base_asset, quote_asset):
-    df = add_row(df, new_row)
+# stages of process_candle in the timings
+PROCESS_CANDLE_STAGES = ['append', 'strategies', 'frames', 'signals', 'orders']
+
+def add_timing(timings, stage, start):
+    """
+    Add the seconds since start to the stage in timings (if not None). Returns the current time.
+    """
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + now - start
+
+    return now
+
+def seed_live_signals(symbol, aggregator, live_signals):
+    """
+    Add to live_signals (dict of process_candle) the LiveSignal of each live strategy of the symbol in
+    trading-strategies.csv, seeded with the finished bars of its interval (aggregator, CandleAggregator).
+    The history is computed here, before the socket of the symbol starts, and each candle only computes the new bars.
+    """
+    path = Path(__file__).parent
+    df_strategies = pd.read_csv(path / 'trading-strategies.csv')
+    df_strategies = df_strategies[df_strategies['Symbol'] == symbol]
+
+    for index, strategy in df_strategies.iterrows():
+        interval = strategy['Interval']
+        signal_column = strategy['SignalColumnName']
+        if (interval, signal_column) not in live_signals and is_live_strategy(signal_column):
+            live_signals[(interval, signal_column)] = LiveSignal(signal_column).seed(aggregator.get_frame(interval))
+
+    return live_signals
+
+def get_interval_signals(df_trade, interval, signal_column, live_signals=None):
+    """
+    Returns the frame of the interval (with the signal column if computed on the whole history) and the signals
+    of the last two bars.
+    """
+    if live_signals is not None and is_live_strategy(signal_column):
+        if (interval, signal_column) not in live_signals:
+            live_signals[(interval, signal_column)] = LiveSignal(signal_column)
+
+        return df_trade, live_signals[(interval, signal_column)].get_signals(df_trade)
+
+    df_trade = update_signal_by_strategy(df_trade, signal_column)
+
+    return df_trade, (df_trade[signal_column].iloc[-2], df_trade[signal_column].iloc[-1])
+
+def process_candle(client, symbol, candles, new_row, base_asset, quote_asset, aggregator=None, live_signals=None,
+        timings=None):
+    """
+    Add the new 1m candle and process the strategies of the symbol.
+    If aggregator (CandleAggregator) is passed, the bars of the strategy intervals are updated incrementally
+    instead of resampling the whole history.
+    If live_signals (dict) is passed, the signals are computed only for the new bars (LiveSignal by interval and
+    strategy, kept in the dict between the calls) instead of the whole history.
+
+    The strategies of the same interval share the frame of the interval and its indicators, each signal column is
+    computed once even if it is in several rows.
+    If timings (dict) is passed, the seconds of each stage (PROCESS_CANDLE_STAGES) and the number of candles are added.
+    """
+    start = time.perf_counter()
+    candles.append_row(new_row)
+    if aggregator is not None:
+        aggregator.append_row(new_row)
+    # view of the candle buffer, no copy
+    df = candles.frame()
     symbol_order = base_asset + quote_asset
+    start = add_timing(timings, 'append', start)
 
     # Read every call because the strategy can be changed in the file.
     path = Path(__file__).parent
     filename = path / 'trading-strategies.csv'
     df_strategies = pd.read_csv(filename)
     df_strategies = df_strategies[df_strategies['Symbol'] == symbol]
+    start = add_timing(timings, 'strategies', start)
+
+    # frame of each interval (None if its candle is not closed) and signals of each (interval, signal column)
+    frames = {}
+    signals = {}
 
     for index, strategy in df_strategies.iterrows():
         interval = strategy['Interval']
@@ -326,16 +316,31 @@ def process_candle(client, symbol, df, new_row, base_asset, quote_asset):
 
         message = ''
 
-        if is_candle_closed(df, interval):
-            df_trade = resample_data(df, interval)
-            df_trade = update_signal_by_strategy(df_trade, signal_column)
-
-            if df_trade[signal_column].iloc[-2] != df_trade[signal_column].iloc[-1]:
+        if interval not in frames:
+            if not is_candle_closed(df, interval, aggregator.origin if aggregator is not None else None):
+                frames[interval] = None
+            elif aggregator is not None:
+                frames[interval] = aggregator.get_frame(interval, df)
+            else:
+                frames[interval] = resample_data(df, interval)
+            start = add_timing(timings, 'frames', start)
+
+        if frames[interval] is not None:
+            if (interval, signal_column) not in signals:
+                frames[interval], signals[(interval, signal_column)] = get_interval_signals(frames[interval],
+                                                                                            interval,
+                                                                                            signal_column,
+                                                                                            live_signals)
+                start = add_timing(timings, 'signals', start)
+            df_trade = frames[interval]
+            previous_signal, last_signal = signals[(interval, signal_column)]
+
+            if previous_signal != last_signal:
                 # get info about create orders (minimum, maximum, ...)
                 trade_info_dict = get_trade_info(client, symbol_order)
                 fee = trade_info_dict['exchange_fee']
 
-                if df_trade[signal_column].iloc[-1] == 1:
+                if last_signal == 1:
                     side = 'BUY'
                     if create_orders:
                         # TODO extract method with buy/sell rules
@@ -366,6 +371,7 @@ def process_candle(client, symbol, df, new_row, base_asset, quote_asset):
                                     # stop = get min low value of last 5 candles
                                     stop_value = df_trade[-num_candles_min_price:]['LowPrice'].min()
                                     # use average true range * 2 as threshold
+                                    add_technical_indicators(df_trade, ['ATR'])
                                     stop_value = stop_value - (df_trade['ATR'][-1] * 2)
                                     stop_value = get_trunc_value(stop_value, float(trade_info_dict['min_price']))
                                     price_value = buy_value + (2 * (buy_value - stop_value))
@@ -386,7 +392,7 @@ def process_candle(client, symbol, df, new_row, base_asset, quote_asset):
                             message = 'Unable to BUY, ' + quote_asset + ' without balance: ' + str(quote_balance)
                     else:
                         message = side + ' ' + symbol + ' (' + interval + ' Trade): ' + message_strategy + '!'
-                elif df_trade[signal_column].iloc[-1] == -1:
+                elif last_signal == -1:
                     side = 'SELL'
                     if create_orders:
                         ### SELL ORDER
@@ -414,99 +420,144 @@ def process_candle(client, symbol, df, new_row, base_asset, quote_asset):
                         message = side + ' ' + symbol + ' (' + interval + ' Trade): ' + message_strategy + '!'
                 
                 telegram_bot_sendtext(message)
+                start = add_timing(timings, 'orders', start)
+
+    if timings is not None:
+        timings['candles'] = timings.get('candles', 0) + 1
+
+    return candles
+
+def get_data(client, pair, interval, save=True, historic_data=False, start=None, end=None, columns=None, path=None):
+    """
+    Returns the candles of the pair in the interval, updated with the new candles of the exchange.
+
+    start, end and columns select the same data of get_data(client, pair, interval)[start:end][columns], but only
+    the row groups and columns needed are read from the store and the new candles requested are bounded by end.
+    path: candle store path, default: the local data path
+    """
+    if path is None:
+        #current path
+        #path = Path(__file__).parent / str('data/')
+        path = '/media/evandro/Work/Workspace/data/trading/'
+
+    # notebooks use '' as an open range
+    first_time, last_time = get_time_bounds(start or None, end or None)
+    is_1m = interval == '1min' or interval == '1m'
+
+    read_start, read_end = first_time, last_time
+    origin = 'start_day'
+    if not is_1m and (first_time is not None or last_time is not None):
+        # read the whole bins at the range bounds, with the bins aligned as if all the history was resampled
+        width = 2 * get_bin_width(interval)
+        read_start = first_time - width if first_time is not None else None
+        read_end = last_time + width if last_time is not None else None
+        store_start = get_store_bounds(path, pair)[0]
+        if store_start is not None:
+            origin = store_start.normalize()
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(columns)
+        if not is_1m and len(set(read_columns) & {'OpenPrice', 'HighPrice', 'LowPrice', 'ClosePrice'}) == 0:
+            # the empty bins are removed by the missing price
+            read_columns.append('ClosePrice')
+
+    df = read_candles(path, pair, start=read_start, end=read_end, columns=read_columns)
+    if df is None and len(get_partition_months(path, pair)) == 0:
+        # one-time migration from the single file layout
+        if save:
+            df = migrate_single_file(path, pair)
+        else:
+            df = read_single_file_candles(path, pair)
 
-    return df
+        if df is not None:
+            df = df.loc[read_start:read_end]
 
-def get_data(client, pair, interval, save=True, historic_data=False):
-    save_all = False
-    #current path
-    #path = Path(__file__).parent / str('data/')
-    path = '/media/evandro/Work/Workspace/data/trading/'
-    filename = path  + pair + '-1m-binance.parquet'
-    filename_all =  path + pair + '-1m-binance-all.parquet'
+    if df is None:
+        df = initialize_ohlc_df()
+    if read_columns is not None:
+        df = df[read_columns]
+
+    # new candles and missing candles (gaps) in the history, the gaps without candles in the exchange are skipped
+    empty_ranges = read_empty_ranges(path, pair)
+    empty_ranges_count = len(empty_ranges)
+    df_new = get_new_historical_data(client, df, pair, '1m',
+            start=int(read_start.value // 1000000) if read_start is not None else None,
+            end=int(read_end.value // 1000000) if read_end is not None else None,
+            empty_ranges=empty_ranges)
+    df = merge_sorted(df, df_new[df.columns])
 
-    try:
-        table = pq.read_table(filename_all)
-        df = table.to_pandas()
-        save_all = True
-    except FileNotFoundError:
-        try:
-            table = pq.read_table(filename)
-            df = table.to_pandas()
-        except FileNotFoundError:
-            df = initialize_ohlc_df()
-            save_all = True
-
-    df = update_historical_data(client, df, pair, '1m')
-    
     if save:
-        # save all data
-        if save_all:
-            table = pa.Table.from_pandas(df)
-            pq.write_table(table, filename_all)
-
-        # create data file with data from 2020 until now for share (github)
-        df_from_2021 = df['2021-1-1':]
-        table_from_2021 = pa.Table.from_pandas(df_from_2021)
-        pq.write_table(table_from_2021, filename)
+        # only the months with new or repaired candles are rewritten
+        append_candles(path, pair, df_new)
+        if len(empty_ranges) > empty_ranges_count:
+            write_empty_ranges(path, pair, empty_ranges)
     
     # valid intervals - 1min, 3min, 5min, 15min, 30min, 1h, 2h, 4h, 6h, 8h, 12h, 1D, 3D, 1W, 1M
     # TODO validate input
-    if interval == '1min' or interval == '1m':
-        return df
-    else:
-        df = resample_data(df, interval)
-        return df
+    if not is_1m:
+        df = resample_data(df, interval, origin=origin)
+
+    if first_time is not None or last_time is not None:
+        df = df.loc[first_time:last_time]
+    if columns is not None:
+        df = df[list(columns)]
 
-def is_candle_closed(df, interval):
+    return df
+
+def is_candle_closed(df, interval, origin=None):
+    """
+    True if the last candle of df starts a new bar of the interval (the bar of the previous candle is closed).
+    origin: first day (int64 nanoseconds) of the 3D bins, the origin of the CandleAggregator, default: the first day
+    of df (the bins of resample_data(df, interval)).
+    """
     # valid strategy intervals - 1min, 3min, 5min, 15min, 30min, 1h, 2h, 4h, 6h, 8h, 12h, 1D, 3D, 1W, 1M
+    # only the last two candles, the fields of the whole index are slow with a long history
+    index = df.index[-2:]
     if interval == '1min':
         return True
     elif interval == '3min':
-        if df.index.minute[-1] % 3 == 0:
+        if index.minute[-1] % 3 == 0:
             return True
     elif interval == '5min':
-        if df.index.minute[-1] % 5 == 0:
+        if index.minute[-1] % 5 == 0:
             return True
     elif interval == '15min':
-        if df.index.minute[-1] % 15 == 0:
+        if index.minute[-1] % 15 == 0:
             return True
     elif interval == '30min':
-        if df.index.minute[-1] % 30 == 0:
+        if index.minute[-1] % 30 == 0:
             return True
     elif interval == '1h':
-        if df.index.hour[-2] != df.index.hour[-1]:
+        if index.hour[-2] != index.hour[-1]:
             return True
     elif interval == '2h':
-        if (df.index.hour[-2] != df.index.hour[-1]) and (df.index.hour[-2] % 2 == 0):
+        if (index.hour[-2] != index.hour[-1]) and (index.hour[-2] % 2 == 0):
             return True
     elif interval == '4h':
-        if (df.index.hour[-2] != df.index.hour[-1]) and (df.index.hour[-2] % 4 == 0):
+        if (index.hour[-2] != index.hour[-1]) and (index.hour[-2] % 4 == 0):
             return True
     elif interval == '6h':
-        if (df.index.hour[-2] != df.index.hour[-1]) and (df.index.hour[-2] % 6 == 0):
+        if (index.hour[-2] != index.hour[-1]) and (index.hour[-2] % 6 == 0):
             return True
     elif interval == '8h':
-        if (df.index.hour[-2] != df.index.hour[-1]) and (df.index.hour[-2] % 8 == 0):
+        if (index.hour[-2] != index.hour[-1]) and (index.hour[-2] % 8 == 0):
             return True
     elif interval == '12h':
-        if (df.index.hour[-2] != df.index.hour[-1]) and (df.index.hour[-2] % 12 == 0):
+        if (index.hour[-2] != index.hour[-1]) and (index.hour[-2] % 12 == 0):
             return True
     elif interval == '1D':
-        if df.index.day[-2] != df.index.day[-1]:
-            return True
-    elif interval == '3D':
-        delta = df.index[-1] - df.index[0]
-        # delta.days -1 because the last day is incomplete
-        if (delta.days - 1) % 3 == 0:
+        if index.day[-2] != index.day[-1]:
             return True
-    elif interval == '1W':
-        delta = df.index[-1] - df.index[0]
-        # delta.days -1 because the last day is incomplete
-        if (delta.days - 1) % 7 == 0:
+    elif interval == '3D' or interval == '1W':
+        # the first candle kept moves with max_candles, the bins are given by the origin
+        if origin is None:
+            origin = df.index[0].normalize().value
+        labels = get_bin_labels(index.asi8, interval, origin)
+        if labels[-2] != labels[-1]:
             return True
     elif interval == '1M':
-        if df.index.month[-2] != df.index.month[-1]:
+        if index.month[-2] != index.month[-1]:
             return True
     
     return False
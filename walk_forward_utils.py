@@ -0,0 +1,115 @@
+import pandas as pd
+
+from strategy_registry_utils import get_strategy_name
+from sweep_utils import SweepRunner, get_grid, get_sweep_data, rank_results
+
+"""
+Walk-forward optimisation of the strategy parameters: the history is split in rolling train/test windows, the
+parameters are optimised on each train window (parameter sweep of sweep_utils.py) and evaluated on the next test
+window, so the stats of the test windows are out-of-sample.
+
+The indicators of the whole grid are computed once over the full history and shared with the workers, each window
+only slices them (the indicators of the first bars of a window are warmed up by the bars before it).
+
+Example, RSI thresholds on 1h candles, one year to train and three months to test:
+
+    grid = {'overbought_value': [60, 65, 70, 75, 80, 85], 'oversold_value': [40, 35, 30, 25, 20, 15]}
+    windows = run_walk_forward(df, get_rsi_strategy, grid, train='365D', test='90D', fee=0.00075, max_workers=8)
+    write_walk_forward_strategies(windows, 'BTCUSDT', '1H', 'walk-forward-strategies.csv')
+"""
+
+# columns of trading-strategies.csv
+STRATEGY_COLUMNS = ['Symbol', 'Interval', 'SignalColumnName', 'CreateOrders', 'IsPercentBuy', 'BuyAmount',
+                    'IsPercentSell', 'SellAmount', 'OCOStrategy', 'Message']
+
+STATS = ['total_return', 'cagr', 'max_drawdown', 'sharpe']
+
+def get_walk_forward_windows(index, train, test, step=None):
+    """
+    Returns the rolling windows (list of dicts with the first and last bar positions of the train and test windows)
+    of a DatetimeIndex: train and test are the durations of the windows ('365D', '90D'), each window starts step
+    (default: test) after the previous one. The last test window could be shorter.
+    """
+    train = pd.Timedelta(train)
+    test = pd.Timedelta(test)
+    step = test if step is None else pd.Timedelta(step)
+
+    windows = []
+    start = index[0]
+    while start + train <= index[-1]:
+        train_start, train_end, test_end = index.searchsorted([start, start + train, start + train + test])
+        if train_end >= len(index):
+            break
+
+        windows.append({'train_start': train_start, 'train_end': train_end,
+                        'test_start': train_end, 'test_end': test_end})
+        start += step
+
+    return windows
+
+def run_walk_forward(df, factory, grid, train='365D', test='90D', step=None, fee=0.0, max_workers=1,
+                     rank_by='total_return', periods_per_year=252):
+    """
+    Walk-forward optimisation of factory(**parameters) (strategy factory of strategy_registry_utils.py) over the
+    grid (see sweep_utils.get_grid) with the candles of df (OHLC DataFrame with a DatetimeIndex), see
+    get_walk_forward_windows for train, test and step and run_sweep for fee, max_workers and rank_by.
+
+    Returns a DataFrame with a row by window: its times, the best parameters of the train window (and their
+    SignalColumnName), the train stats (train_*) and the test stats (test_*) of these parameters.
+    """
+    grid = get_grid(grid)
+    data = get_sweep_data(df, factory, grid)
+    windows = get_walk_forward_windows(df.index, train, test, step)
+
+    rows = []
+    with SweepRunner(data, max_workers) as runner:
+        # the train windows of all the windows are optimised at the same time
+        tasks = [(factory, parameters, window['train_start'], window['train_end'], fee, None, periods_per_year)
+                 for window in windows for parameters in grid]
+        train_results = [[] for _ in windows]
+        for i, result in runner.run(tasks):
+            train_results[i // len(grid)].append(result)
+        best_results = [rank_results(results, rank_by)[0] for results in train_results]
+
+        tasks = [(factory, {key: best[key] for key in grid[0]}, window['test_start'], window['test_end'], fee, None,
+                  periods_per_year) for window, best in zip(windows, best_results)]
+        test_results = [None] * len(windows)
+        for i, result in runner.run(tasks):
+            test_results[i] = result
+
+    for window, best, test_result in zip(windows, best_results, test_results):
+        row = {'TrainStart': df.index[window['train_start']],
+               'TrainEnd': df.index[window['train_end'] - 1],
+               'TestStart': df.index[window['test_start']],
+               'TestEnd': df.index[window['test_end'] - 1],
+               'SignalColumnName': get_strategy_name(factory, best)}
+        row.update({key: best[key] for key in grid[0]})
+        row.update({'train_' + stat: best[stat] for stat in STATS})
+        row.update({'test_' + stat: test_result[stat] for stat in STATS})
+        row['test_trades'] = test_result['trades']
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+def write_walk_forward_strategies(windows, symbol, interval, filename, buy_amount=1.0, sell_amount=1.0):
+    """
+    Writes the strategy chosen in each window of run_walk_forward as a row of trading-strategies.csv (only
+    messages, CreateOrders = 0), the Message has the test window of the row.
+    Returns the DataFrame written.
+    """
+    df_strategies = pd.DataFrame({'Symbol': symbol,
+                                  'Interval': interval,
+                                  'SignalColumnName': windows['SignalColumnName'],
+                                  'CreateOrders': 0,
+                                  'IsPercentBuy': 1,
+                                  'BuyAmount': buy_amount,
+                                  'IsPercentSell': 1,
+                                  'SellAmount': sell_amount,
+                                  'OCOStrategy': 0,
+                                  'Message': ['Walk-forward {:%Y-%m-%d} to {:%Y-%m-%d}: {}'.format(start, end, name)
+                                              for start, end, name in zip(windows['TestStart'], windows['TestEnd'],
+                                                                          windows['SignalColumnName'])]},
+                                 columns=STRATEGY_COLUMNS)
+    df_strategies.to_csv(filename, index=False)
+
+    return df_strategies